@@ -0,0 +1,72 @@
+"""
+Startup time and lookup throughput of the airport index (utils/airports.py).
+
+    python benchmarks/airport_index_bench.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.data_config import IATA_CODES_FILE
+from utils.airports import AirportIndex
+
+
+def legacy_import_time_parse() -> dict:
+    """The old config/data_config.py import-time loop, for comparison."""
+    codes = {}
+    with open(IATA_CODES_FILE, 'r') as file:
+        for line in file:
+            parts = line.strip().split(',')
+            if len(parts) >= 2:
+                codes[parts[1].strip()] = {'code': parts[-1].strip(), 'country': parts[2].strip()}
+    return codes
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def throughput(fn, queries, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in queries:
+            fn(query)
+    return rounds * len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        compiled = os.path.join(tmp, "IATA.idx")
+        AirportIndex.from_csv().save(compiled)
+
+        print("Startup (best of 5)")
+        print(f"  legacy split(',') dict         {best_of(legacy_import_time_parse) * 1000:8.2f} ms")
+        print(f"  index from CSV                 {best_of(AirportIndex.from_csv) * 1000:8.2f} ms")
+        print(f"  index from CSV + fuzzy deletes {best_of(lambda: AirportIndex.from_csv()._ensure_deletes()) * 1000:8.2f} ms")
+        print(f"  precompiled index load         {best_of(lambda: AirportIndex.load(compiled)) * 1000:8.2f} ms"
+              f"  ({os.path.getsize(compiled) // 1024} KiB on disk)")
+
+        index = AirportIndex.load(compiled)
+
+    codes = ["LHR", "JFK", "DEL", "BOM", "CDG", "XXX"]
+    cities = ["London", "New York", "Mumbai", "Chicago", "Paris", "Nowhere"]
+    prefixes = ["lon", "new y", "ba", "chi", "s"]
+    typos = ["Londn", "Frankfrut", "Bangalor", "Chicgo", "Tokio", "Mumbia"]
+
+    print("Lookups per second")
+    print(f"  by_code       {throughput(index.by_code, codes, 20000):12,.0f}")
+    print(f"  by_city       {throughput(index.by_city, cities, 5000):12,.0f}")
+    print(f"  autocomplete  {throughput(index.autocomplete, prefixes, 2000):12,.0f}")
+    print(f"  fuzzy         {throughput(index.fuzzy, typos, 500):12,.0f}")
+    print(f"  resolve       {throughput(index.resolve, cities + typos, 500):12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
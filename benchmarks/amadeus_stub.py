@@ -0,0 +1,306 @@
+"""
+Minimal local stand-in for the Amadeus Self-Service APIs used by the Actuator.
+
+Serves the OAuth token, Flight Offers Search, Flight Cheapest Date Search, Flight Inspiration Search,
+Hotel List (by city) and Hotel Search endpoints with synthetic but well-formed payloads, after a
+configurable per-request latency. Point an Actuator at it with `actuator.AMADEUS_BASE = stub.url`.
+
+Flight offers are generated by `make_flight_offers`, or re-targeted from recorded fixtures
+(`load_offer_fixtures()` reads `amadeus_flight_search_results.csv`). `latency` may be a
+distribution such as `lognormal_latency(0.3, p99=1.5)`, and `errors={429: 0.02, 500: 0.01}`
+fails that share of API calls with the given status.
+"""
+import copy
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CARRIERS = ["BA", "AF", "LH", "KL", "U2", "FR", "AI", "6E"]
+FIXTURE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "amadeus_flight_search_results.csv")
+
+
+def load_offer_fixtures(path: str = FIXTURE_CSV) -> List[dict]:
+    """Recorded flight offers (a pandas CSV dump of /v2/shopping/flight-offers `data`), typed like the API."""
+    from utils.offer_store import read_pandas_csv
+
+    offers = []
+    for offer in read_pandas_csv(path):
+        for key, value in offer.items():
+            if value in ("True", "False"):
+                offer[key] = value == "True"
+            elif isinstance(value, str) and value.isdigit() and key != "id":
+                offer[key] = int(value)
+        offers.append(offer)
+    return offers
+
+
+def retarget_offer(offer: dict, origin: str, destination: str, departure_date: str, currency: str,
+                   offer_id: int, return_date: Optional[str] = None) -> dict:
+    """A copy of a fixture offer flying `origin` -> `destination` on the requested date(s)."""
+    offer = copy.deepcopy(offer)
+    offer["id"] = str(offer_id)
+    itineraries = offer.get("itineraries", [])[:2 if return_date else 1]
+    for itinerary, (frm, to, day) in zip(itineraries, [(origin, destination, departure_date),
+                                                       (destination, origin, return_date)]):
+        segments = itinerary.get("segments", [])
+        first_day = segments[0]["departure"]["at"][:10] if segments else day
+        shift = date.fromisoformat(day) - date.fromisoformat(first_day)
+        for segment in segments:
+            for point in ("departure", "arrival"):
+                at = segment[point]["at"]
+                segment[point]["at"] = (date.fromisoformat(at[:10]) + shift).isoformat() + at[10:]
+        if segments:
+            segments[0]["departure"]["iataCode"] = frm
+            segments[-1]["arrival"]["iataCode"] = to
+    offer["itineraries"] = itineraries
+    offer["oneWay"] = len(itineraries) == 1
+    offer["lastTicketingDate"] = departure_date
+    offer["price"] = {**offer.get("price", {}), "currency": currency}
+    return offer
+
+
+def lognormal_latency(median: float, p99: Optional[float] = None, seed: Optional[int] = None) -> Callable[[str, Dict[str, str]], float]:
+    """A latency(path, params) with a long right tail: half the calls take under `median`, 1% over `p99`."""
+    sigma = math.log(p99 / median) / 2.326 if p99 and p99 > median else 0.0
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def latency(path: str, params: Dict[str, str]) -> float:
+        with lock:
+            return rng.lognormvariate(math.log(median), sigma)
+    return latency
+
+
+def make_flight_offers(origin: str, destination: str, departure_date: str, count: int = 10,
+                       currency: str = "EUR", return_date: Optional[str] = None, seed: Optional[int] = None) -> List[dict]:
+    """`count` synthetic flight offers shaped like /v2/shopping/flight-offers `data` items."""
+    rng = random.Random(seed if seed is not None else f"{origin}{destination}{departure_date}{return_date}")
+    offers = []
+    for n in range(count):
+        carrier = rng.choice(CARRIERS)
+        stops = rng.choice((0, 0, 1, 1, 2))
+
+        def itinerary(frm: str, to: str, day: str) -> dict:
+            at = f"{day}T{rng.randint(5, 21):02d}:{rng.choice((0, 15, 30, 45)):02d}:00"
+            legs = [frm] + rng.sample(["AMS", "FRA", "CDG", "MUC", "ZRH", "DXB"], stops) + [to]
+            segments = []
+            for i in range(len(legs) - 1):
+                minutes = rng.randint(55, 480)
+                segments.append({
+                    "departure": {"iataCode": legs[i], "at": at},
+                    "arrival": {"iataCode": legs[i + 1], "at": at},
+                    "carrierCode": carrier,
+                    "number": str(rng.randint(100, 9999)),
+                    "duration": f"PT{minutes // 60}H{minutes % 60}M",
+                    "numberOfStops": 0,
+                })
+            total = sum(int(s["duration"][2:].split("H")[0]) * 60 + int(s["duration"].split("H")[1][:-1]) for s in segments)
+            return {"duration": f"PT{total // 60}H{total % 60}M", "segments": segments}
+
+        itineraries = [itinerary(origin, destination, departure_date)]
+        if return_date:
+            itineraries.append(itinerary(destination, origin, return_date))
+        price = f"{rng.uniform(40, 900):.2f}"
+        offers.append({
+            "type": "flight-offer",
+            "id": str(n + 1),
+            "source": "GDS",
+            "instantTicketingRequired": rng.random() < 0.2,
+            "lastTicketingDate": departure_date,
+            "numberOfBookableSeats": rng.randint(1, 9),
+            "itineraries": itineraries,
+            "price": {"currency": currency, "total": price, "base": price, "grandTotal": price},
+            "validatingAirlineCodes": [carrier],
+        })
+    return offers
+
+
+class AmadeusStub:
+    """Threaded stub server; use as a context manager or call start()/stop()."""
+
+    def __init__(
+        self,
+        latency: Union[float, Callable[[str, Dict[str, str]], float]] = 0.0,
+        offers_per_search: int = 10,
+        status: Optional[Callable[[str, Dict[str, str]], int]] = None,
+        errors: Optional[Dict[int, float]] = None,
+        fixtures: Optional[List[dict]] = None,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        # latency(path, params) -> seconds, or a fixed delay for every API call (not the token)
+        self.latency = latency if callable(latency) else (lambda path, params, _s=float(latency): _s)
+        self.offers_per_search = offers_per_search
+        self.status = status or (lambda path, params: 200)
+        # {status: share of API calls}, drawn independently of `status`
+        self.errors = errors or {}
+        self.fixtures = fixtures
+        self.calls: Dict[str, int] = {}
+        self.responses: Dict[int, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "AmadeusStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "AmadeusStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # --- Payloads ---------------------------------------------------------------------------
+
+    def _draw_status(self, path: str, params: Dict[str, str]) -> int:
+        status = self.status(path, params)
+        if status == 200 and self.errors:
+            with self._lock:
+                draw = self._rng.random()
+            for error, share in self.errors.items():
+                if draw < share:
+                    return error
+                draw -= share
+        return status
+
+    def flight_offers(self, params: Dict[str, str]) -> dict:
+        count = min(int(params.get("max", self.offers_per_search)), self.offers_per_search)
+        if self.fixtures:
+            data = [retarget_offer(self.fixtures[i % len(self.fixtures)], params["originLocationCode"],
+                                   params["destinationLocationCode"], params["departureDate"],
+                                   params.get("currencyCode", "EUR"), i + 1, params.get("returnDate"))
+                    for i in range(count)]
+            return {"meta": {"count": len(data)}, "data": data, "dictionaries": {"carriers": {c: c for c in CARRIERS}}}
+        data = make_flight_offers(params["originLocationCode"], params["destinationLocationCode"],
+                                  params["departureDate"], count, params.get("currencyCode", "EUR"),
+                                  params.get("returnDate"))
+        return {"meta": {"count": len(data)}, "data": data, "dictionaries": {"carriers": {c: c for c in CARRIERS}}}
+
+    def flight_dates(self, params: Dict[str, str]) -> dict:
+        start = date.fromisoformat(params.get("departureDate", date.today().isoformat()).split(",")[0])
+        rng = random.Random(f"{params.get('origin')}{params.get('destination')}{start}")
+        data = []
+        for i in range(14):
+            day = start + timedelta(days=i)
+            data.append({
+                "type": "flight-date", "origin": params.get("origin"), "destination": params.get("destination"),
+                "departureDate": day.isoformat(),
+                "returnDate": None if params.get("oneWay") == "true" else (day + timedelta(days=7)).isoformat(),
+                "price": {"total": f"{rng.uniform(40, 600):.2f}"},
+            })
+        return {"data": data, "meta": {"currency": "EUR"}}
+
+    def flight_destinations(self, params: Dict[str, str]) -> dict:
+        origin = params.get("origin", "MAD")
+        rng = random.Random(origin)
+        data = []
+        for code in ["PAR", "ROM", "BER", "LIS", "AMS", "BCN", "VIE", "PRG", "DUB", "ATH"]:
+            day = date.today() + timedelta(days=rng.randint(7, 120))
+            data.append({
+                "type": "flight-destination", "origin": origin, "destination": code,
+                "departureDate": day.isoformat(), "returnDate": (day + timedelta(days=rng.randint(2, 14))).isoformat(),
+                "price": {"total": f"{rng.uniform(30, 400):.2f}"},
+            })
+        return {"data": data, "dictionaries": {"locations": {}}}
+
+    def hotel_list(self, params: Dict[str, str]) -> dict:
+        city = params.get("cityCode", "PAR")
+        rng = random.Random(city)
+        data = []
+        for i in range(40):
+            data.append({
+                "hotelId": f"{city[:2]}STB{i:03d}", "name": f"Stub Hotel {i}", "iataCode": city,
+                "geoCode": {"latitude": 48.85 + rng.uniform(-0.2, 0.2), "longitude": 2.35 + rng.uniform(-0.2, 0.2)},
+                "distance": {"value": round(rng.uniform(0.1, 30), 2), "unit": "KM"},
+                "rating": rng.randint(1, 5),
+            })
+        return {"data": data}
+
+    def hotel_offers(self, params: Dict[str, str]) -> dict:
+        data = []
+        for hotel_id in params.get("hotelIds", "").split(","):
+            rng = random.Random(hotel_id)
+            price = f"{rng.uniform(60, 500):.2f}"
+            data.append({
+                "type": "hotel-offers", "available": True,
+                "hotel": {"hotelId": hotel_id, "name": f"Stub Hotel {hotel_id[-3:]}", "cityCode": hotel_id[:2]},
+                "offers": [{"id": f"{hotel_id}-1", "checkInDate": params.get("checkInDate"),
+                            "checkOutDate": params.get("checkOutDate"),
+                            "price": {"currency": params.get("currency", "EUR"), "total": price}}],
+            })
+        return {"data": data}
+
+    def _handler(self):
+        stub = self
+        routes = {
+            "/v2/shopping/flight-offers": stub.flight_offers,
+            "/v1/shopping/flight-dates": stub.flight_dates,
+            "/v1/shopping/flight-destinations": stub.flight_destinations,
+            "/v1/reference-data/locations/hotels/by-city": stub.hotel_list,
+            "/v3/shopping/hotel-offers": stub.hotel_offers,
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: dict) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path != "/v1/security/oauth2/token":
+                    self.send_error(404)
+                    return
+                self._send(200, {"type": "amadeusOAuth2Token", "access_token": "stub-token", "expires_in": 1799})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                route = routes.get(url.path)
+                if route is None:
+                    self.send_error(404)
+                    return
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub.calls[url.path] = stub.calls.get(url.path, 0) + 1
+                delay = stub.latency(url.path, params)
+                if delay:
+                    time.sleep(delay)
+                status = stub._draw_status(url.path, params)
+                with stub._lock:
+                    stub.responses[status] = stub.responses.get(status, 0) + 1
+                if status != 200:
+                    self._send(status, {"errors": [{"status": status, "title": "STUB ERROR"}]})
+                    return
+                self._send(200, route(params))
+
+        return Handler
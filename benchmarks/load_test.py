@@ -0,0 +1,227 @@
+"""
+End-to-end load test of POST /chat against local Amadeus and Ollama stand-ins.
+
+    python benchmarks/load_test.py                                # 1, 4, 16, 32 concurrent clients
+    python benchmarks/load_test.py --concurrency 8,64 --requests 400 --amadeus-latency 0.3 --amadeus-p99 1.5
+    python benchmarks/load_test.py --errors 429=0.02,500=0.01 --fixtures
+    python benchmarks/load_test.py --save-baseline                # record benchmarks/baselines/load_test.json
+    python benchmarks/load_test.py --check                        # exit 1 on a regression against it
+
+The API runs in-process under uvicorn with WARM_UP_MODELS, OFFER_STORE and CACHE_WARMER off; every
+level starts with empty Amadeus caches. Prompts cycle through `--routes` distinct routes, so fewer
+routes than requests means cache hits. For each level the report shows throughput, p50/p95/p99
+latency, failures and upstream calls per request (Amadeus by endpoint, Ollama, rate-limiter wait).
+
+Baselines are keyed by the scenario (all options except --concurrency/--save-baseline/--check) and
+are machine dependent: record them on the machine you compare on. A level regresses when its p95
+grows or its throughput drops by more than `--tolerance`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.amadeus_stub import AmadeusStub, load_offer_fixtures, lognormal_latency
+from benchmarks.ollama_stub import OllamaStub
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "load_test.json")
+AIRPORTS = ["DEL", "BOM", "BLR", "MAA", "CCU", "HYD", "LHR", "CDG", "FRA", "AMS", "MAD", "FCO", "JFK", "DXB", "SIN"]
+_ROUTE_RE = re.compile(r"from ([A-Z]{3}) to ([A-Z]{3}) on (\d{4}-\d{2}-\d{2})")
+
+
+def make_prompts(routes: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    prompts = []
+    for _ in range(routes):
+        origin, destination = rng.sample(AIRPORTS, 2)
+        day = date.today() + timedelta(days=rng.randint(7, 150))
+        prompts.append(f"Find flights from {origin} to {destination} on {day.isoformat()}")
+    return prompts
+
+
+def llm_reply(body: dict) -> str:
+    """Answer the intent and extraction prompts from the route in the user's query."""
+    content = body["messages"][-1]["content"]
+    if "identifies the user intent" in content:
+        return json.dumps({"intent": "find_flights_standard", "date_range": False})
+    match = _ROUTE_RE.search(content)
+    if match is None:
+        return "{}"
+    origin, destination, day = match.groups()
+    if "extracts flight search details" in content:
+        return json.dumps({"origin_iata": origin, "destination_iata": destination, "departure_date": day})
+    return json.dumps({"start_date": day, "end_date": None, "is_range": False})
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_api(port: int):
+    """Run services.api under uvicorn in a background thread; import only after the env points at the stubs."""
+    import uvicorn
+    from services.api import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("API server failed to start")
+        time.sleep(0.05)
+    return server, thread
+
+
+async def drive(url: str, prompts: List[str], concurrency: int, requests: int, timeout: float) -> dict:
+    import httpx
+
+    latencies, failures, next_index = [], {}, iter(range(requests))
+
+    async def client_loop(client):
+        for i in next_index:
+            start = time.perf_counter()
+            try:
+                r = await client.post(f"{url}/chat", json={"prompt": prompts[i % len(prompts)]})
+                status = r.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                failures[str(status)] = failures.get(str(status), 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "failures": failures,
+    }
+
+
+def scenario_key(args) -> str:
+    return (f"requests={args.requests},routes={args.routes},amadeus={args.amadeus_latency}/{args.amadeus_p99},"
+            f"errors={args.errors or '-'},fixtures={args.fixtures},token_delay={args.llm_token_delay},"
+            f"amadeus_rate={args.amadeus_rate}")
+
+
+def compare(levels: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Print each level against the baseline; returns the regressions."""
+    regressions = []
+    print(f"\nAgainst baseline (tolerance {tolerance:.0%}):")
+    for level, result in levels.items():
+        base = baseline.get(level)
+        if base is None:
+            print(f"  c={level:<4} no baseline")
+            continue
+        d_rps = result["throughput_rps"] / base["throughput_rps"] - 1 if base["throughput_rps"] else 0.0
+        d_p95 = result["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        bad = d_rps < -tolerance or d_p95 > tolerance
+        print(f"  c={level:<4} throughput {d_rps:+7.1%}   p95 {d_p95:+7.1%}   {'REGRESSION' if bad else 'ok'}")
+        if bad:
+            regressions.append(level)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,4,16,32", help="comma-separated client counts")
+    parser.add_argument("--requests", type=int, default=100, help="requests per concurrency level")
+    parser.add_argument("--routes", type=int, default=1000, help="distinct prompts (routes) to cycle through")
+    parser.add_argument("--amadeus-latency", type=float, default=0.2, help="median Amadeus API latency (s)")
+    parser.add_argument("--amadeus-p99", type=float, default=0.8, help="p99 Amadeus API latency (s)")
+    parser.add_argument("--amadeus-rate", type=float, default=0, help="AMADEUS_RATE_LIMIT (0 = unlimited)")
+    parser.add_argument("--errors", default="", help="Amadeus error distribution, e.g. 429=0.02,500=0.01")
+    parser.add_argument("--fixtures", action="store_true", help="serve offers re-targeted from the CSV fixtures")
+    parser.add_argument("--llm-token-delay", type=float, default=0.005, help="Ollama stub delay per generated token (s)")
+    parser.add_argument("--timeout", type=float, default=60, help="client timeout per request (s)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", action="store_true", help="record this run as the scenario's baseline")
+    parser.add_argument("--check", action="store_true", help="exit 1 if a level regressed against the baseline")
+    args = parser.parse_args()
+
+    errors = {int(k): float(v) for k, v in (item.split("=") for item in args.errors.split(",") if item)}
+    amadeus = AmadeusStub(latency=lognormal_latency(args.amadeus_latency, args.amadeus_p99, seed=1), errors=errors, seed=1)
+    llm = OllamaStub(load_delay=0, token_delay=args.llm_token_delay, reply=llm_reply)
+    with amadeus, llm:
+        # Read at import time by config/main_config.py, the rate limiter and ollama's default client
+        os.environ.update({"AMADEUS_BASE": amadeus.url, "OLLAMA_HOST": llm.url, "WARM_UP_MODELS": "false",
+                           "OFFER_STORE": "false", "CACHE_WARMER": "false",
+                           "AMADEUS_RATE_LIMIT": str(args.amadeus_rate)})
+        if args.fixtures:
+            amadeus.fixtures = load_offer_fixtures()
+        import services.environment as environment
+        from utils.rate_limiter import amadeus_rate_limiter
+
+        port = free_port()
+        server, thread = start_api(port)
+        prompts = make_prompts(args.routes)
+        levels = {}
+        print(f"Scenario: {scenario_key(args)}")
+        print(f"{'clients':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'failed':>7}  upstream calls per request")
+        try:
+            for concurrency in (int(c) for c in args.concurrency.split(",")):
+                for cache in (environment.offer_cache, environment.calendar_cache):
+                    cache.clear()
+                amadeus_before, llm_before = dict(amadeus.calls), llm.calls
+                waited_before = amadeus_rate_limiter.waited_s
+                result = asyncio.run(drive(f"http://127.0.0.1:{port}", prompts, concurrency, args.requests, args.timeout))
+                result["upstream_per_request"] = {
+                    **{path.rsplit("/", 1)[-1]: round((n - amadeus_before.get(path, 0)) / args.requests, 2)
+                       for path, n in amadeus.calls.items() if n != amadeus_before.get(path, 0)},
+                    "ollama": round((llm.calls - llm_before) / args.requests, 2),
+                }
+                result["rate_limit_wait_s"] = round(amadeus_rate_limiter.waited_s - waited_before, 2)
+                levels[str(concurrency)] = result
+                upstream = ", ".join(f"{k} {v:g}" for k, v in result["upstream_per_request"].items())
+                print(f"{concurrency:>7} {result['throughput_rps']:>8.1f} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+                      f"{result['p99_ms']:>9.1f} {sum(result['failures'].values()):>7}  {upstream}")
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baselines = json.load(file)
+    key = scenario_key(args)
+    regressions = compare(levels, baselines[key]["levels"], args.tolerance) if key in baselines else []
+    if key not in baselines:
+        print("\nNo baseline for this scenario (record one with --save-baseline)")
+    if args.save_baseline:
+        baselines[key] = {"recorded": time.strftime("%Y-%m-%d"), "python": sys.version.split()[0], "levels": levels}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
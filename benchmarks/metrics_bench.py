@@ -0,0 +1,76 @@
+"""
+Recording overhead of the metrics registry (utils/metrics.py) on the /chat hot path.
+
+    python benchmarks/metrics_bench.py
+
+A /chat request records roughly 20 values (stages, Amadeus calls, HTTP counters), so even a few
+microseconds per call stays far below the milliseconds spent in the LLM and Amadeus.
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.metrics import MetricsRegistry
+
+N = 200_000
+
+
+def per_call_ns(fn, n: int = N) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def main():
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_total", "bench", ("endpoint", "status"))
+    histogram = registry.histogram("bench_seconds", "bench", ("stage",))
+    gauge = registry.gauge("bench_in_flight", "bench")
+    child = histogram.labels("amadeus")
+
+    baseline = per_call_ns(lambda: None)
+    print(f"Per call, minus a {baseline:.0f} ns empty-call baseline ({N:,} calls)")
+    rows = [
+        ("counter.labels(path, 200).inc()", lambda: counter.labels("/v2/shopping/flight-offers", 200).inc()),
+        ("histogram.labels(stage).observe()", lambda: histogram.labels("amadeus").observe(0.123)),
+        ("cached child.observe()", lambda: child.observe(0.123)),
+    ]
+    for name, fn in rows:
+        print(f"  {name:38s} {per_call_ns(fn) - baseline:8.0f} ns")
+
+    def timed_block():
+        with child.time():
+            pass
+
+    def in_flight_block():
+        with gauge.track_inprogress():
+            pass
+    print(f"  {'with child.time(): pass':38s} {per_call_ns(timed_block) - baseline:8.0f} ns")
+    print(f"  {'with gauge.track_inprogress(): pass':38s} {per_call_ns(in_flight_block) - baseline:8.0f} ns")
+
+    # Contention: the same child hit from several threads (asyncio.to_thread extractors, batch runner)
+    threads, per_thread = 8, N // 8
+    start = time.perf_counter()
+    workers = [threading.Thread(target=lambda: [child.observe(0.1) for _ in range(per_thread)]) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    print(f"  {threads} threads x {per_thread:,} observe()        {elapsed / (threads * per_thread) * 1e9:8.0f} ns")
+
+    for _ in range(50):
+        for endpoint in ("flight-offers", "flight-dates", "hotel-offers"):
+            for status in (200, 400, 500):
+                counter.labels(endpoint, status).inc()
+    start = time.perf_counter()
+    for _ in range(100):
+        text = registry.render()
+    print(f"\nScrape: render() {(time.perf_counter() - start) / 100 * 1000:.3f} ms for {len(text.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Cold vs warm first-token latency against the local Ollama stub.
+
+    python benchmarks/model_warmup_bench.py [--load-delay 1.5]
+
+Scenarios:
+    cold             first request with no warm-up (pays the model load)
+    warmed           request after warm_up_models() ran at "startup"
+    idle, short ttl  request after an idle gap longer than keep_alive
+    idle, long ttl   same idle gap with the configured keep_alive
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.ollama_stub import OllamaStub
+
+
+def first_token_latency(client, model: str, keep_alive: str) -> float:
+    start = time.perf_counter()
+    stream = client.chat(model=model, messages=[{"role": "user", "content": "hi"}], stream=True, keep_alive=keep_alive)
+    next(iter(stream))
+    elapsed = time.perf_counter() - start
+    for _ in stream:
+        pass
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--load-delay", type=float, default=1.5, help="simulated model load time (s)")
+    parser.add_argument("--idle", type=float, default=1.2, help="idle gap before the keep-alive scenarios (s)")
+    args = parser.parse_args()
+
+    reply = lambda body: '{"intent": "find_flights_standard"}'
+    with OllamaStub(load_delay=args.load_delay, reply=reply) as stub:
+        # ollama's module-level client reads OLLAMA_HOST on import
+        os.environ["OLLAMA_HOST"] = stub.url
+        from ollama import Client
+        from utils.model_router import warm_up_models
+        from config.main_config import model_name, ollama_keep_alive
+
+        client = Client(host=stub.url)
+        results = {}
+        results["cold"] = first_token_latency(client, "cold-model", ollama_keep_alive)
+
+        warm_up_models(["warmed-model"], keep_alive=ollama_keep_alive)
+        results["warmed"] = first_token_latency(client, "warmed-model", ollama_keep_alive)
+
+        first_token_latency(client, "short-ttl", "1s")
+        time.sleep(args.idle)
+        results["idle, keep_alive=1s"] = first_token_latency(client, "short-ttl", "1s")
+
+        first_token_latency(client, model_name, ollama_keep_alive)
+        time.sleep(args.idle)
+        results[f"idle, keep_alive={ollama_keep_alive}"] = first_token_latency(client, model_name, ollama_keep_alive)
+
+    print(f"First-token latency (simulated load {args.load_delay}s, idle gap {args.idle}s)")
+    for name, seconds in results.items():
+        print(f"  {name:<24} {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
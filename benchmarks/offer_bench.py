@@ -0,0 +1,161 @@
+"""
+Microbenchmarks of the CPU-side offer processing: duration parsing, filtering, sorting, rendering
+and the Pydantic models of utils/sensors.py.
+
+    python benchmarks/offer_bench.py                              # 10^2 .. 10^5 offers
+    python benchmarks/offer_bench.py --sizes 1000 --only sort     # one group at one size
+    python benchmarks/offer_bench.py --segments 4 --travelers 3 --amenities 8 --round-trip
+    python benchmarks/offer_bench.py --save-baseline              # record benchmarks/baselines/offer_bench.json
+    python benchmarks/offer_bench.py --check                      # exit 1 on a regression against it
+
+Offers come from benchmarks/offer_generator.py (deterministic per seed). Each case reports the
+best of `--repeat` runs and, from a separate run under tracemalloc, the peak memory it allocated.
+Inputs that a case mutates (sort) are copied outside the timed region. Baselines are keyed by the
+offer shape and are machine dependent; a case regresses when its time grows by more than
+`--tolerance` (memory by more than the same share plus 64 KiB).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.offer_generator import synthetic_offers
+from services.environment import Actuator
+from utils.output_reader import flight_offer_list_reader, read_flight_offer_
+from utils.sensors import FetchIntent, FlightSearchQueryDetails, RefinementDetails, SortBy
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "offer_bench.json")
+SEARCH = {"origin_iata": "DEL", "destination_iata": "LHR", "departure_date": "2026-03-14", "adults": 2,
+          "travel_class": "ECONOMY", "non_stop": False, "currency": "EUR", "max_results": 50}
+
+
+def cases(actuator: Actuator, offers: List[dict]) -> List[Tuple[str, str, Callable[[], Callable[[], object]]]]:
+    """(group, name, setup) triples; setup() prepares fresh inputs and returns the timed callable."""
+    durations = [offer["itineraries"][0]["duration"] for offer in offers]
+    rows = [
+        ("parse", "_parse_duration", lambda: lambda: [actuator._parse_duration(d) for d in durations]),
+        ("filter", "_filter max_stops=1", lambda: lambda: actuator._filter_flight_offers(offers, 1, None, False)),
+        ("filter", "_filter all criteria", lambda: lambda: actuator._filter_flight_offers(offers, 1, 2, True)),
+    ]
+    for sort_by in SortBy:
+        def setup(sort_by=sort_by):
+            batch = list(offers)
+            return lambda: actuator._sort_flight_offers(batch, sort_by)
+        rows.append(("sort", f"_sort {sort_by.name.lower()}", setup))
+    rows += [
+        ("render", "read_flight_offer_", lambda: lambda: [read_flight_offer_(offer) for offer in offers]),
+        ("render", "flight_offer_list_reader", lambda: lambda: flight_offer_list_reader(offers)),
+        ("refine", "refine_flight_offers", lambda: lambda: actuator.refine_flight_offers(offers, SortBy.DURATION, 1, 2, None, 10)),
+        ("models", "FlightSearchQueryDetails", lambda: lambda: [FlightSearchQueryDetails(**SEARCH) for _ in offers]),
+        ("models", "FlightSearchQueryDetails.model_dump", _model_dump_setup(len(offers))),
+        ("models", "FetchIntent", lambda: lambda: [FetchIntent(intent="find_flights_standard", date_range=False) for _ in offers]),
+        ("models", "RefinementDetails", lambda: lambda: [RefinementDetails(sort_by="duration", max_stops=0) for _ in offers]),
+    ]
+    return rows
+
+
+def _model_dump_setup(n: int):
+    def setup():
+        details = FlightSearchQueryDetails(**SEARCH)
+        return lambda: [details.model_dump() for _ in range(n)]
+    return setup
+
+
+def measure(setup: Callable[[], Callable[[], object]], repeat: int) -> Tuple[float, int]:
+    """Best wall time over `repeat` runs, and peak bytes allocated by one more run."""
+    best = float("inf")
+    for _ in range(repeat):
+        fn = setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    fn = setup()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def shape_key(args) -> str:
+    return f"segments={args.segments},travelers={args.travelers},amenities={args.amenities},round_trip={args.round_trip}"
+
+
+def _bytes(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024 or unit == "GiB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000,100000", help="comma-separated offer counts")
+    parser.add_argument("--only", help="comma-separated groups: parse, filter, sort, render, refine, models")
+    parser.add_argument("--segments", type=int, default=3, help="maximum segments per itinerary")
+    parser.add_argument("--travelers", type=int, default=1)
+    parser.add_argument("--amenities", type=int, default=4, help="amenities per fare detail")
+    parser.add_argument("--round-trip", action="store_true")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (fewer above 10^4 offers)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true", help="record this run as the shape's baseline")
+    parser.add_argument("--check", action="store_true", help="exit 1 if a case regressed against the baseline")
+    args = parser.parse_args()
+
+    groups = set(args.only.split(",")) if args.only else None
+    baselines: Dict[str, dict] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baselines = json.load(file)
+    baseline: Optional[Dict[str, dict]] = baselines.get(shape_key(args), {}).get("results")
+    actuator = Actuator()
+    results, regressions = {}, []
+
+    print(f"Offer shape: {shape_key(args)}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        offers = synthetic_offers(size, args.segments, args.travelers, args.amenities, args.round_trip, seed=args.seed)
+        repeat = max(1, args.repeat if size <= 10_000 else args.repeat // 3)
+        print(f"\n{size:,} offers")
+        print(f"  {'case':36s} {'time':>10s} {'per offer':>10s} {'peak mem':>10s}   vs baseline")
+        for group, name, setup in cases(actuator, offers):
+            if groups and group not in groups:
+                continue
+            seconds, peak = measure(setup, repeat)
+            key = f"{name}@{size}"
+            results[key] = {"seconds": seconds, "peak_bytes": peak}
+            note = ""
+            if baseline and key in baseline:
+                base = baseline[key]
+                d_time = seconds / base["seconds"] - 1 if base["seconds"] else 0.0
+                d_mem = peak - base["peak_bytes"]
+                bad = d_time > args.tolerance or d_mem > base["peak_bytes"] * args.tolerance + 64 * 1024
+                note = f"time {d_time:+6.1%}  mem {'+' if d_mem >= 0 else '-'}{_bytes(abs(d_mem))}" + ("  REGRESSION" if bad else "")
+                if bad:
+                    regressions.append(key)
+            print(f"  {name:36s} {seconds * 1000:8.2f}ms {seconds / size * 1e6:8.2f}us {_bytes(peak):>10s}   {note}")
+
+    if baseline is None:
+        print("\nNo baseline for this offer shape (record one with --save-baseline)")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+    if args.save_baseline:
+        entry = baselines.setdefault(shape_key(args), {"results": {}})
+        entry["recorded"] = time.strftime("%Y-%m-%d")
+        entry["python"] = sys.version.split()[0]
+        entry["results"].update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Synthetic Amadeus flight offers at realistic size, for the offer-processing microbenchmarks.
+
+    offers = synthetic_offers(10_000, max_segments=3, travelers=2, amenities=6, round_trip=True)
+
+Offers carry everything a real /v2/shopping/flight-offers item does (itineraries with aircraft,
+operating carrier and terminals, pricing options, and one travelerPricing per traveler with
+fareDetailsBySegment and amenities), so memory and parsing costs track production payloads. The
+output is deterministic for a given seed.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+AIRPORTS = ["DEL", "BOM", "BLR", "MAA", "LHR", "CDG", "FRA", "AMS", "MAD", "FCO", "JFK", "DXB", "SIN", "DOH", "IST"]
+CARRIERS = ["AI", "6E", "UK", "BA", "AF", "LH", "KL", "EK", "QR", "SQ"]
+AMENITIES = [
+    ("CHECKED BAG", "BAGGAGE"), ("PRE RESERVED SEAT ASSIGNMENT", "PRE_RESERVED_SEAT"), ("MEAL SERVICES", "MEAL"),
+    ("CHANGEABLE TICKET", "BRANDED_FARES"), ("REFUNDABLE TICKET", "BRANDED_FARES"), ("PRIORITY BOARDING", "TRAVEL_SERVICES"),
+    ("LOUNGE ACCESS", "TRAVEL_SERVICES"), ("WIFI", "ENTERTAINMENT"), ("IN FLIGHT ENTERTAINMENT", "ENTERTAINMENT"),
+]
+CABINS = ["ECONOMY", "ECONOMY", "ECONOMY", "PREMIUM_ECONOMY", "BUSINESS"]
+
+
+def _duration(minutes: int) -> str:
+    return f"PT{minutes // 60}H{minutes % 60}M" if minutes % 60 else f"PT{minutes // 60}H"
+
+
+def synthetic_offers(count: int, max_segments: int = 3, travelers: int = 1, amenities: int = 4,
+                     round_trip: bool = False, origin: str = "DEL", destination: str = "LHR",
+                     departure_date: str = "2026-03-14", seed: Optional[int] = 0) -> List[dict]:
+    """`count` flight offers with 1..`max_segments` segments per itinerary and `amenities` per fare."""
+    rng = random.Random(seed)
+    hubs = [a for a in AIRPORTS if a not in (origin, destination)]
+    start = datetime.fromisoformat(departure_date)
+    offers = []
+    segment_id = 0
+    for n in range(count):
+        carrier = rng.choice(CARRIERS)
+        cabin = rng.choice(CABINS)
+        itineraries = []
+        for frm, to, day in [(origin, destination, start)] + ([(destination, origin, start + timedelta(days=7))] if round_trip else []):
+            legs = [frm] + rng.sample(hubs, rng.randint(0, max_segments - 1)) + [to]
+            at = day + timedelta(minutes=rng.randrange(0, 24 * 60, 5))
+            segments = []
+            for i in range(len(legs) - 1):
+                minutes = rng.randint(45, 600)
+                arrive = at + timedelta(minutes=minutes)
+                segment_id += 1
+                segments.append({
+                    "departure": {"iataCode": legs[i], "terminal": str(rng.randint(1, 5)), "at": at.isoformat()},
+                    "arrival": {"iataCode": legs[i + 1], "terminal": str(rng.randint(1, 5)), "at": arrive.isoformat()},
+                    "carrierCode": carrier,
+                    "number": str(rng.randint(100, 9999)),
+                    "aircraft": {"code": rng.choice(["320", "321", "32N", "738", "77W", "789", "359"])},
+                    "operating": {"carrierCode": carrier},
+                    "duration": _duration(minutes),
+                    "id": str(segment_id),
+                    "numberOfStops": 0,
+                    "blacklistedInEU": False,
+                })
+                at = arrive + timedelta(minutes=rng.randint(45, 300))
+            total = int((datetime.fromisoformat(segments[-1]["arrival"]["at"]) - day).total_seconds() // 60)
+            itineraries.append({"duration": _duration(total), "segments": segments})
+
+        base = rng.uniform(40, 1500)
+        per_traveler = {"currency": "EUR", "total": f"{base * 1.15:.2f}", "base": f"{base:.2f}"}
+        segment_ids = [s["id"] for it in itineraries for s in it["segments"]]
+        fare_amenities = [{"description": d, "isChargeable": rng.random() < 0.3, "amenityType": t,
+                           "amenityProvider": {"name": "BrandedFare"}}
+                          for d, t in rng.sample(AMENITIES, min(amenities, len(AMENITIES)))]
+        total = f"{base * 1.15 * travelers:.2f}"
+        offers.append({
+            "type": "flight-offer",
+            "id": str(n + 1),
+            "source": "GDS",
+            "instantTicketingRequired": rng.random() < 0.2,
+            "nonHomogeneous": False,
+            "oneWay": not round_trip,
+            "isUpsellOffer": False,
+            "lastTicketingDate": (start - timedelta(days=rng.randint(0, 20))).date().isoformat(),
+            "numberOfBookableSeats": rng.randint(1, 9),
+            "itineraries": itineraries,
+            "price": {"currency": "EUR", "total": total, "base": f"{base * travelers:.2f}",
+                      "fees": [{"amount": "0.00", "type": "SUPPLIER"}, {"amount": "0.00", "type": "TICKETING"}],
+                      "grandTotal": total},
+            "pricingOptions": {"fareType": ["PUBLISHED"], "includedCheckedBagsOnly": rng.random() < 0.5},
+            "validatingAirlineCodes": [carrier],
+            "travelerPricings": [{
+                "travelerId": str(t + 1),
+                "fareOption": "STANDARD",
+                "travelerType": "ADULT",
+                "price": dict(per_traveler),
+                "fareDetailsBySegment": [{
+                    "segmentId": sid,
+                    "cabin": cabin,
+                    "fareBasis": f"{cabin[0]}{rng.randint(10, 99)}{carrier}",
+                    "brandedFare": "VALUE",
+                    "class": rng.choice("YBMHKLQ"),
+                    "includedCheckedBags": {"quantity": rng.randint(0, 2)},
+                    "amenities": fare_amenities,
+                } for sid in segment_ids],
+            } for t in range(travelers)],
+        })
+    return offers
@@ -0,0 +1,90 @@
+"""
+Event-loop latency while large flight-offer responses are processed, per offload executor.
+
+    python benchmarks/offload_bench.py [--offers 300] [--concurrency 4] [--duration 3]
+
+Each mode runs `--concurrency` coroutines that keep decoding, filtering, sorting and rendering a
+response of `--offers` offers (services.environment.process_flight_offers) next to a probe that
+sleeps 1 ms at a time, standing in for the I/O of other requests. The probe's oversleep is the
+delay every concurrent request would see. Outputs of all modes are checked to be identical first.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.offer_generator import synthetic_offers
+from services.environment import process_flight_offers
+from utils.offload import Offloader, INLINE, THREAD, PROCESS
+from utils.sensors import SortBy
+
+ARGS = (2, 1, False, SortBy.PRICE, True)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else 0.0
+
+
+async def run_mode(offloader: Offloader, text: str, concurrency: int, duration: float) -> dict:
+    lags, processed = [], 0
+    stop = time.perf_counter() + duration
+
+    async def probe():
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    async def worker():
+        nonlocal processed
+        while time.perf_counter() < stop:
+            await offloader.run(len(text), process_flight_offers, text, *ARGS)
+            processed += 1
+
+    await asyncio.gather(probe(), *(worker() for _ in range(concurrency)))
+    return {
+        "responses_per_s": processed / duration,
+        "lag_p50_ms": percentile(lags, 50) * 1000,
+        "lag_p99_ms": percentile(lags, 99) * 1000,
+        "lag_max_ms": max(lags) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offers", type=int, default=300, help="offers per response")
+    parser.add_argument("--concurrency", type=int, default=4, help="responses processed concurrently")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per mode")
+    parser.add_argument("--workers", type=int, default=2, help="executor workers")
+    args = parser.parse_args()
+
+    text = json.dumps({"meta": {"count": args.offers}, "data": synthetic_offers(args.offers, travelers=2),
+                       "dictionaries": {}})
+    offloaders = {mode: Offloader(mode, workers=args.workers, min_bytes=0) for mode in (INLINE, THREAD, PROCESS)}
+    offloaders[PROCESS].warm_up()
+
+    reference = process_flight_offers(text, *ARGS)
+    for mode, offloader in offloaders.items():
+        result = asyncio.run(offloader.run(len(text), process_flight_offers, text, *ARGS))
+        # render_s is a timing, the rest must match
+        assert (result["results"], result["rendered"]) == (reference["results"], reference["rendered"]), \
+            f"{mode} result differs from inline"
+
+    start = time.perf_counter()
+    process_flight_offers(text, *ARGS)
+    single_ms = (time.perf_counter() - start) * 1000
+    print(f"{args.offers} offers per response ({len(text) / 1024:.0f} KiB, {single_ms:.1f} ms to process inline), "
+          f"{args.concurrency} concurrent, {args.workers} workers; results identical across modes")
+    print(f"  {'executor':10s} {'responses/s':>12s} {'lag p50':>10s} {'lag p99':>10s} {'lag max':>10s}")
+    for mode, offloader in offloaders.items():
+        r = asyncio.run(run_mode(offloader, text, args.concurrency, args.duration))
+        print(f"  {mode:10s} {r['responses_per_s']:12.1f} {r['lag_p50_ms']:8.2f}ms {r['lag_p99_ms']:8.2f}ms {r['lag_max_ms']:8.2f}ms")
+        offloader.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Minimal local stand-in for the Ollama HTTP API (/api/chat, /api/generate).
+
+Models are "loaded" on first use (costing `load_delay` seconds) and unloaded once idle for longer
+than the request's keep_alive, so cold vs warm behaviour can be measured without a GPU.
+Responses carry the same timing/token fields a real Ollama server returns.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+_DURATION_RE = re.compile(r"^(-?\d+(?:\.\d+)?)(ms|s|m|h)?$")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}
+
+
+def parse_keep_alive(value, default: float = 300.0) -> float:
+    """Ollama keep_alive ("30m", "10s", 0, -1) in seconds; negative means forever."""
+    if value is None:
+        return default
+    m = _DURATION_RE.match(str(value).strip())
+    if not m:
+        return default
+    seconds = float(m.group(1)) * _UNITS[m.group(2)]
+    return float("inf") if seconds < 0 else seconds
+
+
+class OllamaStub:
+    """Threaded stub server; use as a context manager or call start()/stop()."""
+
+    def __init__(
+        self,
+        load_delay: float = 1.0,
+        token_delay: float = 0.01,
+        reply: Optional[Callable[[dict], str]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.load_delay = load_delay
+        self.token_delay = token_delay
+        self.reply = reply or (lambda body: "{}")
+        self.calls = 0
+        self._loaded = {}  # model -> (last_used, keep_alive seconds)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OllamaStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "OllamaStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _load(self, model: str, keep_alive) -> float:
+        """Return the load time paid by this call and record the model as resident."""
+        now = time.time()
+        with self._lock:
+            self.calls += 1
+            last_used, ttl = self._loaded.get(model, (None, 0))
+            cold = last_used is None or now - last_used > ttl
+        load = self.load_delay if cold else 0.0
+        if load:
+            time.sleep(load)
+        with self._lock:
+            self._loaded[model] = (time.time(), parse_keep_alive(keep_alive))
+        return load
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path not in ("/api/chat", "/api/generate"):
+                    self.send_error(404)
+                    return
+                start = time.time()
+                model = body.get("model", "")
+                load = stub._load(model, body.get("keep_alive"))
+                is_chat = self.path == "/api/chat"
+                # An empty generate is Ollama's "just load the model" request
+                text = "" if not is_chat and not body.get("prompt") else stub.reply(body)
+                tokens = text.split(" ") if text else []
+                prompt_chars = len(json.dumps(body.get("messages") or body.get("prompt") or ""))
+
+                def chunk(piece: str, done: bool) -> dict:
+                    payload = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"), "done": done}
+                    if is_chat:
+                        payload["message"] = {"role": "assistant", "content": piece}
+                    else:
+                        payload["response"] = piece
+                    if done:
+                        payload.update({
+                            "done_reason": "stop" if tokens else "load",
+                            "total_duration": int((time.time() - start) * 1e9),
+                            "load_duration": int(load * 1e9),
+                            "prompt_eval_count": max(prompt_chars // 4, 1),
+                            "prompt_eval_duration": int(stub.token_delay * 1e9),
+                            "eval_count": len(tokens),
+                            "eval_duration": int(len(tokens) * stub.token_delay * 1e9),
+                        })
+                    return payload
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                if body.get("stream", True):
+                    for i, token in enumerate(tokens):
+                        time.sleep(stub.token_delay)
+                        self.wfile.write((json.dumps(chunk(token if i == 0 else " " + token, False)) + "\n").encode())
+                        self.wfile.flush()
+                    self.wfile.write((json.dumps(chunk("", True)) + "\n").encode())
+                else:
+                    time.sleep(stub.token_delay * len(tokens))
+                    self.wfile.write(json.dumps(chunk(text, True)).encode())
+
+        return Handler
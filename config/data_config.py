@@ -16,16 +16,27 @@ DATA_DIR = os.path.join(HOME_DIR, "data")
 
 
 IATA_CODES_FILE = os.path.join(DATA_DIR, "IATA.csv")
-
-with open(IATA_CODES_FILE, 'r') as file:
-    IATA_CODES = {}
-    for line in file:
-        parts = line.strip().split(',')
-        if len(parts) >= 2:
-            city = parts[1].strip()
-            country = parts[2].strip()
-            code = parts[-1].strip()
-            
-            IATA_CODES[city] = {'code':code, 'country':country}
-
-
+# Precompiled airport index written by `python utils/airports.py --compile`
+IATA_INDEX_FILE = os.path.join(DATA_DIR, "IATA.idx")
+# Append-only history of every flight offer fetched from Amadeus (utils/offer_store.py)
+OFFER_STORE_FILE = os.getenv("OFFER_STORE_FILE", os.path.join(DATA_DIR, "offers.sqlite"))
+# Request traces, one OTLP/JSON line per request (utils/tracing.py)
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", os.path.join(DATA_DIR, "traces.otlp.jsonl"))
+# Saved request profiles (utils/profiling.py)
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+
+
+def __getattr__(name):
+    # IATA_CODES ({city: {'code', 'country'}}) used to be parsed at import time; it is now built from
+    # the lazily loaded airport index on first access. Prefer utils.airports.get_airport_index().
+    if name == "IATA_CODES":
+        from utils.airports import get_airport_index
+
+        codes = {}
+        for airport in get_airport_index().airports:
+            # One code per city: the metro code where there is one (LON, NYC), else the first airport
+            if airport.city not in codes or airport.is_metro:
+                codes[airport.city] = {'code': airport.code, 'country': airport.country}
+        globals()["IATA_CODES"] = codes
+        return codes
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,4 +4,104 @@ import os
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 model_name = "gemma3:4b"
+# Smaller model for the cheap classification stages and as the overload fallback. Opt-in (e.g.
+# FAST_MODEL_NAME=gemma3:1b, pulled into Ollama first): by default every stage uses model_name
+fast_model_name = os.getenv("FAST_MODEL_NAME", model_name)
 
+# How long Ollama keeps a model resident after a call ("30m", "-1" = forever, "0" = unload immediately)
+ollama_keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Load the routed models into Ollama when services/api.py starts
+warm_up_models_on_startup = os.getenv("WARM_UP_MODELS", "true").lower() == "true"
+
+# Per-extractor model routing (stage -> model) used by utils/prompts.py
+stage_models = {
+    "intent": fast_model_name,
+    "date": fast_model_name,
+    "flight": model_name,
+    "hotel": model_name,
+    "inspiration": model_name,
+}
+# Cheaper model a stage degrades to while its primary model has too many calls in flight
+stage_fallback_models = {
+    "flight": fast_model_name,
+    "hotel": fast_model_name,
+    "inspiration": fast_model_name,
+} if fast_model_name != model_name else {}
+model_overload_threshold = int(os.getenv("MODEL_OVERLOAD_THRESHOLD", "4"))
+# Optional price per 1000 (prompt + completion) tokens for hosted models; local models cost 0
+llm_cost_per_1k_tokens = {}
+
+# Local intent classifier: below this confidence fetch_intent_of_the_query falls back to the LLM
+intent_confidence_threshold = 0.8
+
+# Background cache warmer (services/cache_warmer.py), started with services/api.py
+cache_warmer_enabled = os.getenv("CACHE_WARMER", "false").lower() == "true"
+# Routes always kept warm, "DEL-BOM,LHR-JFK"; the rest are learned from recent searches
+cache_warmer_routes = [r.strip().upper() for r in os.getenv("CACHE_WARMER_ROUTES", "").split(",") if r.strip()]
+cache_warmer_top_n = int(os.getenv("CACHE_WARMER_TOP_N", "50"))
+# Below OFFER_CACHE_TTL (120 s), so warmed offers do not expire between cycles
+cache_warmer_interval_s = float(os.getenv("CACHE_WARMER_INTERVAL", "100"))
+cache_warmer_jitter = float(os.getenv("CACHE_WARMER_JITTER", "0.2"))
+# Local hours the warmer may run in ("0-6", "22-5"); empty means any hour
+cache_warmer_off_peak_hours = os.getenv("CACHE_WARMER_OFF_PEAK_HOURS", "0-6")
+# Also treat the service as off-peak while live searches stay below this rate
+cache_warmer_max_live_per_minute = int(os.getenv("CACHE_WARMER_MAX_LIVE_PER_MINUTE", "5"))
+# Amadeus calls per hour the account may make, and the share of it the warmer may spend
+amadeus_quota_per_hour = int(os.getenv("AMADEUS_QUOTA_PER_HOUR", "2000"))
+cache_warmer_quota_share = float(os.getenv("CACHE_WARMER_QUOTA_SHARE", "0.2"))
+
+# Persist every flight-offers response to the offer store for price history (utils/offer_store.py)
+offer_store_enabled = os.getenv("OFFER_STORE", "true").lower() == "true"
+
+# Trip packages (flights + hotel) in /chat: per-branch deadlines in seconds and number of packages returned
+trip_flight_deadline_s = float(os.getenv("TRIP_FLIGHT_DEADLINE", "30"))
+trip_hotel_deadline_s = float(os.getenv("TRIP_HOTEL_DEADLINE", "30"))
+trip_max_packages = int(os.getenv("TRIP_MAX_PACKAGES", "5"))
+
+# Background /chat jobs (services/jobs.py): worker count, queued jobs before POST /jobs returns 429,
+# seconds a finished job's result is kept, and the per-job time limit
+jobs_workers = int(os.getenv("JOBS_WORKERS", "4"))
+jobs_max_queue = int(os.getenv("JOBS_MAX_QUEUE", "100"))
+jobs_result_ttl_s = float(os.getenv("JOBS_RESULT_TTL", "3600"))
+jobs_timeout_s = float(os.getenv("JOBS_TIMEOUT", "300"))
+
+# Append every request trace to TRACE_EXPORT_FILE (config/data_config.py) as OTLP/JSON (utils/tracing.py)
+trace_export_enabled = os.getenv("TRACE_EXPORT", "false").lower() == "true"
+
+# On-demand request profiling (utils/profiling.py): requests sent with `X-Profile: <token>` are profiled,
+# plus a random PROFILE_SAMPLE_RATE share of all requests. Both off by default.
+profile_admin_token = os.getenv("PROFILE_ADMIN_TOKEN", "")
+profile_sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+profile_sample_interval_ms = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# Retention of PROFILE_DIR (config/data_config.py): oldest profiles are deleted first
+profile_max_files = int(os.getenv("PROFILE_MAX_FILES", "50"))
+profile_max_mb = float(os.getenv("PROFILE_MAX_MB", "100"))
+
+# /chat sessions (utils/session_store.py): idle seconds before a session is dropped, sessions kept,
+# and raw offers kept per session for local re-sorting/filtering of follow-ups
+session_idle_ttl_s = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+session_max = int(os.getenv("SESSION_MAX", "5000"))
+session_max_offers = int(os.getenv("SESSION_MAX_OFFERS", "250"))
+
+# Logging (utils/log.py): level, "json" (one object per line, with the request ID) or "text", and
+# repeated messages: at most LOG_RATE_LIMIT_BURST records per message per LOG_RATE_LIMIT_WINDOW seconds
+log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+log_format = os.getenv("LOG_FORMAT", "json").lower()
+log_rate_limit_window_s = float(os.getenv("LOG_RATE_LIMIT_WINDOW", "60"))
+log_rate_limit_burst = int(os.getenv("LOG_RATE_LIMIT_BURST", "5"))
+log_queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# CPU-heavy response processing (decode, filter, sort, render of flight offers; utils/offload.py):
+# "thread", "process" or "inline", and the response size in bytes from which it leaves the event loop
+offload_executor = os.getenv("OFFLOAD_EXECUTOR", "thread").lower()
+offload_workers = int(os.getenv("OFFLOAD_WORKERS", "2"))
+offload_min_bytes = int(os.getenv("OFFLOAD_MIN_BYTES", str(256 * 1024)))
+
+# Admission control for /chat (utils/admission.py): concurrent calls and waiting requests per expensive
+# stage, and the deadline after which a request's answer is no longer worth computing
+admission_control_enabled = os.getenv("ADMISSION_CONTROL", "true").lower() == "true"
+llm_stage_concurrency = int(os.getenv("LLM_STAGE_CONCURRENCY", "4"))
+llm_stage_max_queue = int(os.getenv("LLM_STAGE_MAX_QUEUE", "32"))
+amadeus_stage_concurrency = int(os.getenv("AMADEUS_STAGE_CONCURRENCY", "10"))
+amadeus_stage_max_queue = int(os.getenv("AMADEUS_STAGE_MAX_QUEUE", "100"))
+chat_deadline_s = float(os.getenv("CHAT_DEADLINE", "30"))
@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+import ollama
+import pytest
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import services.environment as environment
+import utils.prompts as prompts
+from benchmarks.amadeus_stub import AmadeusStub
+from benchmarks.ollama_stub import OllamaStub
+
+DEPARTURE = (date.today() + timedelta(days=30)).isoformat()
+DEFAULT_FLIGHT_DETAILS = {"origin_iata": "DEL", "destination_iata": "BOM"}
+
+
+@pytest.fixture
+def stubs(request, monkeypatch):
+    """
+    Local Ollama and Amadeus stand-ins wired into the pipeline, as (llm, amadeus).
+
+    The LLM classifies every prompt as a standard flight search and extracts the test module's
+    FLIGHT_DETAILS (departing on DEPARTURE); a module-level `offers_latency(path, params)` sets the
+    Amadeus latency.
+    """
+    details = {"departure_date": DEPARTURE, **getattr(request.module, "FLIGHT_DETAILS", DEFAULT_FLIGHT_DETAILS)}
+
+    def llm_reply(body: dict) -> str:
+        content = body["messages"][-1]["content"]
+        if "extracts flight search details" in content:
+            return json.dumps(details)
+        if "identifies the user intent" in content:
+            return json.dumps({"intent": "find_flights_standard", "date_range": False})
+        return json.dumps({"start_date": DEPARTURE, "end_date": None, "is_range": False})
+
+    latency = getattr(request.module, "offers_latency", 0.0)
+    with OllamaStub(load_delay=0, token_delay=0, reply=llm_reply) as llm, AmadeusStub(latency=latency) as amadeus:
+        monkeypatch.setattr(prompts, "chat", ollama.Client(host=llm.url).chat)
+        monkeypatch.setenv("AMADEUS_BASE", amadeus.url)
+        monkeypatch.setattr(environment, "offer_store_enabled", False)
+        environment.offer_cache.clear()
+        yield llm, amadeus
+        environment.offer_cache.clear()
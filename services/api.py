@@ -1,93 +1,345 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse, FileResponse
 from pydantic import BaseModel
 import sys
 import os
 import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Optional
 
 # Add project root to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.sensors import UserIntent
-from utils.prompts import fetch_standard_flight_details, fetch_intent_of_the_query, fetch_date_range_from_query, fetch_hotel_details
+from services.chat_pipeline import admitted_pipeline
 from services.environment import Actuator
-from utils.output_reader import flight_offer_list_reader
+from utils.sensors import HotelSearchQueryDetails
+from utils.model_router import warm_up_models
+from utils.intent_classifier import get_intent_classifier
+from utils.llm_metrics import llm_metrics, llm_request_scope
+from utils.tracing import start_trace, current_trace
+from utils.profiling import RequestProfiler, profile_mode_for, list_profiles, profile_path, is_admin_token
+from utils.metrics import registry, http_requests_total, http_request_seconds, http_requests_in_flight
+from services.cache_warmer import cache_warmer
+from services.jobs import job_manager, JobQueueFull
+from utils.offer_store import get_offer_store
+from config.main_config import (warm_up_models_on_startup, cache_warmer_enabled, offer_store_enabled,
+                                admission_control_enabled, chat_deadline_s)
+from utils.log import setup_logging
+from utils.offload import offloader
+from utils.admission import Overloaded, QUEUE_FULL, deadline_scope, check_admission
+from utils.refinement import parse_refinement
+from utils.session_store import session_store
 
-app = FastAPI(title="Travel Agent API")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    if warm_up_models_on_startup:
+        # Load the routed models in the background so the first /chat does not pay the cold load
+        app.state.model_warm_up = asyncio.create_task(asyncio.to_thread(warm_up_models))
+    # Train the local intent classifier before traffic arrives instead of on the first /chat
+    await asyncio.to_thread(get_intent_classifier)
+    if offer_store_enabled:
+        # Create the offer table up front rather than on the first search
+        get_offer_store()
+    if cache_warmer_enabled:
+        cache_warmer.start()
+    # Spawn offload worker processes before traffic arrives (a no-op for the thread pool)
+    await asyncio.to_thread(offloader.warm_up)
+    await job_manager.start()
+    yield
+    await job_manager.stop()
+    await cache_warmer.stop()
+    await asyncio.to_thread(offloader.shutdown)
+    if offer_store_enabled:
+        await asyncio.to_thread(get_offer_store().close)
+
+
+app = FastAPI(title="Travel Agent API", lifespan=lifespan)
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    # Registered first, so it runs inside the tracing middleware and can name the profile after the request ID
+    mode = profile_mode_for(request.headers.get("X-Profile"), request.headers.get("X-Profile-Mode"))
+    if mode is None or request.url.path.startswith("/profiles"):
+        return await call_next(request)
+    trace = current_trace()
+    profiler = RequestProfiler(trace.request_id if trace is not None else uuid.uuid4().hex, mode)
+    if not profiler.start():
+        return await call_next(request)
+    try:
+        # Streaming responses are profiled up to their first byte
+        response = await call_next(request)
+    finally:
+        profiler.stop()
+    files = await asyncio.to_thread(profiler.save)
+    response.headers["X-Profile-Files"] = ",".join(files)
+    return response
+
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    # Streaming responses are timed to their first byte; their stages are in travelagent_stage_seconds
+    start = time.perf_counter()
+    with http_requests_in_flight.track_inprogress():
+        response = await call_next(request)
+    route = request.scope.get("route")
+    # The route template (/jobs/{job_id}) keeps the label set bounded
+    path = route.path if route is not None else "unmatched"
+    http_request_seconds.labels(request.method, path).observe(time.perf_counter() - start)
+    http_requests_total.labels(request.method, path, response.status_code).inc()
+    return response
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    # Registered after record_http_metrics, so it wraps it. Streaming responses carry the spans
+    # finished before their first byte.
+    with start_trace(f"{request.method} {request.url.path}", request.headers.get("X-Request-ID")) as trace:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            trace.root.name = f"{request.method} {route.path}"
+        response.headers["X-Request-ID"] = trace.request_id
+        response.headers["Server-Timing"] = trace.server_timing()
+    return response
 
 class ChatRequest(BaseModel):
     prompt: str
+    # Follow-ups in the same session that only re-sort or re-filter reuse the last search's offers
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
     data: list = []
     intent: str
+    session_id: Optional[str] = None
+    debug: Optional[dict] = None
+
+def _admit(request: ChatRequest) -> None:
+    """Shed a new /chat request at the door if the LLM stage cannot serve it before its deadline."""
+    if not admission_control_enabled:
+        return
+    # Re-sorting or re-filtering the session's offers needs neither stage, so it is always let in
+    session = session_store.get(request.session_id) if request.session_id else None
+    if session is not None and parse_refinement(request.prompt) is not None:
+        return
+    check_admission()
+
+def _overloaded_response(e: Overloaded) -> JSONResponse:
+    # A full queue is the client's cue to back off (as with /jobs); a missed deadline is the server's fault
+    status_code = 429 if e.reason == QUEUE_FULL else 503
+    logger.warning("Shed request at the %s stage: %s", e.stage, e.reason, extra={"status": status_code})
+    return JSONResponse(status_code=status_code, content={"detail": str(e), "stage": e.stage, "reason": e.reason},
+                        headers={"Retry-After": str(int(e.retry_after_s))})
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+@app.post("/chat", response_model=ChatResponse, response_model_exclude_none=True)
+async def chat_endpoint(request: ChatRequest, debug: bool = False):
+    """
+    Answer a prompt; `?debug=true` adds the request's trace spans (see also the Server-Timing header).
+
+    Under overload the request is shed with 429 (stage queue full) or 503 (it would miss its
+    CHAT_DEADLINE), both with Retry-After.
+    """
     prompt = request.prompt
-    
+    trace = current_trace()
+
+    with deadline_scope(chat_deadline_s if admission_control_enabled else None):
+        try:
+            _admit(request)
+            with llm_request_scope(trace.request_id if trace is not None else None):
+                result = await admitted_pipeline().run(prompt, request.session_id or uuid.uuid4().hex)
+                if debug and trace is not None:
+                    result["debug"] = trace.summary()
+                return ChatResponse(**result)
+
+        except Overloaded as e:
+            return _overloaded_response(e)
+        except Exception as e:
+            logger.exception("Error processing request: %s", e)
+            raise HTTPException(status_code=500, detail=str(e))
+
+def _sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, format: str = "sse"):
+    """
+    /chat as a stream of stage events (intent, parameters, calendar, offers, done).
+
+    `format=sse` sends Server-Sent Events, `format=ndjson` one JSON object per line. Offers events
+    carry every offer found so far, so a client can simply re-render on each one.
+    """
+    if format not in ("sse", "ndjson"):
+        raise HTTPException(status_code=422, detail="format must be 'sse' or 'ndjson'")
+    encode = _sse if format == "sse" else (lambda event: json.dumps(event) + "\n")
+    session_id = request.session_id or uuid.uuid4().hex
     try:
-        # 1. Determine Intent
-        user_intent = fetch_intent_of_the_query(prompt)
-        intent_str = user_intent.intent.value
-        
-        actuator = Actuator()
-        
-        if user_intent.intent == UserIntent.FIND_FLIGHTS_ADVANCED:
-             # Check for date range
-            if user_intent.date_range:
-                flight_details = fetch_cheapest_flight_details(prompt)
-                search_method = actuator.search_flights_advanced
-            else:
-                flight_details = fetch_standard_flight_details(prompt)
-                search_method = actuator.search_flights_advanced
-
-            # Execute Search
-            res = await search_method(flight_details)
-            
-            if 'data' in res.get('results', {}):
-                offers = flight_offer_list_reader(res['results']['data'])
-                return ChatResponse(
-                    response=f"Found {len(offers)} flights for your request.",
-                    data=offers,
-                    intent=intent_str
-                )
-            else:
-                return ChatResponse(
-                    response="I couldn't find any flights matching your criteria.",
-                    data=[],
-                    intent=intent_str
-                )
-
-        elif user_intent.intent == UserIntent.FIND_FLIGHTS_STANDARD:
-            flight_details = fetch_standard_flight_details(prompt)
-            res = await actuator.search_flights_on_a_date(flight_details)
-            
-            if 'data' in res.get('results', {}):
-                 offers = flight_offer_list_reader(res['results']['data'])
-                 return ChatResponse(
-                    response=f"Found {len(offers)} flights for your request.",
-                    data=offers,
-                    intent=intent_str
-                )
-            else:
-                 return ChatResponse(
-                    response="I couldn't find any flights matching your criteria.",
-                    data=[],
-                    intent=intent_str
-                )
-        
-        else:
-            # Fallback for "OTHER" or unhandled intents
-            return ChatResponse(
-                response="I am a specialized Travel Agent. Currently, I can help you find flights. Try asking: 'Find me cheapest flights from Delhi to Mumbai tomorrow'.",
-                data=[],
-                intent=intent_str
-            )
-
-    except Exception as e:
-        print(f"Error processing request: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        # Before the response starts, so a shed request still gets its status code and Retry-After
+        with deadline_scope(chat_deadline_s if admission_control_enabled else None):
+            _admit(request)
+    except Overloaded as e:
+        return _overloaded_response(e)
+
+    async def events():
+        with llm_request_scope(), deadline_scope(chat_deadline_s if admission_control_enabled else None):
+            stream = admitted_pipeline().run_events(request.prompt, session_id)
+            try:
+                async for event in stream:
+                    if event["event"] == "done":
+                        event = {**event, "session_id": session_id}
+                    yield encode(event)
+            except Overloaded as e:
+                yield encode({"event": "error", "detail": str(e), "stage": e.stage, "reason": e.reason,
+                              "retry_after": e.retry_after_s})
+            except Exception as e:
+                logger.exception("Error processing streamed request: %s", e)
+                yield encode({"event": "error", "detail": getattr(e, "detail", None) or str(e)})
+            finally:
+                await stream.aclose()
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+def _job_view(job) -> dict:
+    view = job.model_dump(mode="json", exclude={"events"})
+    view["events"] = len(job.events)
+    view["last_event"] = job.events[-1]["event"] if job.events else None
+    return view
+
+@app.post("/jobs", status_code=202)
+async def submit_job_endpoint(request: ChatRequest):
+    """Queue a /chat prompt; poll GET /jobs/{job_id} or stream GET /jobs/{job_id}/events for the result."""
+    try:
+        job = job_manager.submit(request.prompt)
+    except JobQueueFull as e:
+        return JSONResponse(status_code=429, content={"detail": str(e)}, headers={"Retry-After": "5"})
+    return _job_view(job)
+
+@app.get("/jobs/{job_id}")
+async def get_job_endpoint(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return _job_view(job)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events_endpoint(job_id: str, format: str = "sse", since: int = 0):
+    """A job's stage events (the /chat/stream events) from index `since`, until it finishes."""
+    if format not in ("sse", "ndjson"):
+        raise HTTPException(status_code=422, detail="format must be 'sse' or 'ndjson'")
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    encode = _sse if format == "sse" else (lambda event: json.dumps(event) + "\n")
+
+    async def events():
+        async for event in job_manager.subscribe(job_id, since):
+            yield encode(event)
+        job = job_manager.get(job_id)
+        if job is not None and job.status.value in ("failed", "cancelled"):
+            yield encode({"event": "error", "detail": job.error})
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job_endpoint(job_id: str):
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return _job_view(job)
+
+@app.get("/metrics/jobs")
+async def job_metrics_endpoint():
+    """Job queue depth, workers and outcome counters."""
+    return job_manager.metrics()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics_endpoint():
+    """Request counts, per-stage latency histograms, Amadeus status codes and cache hit ratios (Prometheus text format)."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+def _require_profile_admin(token: Optional[str]) -> None:
+    if not is_admin_token(token):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@app.get("/profiles")
+async def list_profiles_endpoint(x_profile: Optional[str] = Header(None)):
+    """Saved request profiles, newest first (needs the X-Profile admin token)."""
+    _require_profile_admin(x_profile)
+    return {"profiles": await asyncio.to_thread(list_profiles)}
+
+@app.get("/profiles/{name}")
+async def get_profile_endpoint(name: str, x_profile: Optional[str] = Header(None)):
+    _require_profile_admin(x_profile)
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Unknown profile")
+    return FileResponse(path, filename=name)
+
+@app.get("/metrics/llm")
+async def llm_metrics_endpoint(recent: int = 20):
+    """LLM call aggregates per (stage, model) and the most recent per-request summaries."""
+    return {
+        "stages": llm_metrics.snapshot(),
+        "recent_requests": list(llm_metrics.recent_requests)[-recent:],
+    }
+
+@app.post("/hotels/offers")
+async def hotel_offers_endpoint(details: HotelSearchQueryDetails):
+    """Priced hotels of a city as NDJSON, one line per chunk of hotel IDs as it finishes."""
+    async def lines():
+        found = 0
+        stream = Actuator().iter_hotel_offers(details)
+        try:
+            async for chunk in stream:
+                found += len(chunk["hotels"])
+                yield json.dumps(chunk) + "\n"
+                if found >= (details.max_results or 10):
+                    break
+        except HTTPException as e:
+            yield json.dumps({"error": e.detail}) + "\n"
+        finally:
+            await stream.aclose()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/prices/history")
+async def price_history_endpoint(origin: str, destination: str, departure_date: Optional[str] = None, days: int = 90):
+    """Observed prices for a route from the offer store (no Amadeus call)."""
+    store = get_offer_store()
+    history = await asyncio.to_thread(store.price_history, origin, destination, departure_date, days)
+    percentiles = await asyncio.to_thread(store.price_percentiles, origin, destination, departure_date, days)
+    return {"origin": origin.upper(), "destination": destination.upper(), "history": history, "percentiles": percentiles}
+
+@app.get("/prices/check")
+async def price_check_endpoint(origin: str, destination: str, price: float, departure_date: Optional[str] = None,
+                               days: int = 90, currency: Optional[str] = None):
+    """Is `price` a good price for the route, compared with the offers seen so far?"""
+    verdict = await asyncio.to_thread(get_offer_store().price_verdict, origin, destination, price, departure_date,
+                                      days, currency)
+    return {"origin": origin.upper(), "destination": destination.upper(), "price": price, **verdict}
+
+@app.get("/metrics/cache")
+async def cache_metrics_endpoint():
+    """Cache warmer state, quota use and warm-hit ratio."""
+    return cache_warmer.metrics()
+
+@app.post("/cache-warmer/start")
+async def cache_warmer_start():
+    cache_warmer.start()
+    return {"running": cache_warmer.running}
+
+@app.post("/cache-warmer/stop")
+async def cache_warmer_stop():
+    await cache_warmer.stop()
+    return {"running": cache_warmer.running}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,192 @@
+"""
+Replay a JSONL prompt file through the full /chat pipeline.
+
+    python services/batch_runner.py prompts.jsonl -o results.ndjson --workers 16 --llm-concurrency 2 --amadeus-concurrency 4
+
+Input lines use the same shape as the backlog files ({"request_id", "title", "body"}); a "prompt" key
+takes precedence over "body"/"title". Results are appended to the NDJSON output as they finish, and
+the output doubles as the checkpoint: re-running with the same output skips request IDs already
+answered in it and retries the ones that failed.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.chat_pipeline import ChatPipeline
+from services.environment import Actuator
+from utils.llm_metrics import llm_request_scope
+from utils.admission import StageQueue, llm_stage, amadeus_stage
+from config.main_config import admission_control_enabled
+from utils.log import setup_logging
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100) of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(max(math.ceil(q / 100 * len(ordered)) - 1, 0), len(ordered) - 1)
+    return ordered[rank]
+
+
+def iter_prompts(path: str) -> Iterator[Tuple[str, str]]:
+    """Stream (request_id, prompt) pairs from a JSONL file without loading it into memory."""
+    with open(path, "r") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            request_id = str(row.get("request_id") or row.get("id") or f"line-{line_number}")
+            prompt = row.get("prompt") or row.get("body") or row.get("title") or ""
+            yield request_id, prompt
+
+
+def load_checkpoint(output_path: str) -> set:
+    """
+    Return the request IDs already answered in `output_path`.
+
+    Rows written with an "error" do not count, so a resumed run retries them (their new result is
+    appended after the failed row). A line torn by an interrupted run is truncated away so the file
+    stays valid NDJSON.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    valid_bytes = 0
+    with open(output_path, "rb") as file:
+        for line in file:
+            try:
+                row = json.loads(line)
+                request_id = row["request_id"]
+            except (ValueError, KeyError, TypeError):
+                break
+            if "error" not in row:
+                done.add(request_id)
+            valid_bytes += len(line)
+    if valid_bytes != os.path.getsize(output_path):
+        with open(output_path, "r+b") as file:
+            file.truncate(valid_bytes)
+    return done
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    workers: int = 8,
+    llm_concurrency: int = 2,
+    amadeus_concurrency: int = 4,
+    limit: Optional[int] = None,
+    pipeline: Optional[ChatPipeline] = None,
+    shared_stages: bool = False,
+) -> dict:
+    """
+    Run every prompt in `input_path` through the chat pipeline and append results to `output_path`.
+
+    Args:
+        workers: Prompts in flight at once.
+        llm_concurrency: Prompts allowed in an LLM extraction stage at once.
+        amadeus_concurrency: Prompts allowed in an Amadeus search at once.
+        limit: Stop after this many new prompts (useful for smoke runs).
+        pipeline: Pre-built pipeline (tests and stand-in servers); its stage limits are replaced.
+        shared_stages: Use the stage queues of utils/admission.py instead of the two limits above. Only
+            meaningful when the batch runs inside the API process (with ADMISSION_CONTROL on); the CLI
+            is a process of its own, so it always uses private limits.
+
+    Returns:
+        dict: Run summary with counts, throughput and latency percentiles (ms).
+    """
+    done = load_checkpoint(output_path)
+    pipeline = pipeline or ChatPipeline(Actuator())
+    if shared_stages and admission_control_enabled:
+        # The stage queues /chat and /jobs use in this process, so the batch counts against the same capacity
+        pipeline.llm_limit, pipeline.amadeus_limit = llm_stage, amadeus_stage
+    else:
+        # Private limits: the batch waits (unbounded queue, no deadline) rather than being shed
+        pipeline.llm_limit = StageQueue("llm", llm_concurrency, max_queue=-1)
+        pipeline.amadeus_limit = StageQueue("amadeus", amadeus_concurrency, max_queue=-1)
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    latencies, errors, skipped = [], 0, 0
+
+    async def produce():
+        nonlocal skipped
+        queued = 0
+        for request_id, prompt in iter_prompts(input_path):
+            if request_id in done:
+                skipped += 1
+                continue
+            if limit is not None and queued >= limit:
+                break
+            await queue.put((request_id, prompt))
+            queued += 1
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def consume(output):
+        nonlocal errors
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            request_id, prompt = item
+            start = time.perf_counter()
+            record = {"request_id": request_id, "prompt": prompt}
+            with llm_request_scope(request_id) as llm_usage:
+                try:
+                    record.update(await pipeline.run(prompt))
+                except Exception as e:
+                    errors += 1
+                    record["error"] = f"{type(e).__name__}: {getattr(e, 'detail', None) or e}"
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            latencies.append(elapsed_ms)
+            record["latency_ms"] = round(elapsed_ms, 3)
+            record["llm_wall_ms"] = llm_usage["llm_wall_ms"]
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+    started = time.perf_counter()
+    with open(output_path, "a") as output:
+        await asyncio.gather(produce(), *(consume(output) for _ in range(workers)))
+    wall_s = time.perf_counter() - started
+
+    return {
+        "completed": len(latencies),
+        "errors": errors,
+        "skipped_from_checkpoint": skipped,
+        "wall_s": round(wall_s, 3),
+        "throughput_per_s": round(len(latencies) / wall_s, 3) if wall_s else 0.0,
+        "latency_ms": {f"p{q}": round(percentile(latencies, q), 3) for q in (50, 90, 95, 99)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of prompts")
+    parser.add_argument("-o", "--output", required=True, help="NDJSON results file (also the resume checkpoint)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--llm-concurrency", type=int, default=2)
+    parser.add_argument("--amadeus-concurrency", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    setup_logging()
+    summary = asyncio.run(run_batch(
+        args.input, args.output,
+        workers=args.workers,
+        llm_concurrency=args.llm_concurrency,
+        amadeus_concurrency=args.amadeus_concurrency,
+        limit=args.limit,
+    ))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
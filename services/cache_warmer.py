@@ -0,0 +1,319 @@
+"""
+Background refresh of the Actuator caches for popular routes.
+
+Traffic concentrates on a few hundred routes, so the warmer learns the most searched flight-offer
+queries and cheapest-date calendars from live traffic (plus any configured routes) and refreshes
+them before they expire. It only works off-peak and within its share of the Amadeus quota.
+
+    warmer = CacheWarmer()
+    warmer.start()          # from the services/api.py lifespan
+    warmer.metrics()        # served at GET /metrics/cache
+    await warmer.stop()
+"""
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter, deque
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.environment import Actuator, HTTPException
+from utils.sensors import FlightSearchQueryDetails, CheapestFlightSearchDetails
+from config.main_config import (
+    cache_warmer_routes,
+    cache_warmer_top_n,
+    cache_warmer_interval_s,
+    cache_warmer_jitter,
+    cache_warmer_off_peak_hours,
+    cache_warmer_max_live_per_minute,
+    amadeus_quota_per_hour,
+    cache_warmer_quota_share,
+)
+
+logger = logging.getLogger(__name__)
+
+# Kinds of cached lookups the warmer can replay
+STANDARD, ADVANCED, CALENDAR = "standard", "advanced", "calendar"
+
+
+def parse_hours(spec: str) -> Optional[set]:
+    """"0-6" -> {0, ..., 6}; "22-5" wraps midnight; "" -> None (any hour)."""
+    if not spec.strip():
+        return None
+    hours = set()
+    for part in spec.split(","):
+        start, _, end = part.strip().partition("-")
+        start, end = int(start), int(end or start)
+        hour = start
+        while True:
+            hours.add(hour % 24)
+            if hour % 24 == end % 24:
+                break
+            hour += 1
+    return hours
+
+
+class CacheWarmer:
+    """
+    Keeps the offer and calendar caches of `services.environment` warm for the top-N lookups.
+
+    Live traffic reports its lookups through `record_search` / `record_calendar`; each cycle the
+    warmer refreshes the most frequent ones (seen within `window_s`) whose cache entry is missing or
+    would expire before the next cycle.
+    """
+
+    def __init__(
+        self,
+        actuator: Optional[Actuator] = None,
+        routes: Optional[List[str]] = None,
+        top_n: int = cache_warmer_top_n,
+        interval_s: float = cache_warmer_interval_s,
+        jitter: float = cache_warmer_jitter,
+        off_peak_hours: str = cache_warmer_off_peak_hours,
+        max_live_per_minute: int = cache_warmer_max_live_per_minute,
+        quota_per_hour: int = amadeus_quota_per_hour,
+        quota_share: float = cache_warmer_quota_share,
+        window_s: float = 24 * 3600,
+        max_tracked: int = 20000,
+    ) -> None:
+        self.actuator = actuator or Actuator()
+        self.routes = cache_warmer_routes if routes is None else routes
+        self.top_n = top_n
+        self.interval_s = interval_s
+        self.jitter = jitter
+        self.off_peak_hours = parse_hours(off_peak_hours)
+        self.max_live_per_minute = max_live_per_minute
+        self.quota_budget = int(quota_per_hour * quota_share)
+        self.window_s = window_s
+
+        # (timestamp, kind, query) of recent live lookups, newest last
+        self._recent: deque = deque(maxlen=max_tracked)
+        # Amadeus calls spent by the warmer in the last hour
+        self._spent: deque = deque()
+        # cache key -> expiry of entries the warmer refreshed, to attribute live hits
+        self._warmed: Dict[tuple, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stats = Counter()
+
+    # --- Live traffic -----------------------------------------------------------------------
+
+    def _key_for(self, kind: str, query) -> tuple:
+        if kind == CALENDAR:
+            return self.actuator.calendar_cache_key(query)
+        if kind == ADVANCED:
+            return self.actuator.offer_cache_key(self.actuator._map_search_params(query, query.max_results))
+        return self.actuator.offer_cache_key(self.actuator._standard_search_params(query))
+
+    def _cache_for(self, kind: str):
+        return self.actuator.calendar_cache if kind == CALENDAR else self.actuator.offer_cache
+
+    def _record(self, kind: str, query) -> None:
+        key = self._key_for(kind, query)
+        self._recent.append((time.time(), kind, query))
+        self._stats["live_lookups"] += 1
+        if (self._cache_for(kind).expires_in(key) or 0) > 0 and self._warmed.get(key, 0) > time.time():
+            self._stats["warm_hits"] += 1
+
+    def record_search(self, query: FlightSearchQueryDetails, advanced: bool = False) -> None:
+        """Note a live flight-offers search (call before searching, so a warm entry counts as a hit)."""
+        self._record(ADVANCED if advanced else STANDARD, query)
+
+    def record_calendar(self, details: CheapestFlightSearchDetails) -> None:
+        """Note a live cheapest-date calendar lookup."""
+        self._record(CALENDAR, details)
+
+    # --- Scheduling -------------------------------------------------------------------------
+
+    def live_per_minute(self) -> int:
+        cutoff = time.time() - 60
+        count = 0
+        for ts, _, _ in reversed(self._recent):
+            if ts < cutoff:
+                break
+            count += 1
+        return count
+
+    def is_off_peak(self, now: Optional[datetime] = None) -> bool:
+        """Inside the configured off-peak hours, or live traffic is quiet."""
+        hour = (now or datetime.now()).hour
+        if self.off_peak_hours is None or hour in self.off_peak_hours:
+            return True
+        return self.live_per_minute() < self.max_live_per_minute
+
+    def quota_left(self) -> int:
+        cutoff = time.time() - 3600
+        while self._spent and self._spent[0] < cutoff:
+            self._spent.popleft()
+        return self.quota_budget - len(self._spent)
+
+    def _spend(self, calls: int) -> None:
+        now = time.time()
+        self._spent.extend([now] * calls)
+        self._stats["amadeus_calls"] += calls
+
+    def _refund(self, calls: int) -> None:
+        """Give back calls charged up front but not made."""
+        for _ in range(min(calls, len(self._spent))):
+            self._spent.pop()
+        self._stats["amadeus_calls"] -= calls
+
+    def popular(self) -> List[Tuple[str, object]]:
+        """The top-N live lookups in the window, most frequent first, then the configured routes."""
+        cutoff = time.time() - self.window_s
+        counts, latest = Counter(), {}
+        for ts, kind, query in self._recent:
+            if ts < cutoff:
+                continue
+            key = self._key_for(kind, query)
+            counts[key] += 1
+            latest[key] = (kind, query)
+        jobs = [latest[key] for key, _ in counts.most_common(self.top_n)]
+
+        for route in self.routes:
+            origin, _, destination = route.partition("-")
+            if origin and destination:
+                jobs.append((CALENDAR, CheapestFlightSearchDetails(origin=origin, destination=destination)))
+        return jobs
+
+    def _is_stale(self, kind: str, query) -> bool:
+        remaining = self._cache_for(kind).expires_in(self._key_for(kind, query))
+        # Refresh anything that would expire before the next cycle
+        return remaining is None or remaining < self.interval_s * (1 + self.jitter)
+
+    def _is_past(self, kind: str, query) -> bool:
+        day = query.departure_date if kind != CALENDAR else (query.departure_date or "").split(",")[-1]
+        try:
+            return bool(day) and date.fromisoformat(day) < date.today()
+        except ValueError:
+            return True
+
+    async def _refresh(self, kind: str, query) -> Optional[object]:
+        # Calls are charged before they are made, so a refresh that fails still counts against the quota
+        if kind == CALENDAR:
+            # Worst case is the per-day fallback search; the unused part is refunded on success
+            cost = 1 + self.actuator.CALENDAR_FALLBACK_MAX_DAYS
+            if self.quota_left() < cost:
+                return None
+            self._spend(cost)
+            result = await self.actuator.get_cheapest_date_calendar(query, refresh=True)
+            self._refund(cost - 1 - (len(self.actuator._fallback_days(query)) if result.source == "flight-offers" else 0))
+            self._stats["refreshed_calendars"] += 1
+        else:
+            if self.quota_left() < 1:
+                return None
+            self._spend(1)
+            if kind == ADVANCED:
+                result = await self.actuator.search_flights_advanced(query, max_results=query.max_results, refresh=True)
+            else:
+                result = await self.actuator.search_flights_on_a_date(query, refresh=True)
+            self._stats["refreshed_offers"] += 1
+        key = self._key_for(kind, query)
+        expires_in = self._cache_for(kind).expires_in(key)
+        if expires_in and expires_in > 0:
+            self._warmed[key] = time.time() + expires_in
+        return result
+
+    async def run_cycle(self) -> int:
+        """Refresh the stale popular lookups within the remaining quota; returns how many were refreshed."""
+        self._stats["cycles"] += 1
+        now = time.time()
+        self._warmed = {key: exp for key, exp in self._warmed.items() if exp > now}
+
+        refreshed = 0
+        for kind, query in self.popular():
+            if self.quota_left() <= 0:
+                self._stats["quota_exhausted"] += 1
+                break
+            if self._is_past(kind, query) or not self._is_stale(kind, query):
+                continue
+            try:
+                result = await self._refresh(kind, query)
+            except HTTPException as e:
+                self._stats["errors"] += 1
+                logger.warning("Cache warmer: %s refresh failed: %s", kind, e.detail)
+                continue
+            if result is None:
+                continue
+            refreshed += 1
+            # A configured route also warms the offers for its cheapest day
+            if kind == CALENDAR and result.cheapest() is not None and not query.departure_date:
+                cheapest = result.cheapest()
+                offers_query = FlightSearchQueryDetails(
+                    origin_iata=query.origin, destination_iata=query.destination,
+                    departure_date=cheapest.departure_date, return_date=cheapest.return_date,
+                )
+                if self._is_stale(STANDARD, offers_query) and self.quota_left() >= 1:
+                    try:
+                        await self._refresh(STANDARD, offers_query)
+                        refreshed += 1
+                    except HTTPException as e:
+                        self._stats["errors"] += 1
+                        logger.warning("Cache warmer: offers refresh failed: %s", e.detail)
+            # Spread the calls out instead of bursting the quota
+            await asyncio.sleep(random.uniform(0, self.jitter))
+        return refreshed
+
+    async def _run(self) -> None:
+        while True:
+            if self.is_off_peak():
+                try:
+                    await self.run_cycle()
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    logger.exception("Cache warmer cycle failed: %s", e)
+            else:
+                self._stats["skipped_peak"] += 1
+            await asyncio.sleep(self.interval_s * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    # --- Controls ---------------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def metrics(self) -> dict:
+        lookups = self._stats["live_lookups"]
+        return {
+            "running": self.running,
+            "cycles": self._stats["cycles"],
+            "skipped_peak": self._stats["skipped_peak"],
+            "refreshed_offers": self._stats["refreshed_offers"],
+            "refreshed_calendars": self._stats["refreshed_calendars"],
+            "errors": self._stats["errors"],
+            "quota": {
+                "budget_per_hour": self.quota_budget,
+                "used_last_hour": self.quota_budget - self.quota_left(),
+                "amadeus_calls_total": self._stats["amadeus_calls"],
+                "exhausted_cycles": self._stats["quota_exhausted"],
+            },
+            "live_lookups": lookups,
+            "warm_hits": self._stats["warm_hits"],
+            "warm_hit_ratio": round(self._stats["warm_hits"] / lookups, 4) if lookups else 0.0,
+            "tracked_lookups": len(self._recent),
+            "offer_cache": self.actuator.offer_cache.stats(),
+            "calendar_cache": self.actuator.calendar_cache.stats(),
+        }
+
+
+# Shared by the chat pipeline (which reports lookups) and the api lifespan (which runs it)
+cache_warmer = CacheWarmer()
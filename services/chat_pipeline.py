@@ -0,0 +1,444 @@
+import asyncio
+import logging
+import os
+import sys
+from contextlib import nullcontext
+from datetime import date, timedelta
+from typing import AsyncIterator, Optional, Tuple
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sensors import (UserIntent, FetchIntent, FlightSearchQueryDetails, CheapestFlightSearchDetails,
+                           FlightDatePrice, InspirationSearchDetails, HotelSearchQueryDetails, DateRangeDetails,
+                           RefinementDetails)
+from utils.prompts import (fetch_standard_flight_details, fetch_intent_of_the_query, fetch_local_intent,
+                           fetch_date_range_from_query, fetch_inspiration_details, fetch_hotel_details)
+from utils.date_resolver import resolve_date_expression
+from utils.airports import get_airport_index
+from services.environment import Actuator, HTTPException
+from services.cache_warmer import cache_warmer
+from utils.output_reader import flight_offer_list_reader, read_flight_offer_
+from utils.metrics import stage_seconds
+from utils.tracing import span
+from utils.refinement import parse_refinement
+from utils.session_store import ChatSession, session_store
+from utils.admission import Overloaded, llm_stage, amadeus_stage
+from config.main_config import trip_flight_deadline_s, trip_hotel_deadline_s, trip_max_packages, admission_control_enabled
+
+FALLBACK_RESPONSE = "I am a specialized Travel Agent. Currently, I can help you find flights. Try asking: 'Find me cheapest flights from Delhi to Mumbai tomorrow'."
+NO_FLIGHTS_RESPONSE = "I couldn't find any flights matching your criteria."
+NO_DESTINATIONS_RESPONSE = "I couldn't find any destinations matching your criteria."
+NO_TRIP_RESPONSE = "I couldn't put together a trip for this request."
+
+logger = logging.getLogger(__name__)
+
+
+class ChatPipeline:
+    """
+    The intent -> extraction -> Actuator -> render pipeline behind /chat.
+
+    The LLM extractors are synchronous, so they run in worker threads to keep the event loop free.
+    Optional semaphores (or the admission-controlled stage queues of utils/admission.py) bound how
+    many prompts may be in the LLM and Amadeus stages at once.
+    """
+
+    def __init__(
+        self,
+        actuator: Optional[Actuator] = None,
+        llm_limit: Optional[asyncio.Semaphore] = None,
+        amadeus_limit: Optional[asyncio.Semaphore] = None,
+    ) -> None:
+        self.actuator = actuator or Actuator()
+        self.llm_limit = llm_limit or nullcontext()
+        self.amadeus_limit = amadeus_limit or nullcontext()
+
+    async def detect_intent(self, prompt: str) -> FetchIntent:
+        """Intent from the local classifier; only prompts it is unsure of wait for an LLM slot."""
+        with stage_seconds.labels("local_intent").time():
+            local_intent = await asyncio.to_thread(fetch_local_intent, prompt)
+        if local_intent is not None:
+            return local_intent
+        async with self.llm_limit:
+            with stage_seconds.labels("llm_intent").time():
+                return await asyncio.to_thread(fetch_intent_of_the_query, prompt, None, False)
+
+    async def extract_flight_details(self, prompt: str) -> FlightSearchQueryDetails:
+        async with self.llm_limit:
+            with stage_seconds.labels("llm_extraction").time():
+                return await asyncio.to_thread(fetch_standard_flight_details, prompt)
+
+    async def extract_inspiration_details(self, prompt: str, user_intent: FetchIntent) -> InspirationSearchDetails:
+        async with self.llm_limit:
+            with stage_seconds.labels("llm_extraction").time():
+                details = await asyncio.to_thread(fetch_inspiration_details, prompt)
+        if len(details.origin_iata) != 3 or not details.origin_iata.isupper():
+            # The LLM sometimes returns the city name instead of its code
+            airports = get_airport_index().resolve(details.origin_iata)
+            if airports:
+                details = details.model_copy(update={"origin_iata": airports[0].code})
+        # A month the date resolver already found locally ("in March") narrows the destinations
+        dates = user_intent.date_range_details
+        if not details.departure_month and dates and dates.start_date and dates.end_date \
+                and dates.start_date[:7] == dates.end_date[:7]:
+            details = details.model_copy(update={"departure_month": dates.start_date[:7]})
+        return details
+
+    async def search_anywhere(self, prompt: str, user_intent: FetchIntent) -> dict:
+        """Cheapest destinations from the origin in the prompt, answered from the cached destination index."""
+        details = await self.extract_inspiration_details(prompt, user_intent)
+        async with self.amadeus_limit:
+            res = await self.actuator.search_flight_inspiration(details)
+        intent_str = user_intent.intent.value
+        if not res.get("data"):
+            return {"response": NO_DESTINATIONS_RESPONSE, "data": [], "intent": intent_str}
+        return {
+            "response": f"Found {len(res['data'])} destinations from {res['origin']}.",
+            "data": res["data"],
+            "intent": intent_str,
+        }
+
+    async def extract_hotel_details(self, prompt: str) -> HotelSearchQueryDetails:
+        async with self.llm_limit:
+            with stage_seconds.labels("llm_extraction").time():
+                return await asyncio.to_thread(fetch_hotel_details, prompt)
+
+    @staticmethod
+    def _trip_dates(prompt: str, user_intent: FetchIntent) -> Tuple[Optional[str], Optional[str]]:
+        """Outbound and return dates of a trip from the locally resolved date expression."""
+        dates: Optional[DateRangeDetails] = user_intent.date_range_details or resolve_date_expression(prompt)
+        if dates is None or not dates.start_date:
+            return None, None
+        end = dates.end_date if dates.end_date and dates.end_date > dates.start_date else None
+        return dates.start_date, end
+
+    async def _trip_flights(self, prompt: str, start: Optional[str], end: Optional[str]) -> list:
+        details = await self.extract_flight_details(prompt)
+        # The warmer keys advanced searches on max_results, so record exactly what is searched
+        update = {"max_results": trip_max_packages}
+        if start and not details.departure_date:
+            update["departure_date"] = start
+        if end and not details.return_date:
+            update["return_date"] = end
+        details = details.model_copy(update=update)
+        cache_warmer.record_search(details, advanced=True)
+        async with self.amadeus_limit:
+            res = await self.actuator.search_flights_advanced(details, max_results=details.max_results)
+        if res.get("error"):
+            raise HTTPException(status_code=502, detail=res["error"])
+        return res["results"].get("data", [])
+
+    async def _trip_hotels(self, prompt: str, start: Optional[str], end: Optional[str]) -> list:
+        details = await self.extract_hotel_details(prompt)
+        update = {"max_results": trip_max_packages}
+        if len(details.city_code) != 3 or not details.city_code.isupper():
+            # The LLM sometimes returns the city name instead of its code
+            airports = get_airport_index().resolve(details.city_code)
+            if airports:
+                update["city_code"] = airports[0].code
+        check_in = details.check_in_date or start
+        if check_in and not details.check_out_date:
+            update["check_in_date"] = check_in
+            update["check_out_date"] = end or (date.fromisoformat(check_in) + timedelta(days=1)).isoformat()
+        details = details.model_copy(update=update)
+        async with self.amadeus_limit:
+            res = await self.actuator.search_hotel_offers(details)
+        return res["results"].get("data", [])
+
+    async def plan_trip(self, prompt: str, user_intent: FetchIntent) -> dict:
+        """
+        Flights and hotels for a trip, searched concurrently, combined into packages ranked by total cost.
+
+        Each branch (extraction + search) has its own deadline; if one fails or times out the other
+        branch's results are still returned on their own.
+        """
+        start, end = self._trip_dates(prompt, user_intent)
+        flights, hotels = await asyncio.gather(
+            asyncio.wait_for(self._trip_flights(prompt, start, end), trip_flight_deadline_s),
+            asyncio.wait_for(self._trip_hotels(prompt, start, end), trip_hotel_deadline_s),
+            return_exceptions=True,
+        )
+        shed = [result for result in (flights, hotels) if isinstance(result, Overloaded)]
+        if len(shed) == 2:
+            # Nothing to degrade to: let the caller answer 429/503
+            raise shed[0]
+        intent_str = user_intent.intent.value
+        failed = []
+        for name, result in (("flight", flights), ("hotel", hotels)):
+            if isinstance(result, BaseException):
+                reason = "timed out" if isinstance(result, asyncio.TimeoutError) else getattr(result, "detail", None) or result
+                logger.warning("Trip %s search failed: %s", name, reason)
+                failed.append(name)
+        flights = [] if "flight" in failed else flights
+        hotels = [] if "hotel" in failed else hotels
+
+        packages = []
+        for offer in flights:
+            flight_price = float(offer.get("price", {}).get("grandTotal") or offer.get("price", {}).get("total") or 0)
+            flight_currency = offer.get("price", {}).get("currency")
+            for hotel in hotels:
+                if hotel.get("currency") != flight_currency:
+                    continue
+                packages.append({
+                    "total_price": round(flight_price + hotel["price"], 2),
+                    "currency": flight_currency,
+                    "flight": read_flight_offer_(offer),
+                    "hotel": hotel,
+                })
+        packages.sort(key=lambda p: p["total_price"])
+        packages = packages[:trip_max_packages]
+
+        if packages:
+            response = f"Found {len(packages)} flight + hotel packages for your trip."
+        elif flights or hotels:
+            # Degraded: only one branch came back, or no flight and hotel share a currency
+            packages = [{"flight": read_flight_offer_(offer), "hotel": None} for offer in flights] + \
+                       [{"flight": None, "hotel": hotel} for hotel in hotels]
+            if flights and hotels:
+                response = (f"Found {len(flights)} flights and {len(hotels)} hotels for your trip, but they are "
+                            "priced in different currencies, so they could not be combined into packages.")
+            else:
+                found = f"{len(flights)} flights" if flights else f"{len(hotels)} hotels"
+                missing = " and ".join(failed) or ("hotel" if flights else "flight")
+                response = f"Found {found} for your trip, but the {missing} search did not return results."
+        else:
+            response = NO_TRIP_RESPONSE
+        return {"response": response, "data": packages, "intent": intent_str}
+
+    async def resolve_flexible_dates(
+        self, prompt: str, flight_details: FlightSearchQueryDetails, user_intent: FetchIntent
+    ) -> Tuple[FlightSearchQueryDetails, Optional[FlightDatePrice]]:
+        """
+        Pin a flexible-date request ("sometime next month") to its cheapest day with one calendar lookup.
+
+        The window comes from the intent's date range details; the date extractor is only asked when
+        the intent has none. Returns the flight details with departure/return dates replaced by the
+        cheapest ones, or unchanged (and None) if the window or the route cannot be priced.
+        """
+        date_range = user_intent.date_range_details
+        if date_range is None:
+            date_range = await asyncio.to_thread(fetch_date_range_from_query, prompt)
+        if not (date_range.is_range and date_range.start_date and date_range.end_date):
+            return flight_details, None
+        if len(flight_details.origin_iata) != 3 or len(flight_details.destination_iata) != 3:
+            return flight_details, None
+
+        stay = None
+        if flight_details.departure_date and flight_details.return_date:
+            try:
+                stay = (date.fromisoformat(flight_details.return_date) - date.fromisoformat(flight_details.departure_date)).days
+            except ValueError:
+                stay = None
+        details = CheapestFlightSearchDetails(
+            origin=flight_details.origin_iata,
+            destination=flight_details.destination_iata,
+            departure_date=f"{date_range.start_date},{date_range.end_date}",
+            one_way=not stay,
+            duration=str(stay) if stay else None,
+            non_stop=flight_details.non_stop,
+            max_price=flight_details.max_price,
+            currency=flight_details.currency,
+        )
+        cache_warmer.record_calendar(details)
+        try:
+            async with self.amadeus_limit:
+                calendar = await self.actuator.get_cheapest_date_calendar(details)
+        except HTTPException as e:
+            logger.warning("Cheapest date lookup failed, searching the extracted dates: %s", e.detail)
+            return flight_details, None
+        cheapest = calendar.cheapest()
+        if cheapest is None:
+            return flight_details, None
+        update = {"departure_date": cheapest.departure_date, "return_date": cheapest.return_date}
+        return flight_details.model_copy(update=update), cheapest
+
+    async def iter_flight_results(self, user_intent: FetchIntent, flight_details: FlightSearchQueryDetails) -> AsyncIterator[dict]:
+        """
+        Flight search results as they arrive.
+
+        A nearby-airports search yields the merged offers each time another airport pair returns;
+        any other search yields its single result.
+        """
+        advanced = user_intent.intent == UserIntent.FIND_FLIGHTS_ADVANCED
+        cached = not flight_details.search_nearby_airports and self.actuator.has_cached_flight_offers(flight_details, advanced)
+        # Searches the offer cache answers skip the Amadeus limit, i.e. they go ahead of its queue
+        async with (nullcontext() if cached else self.amadeus_limit):
+            if flight_details.search_nearby_airports:
+                async for res in self.actuator.iter_flights_metro_fanout(flight_details, max_results=flight_details.max_results):
+                    yield res
+                return
+            cache_warmer.record_search(flight_details, advanced=advanced)
+            if advanced:
+                yield await self.actuator.search_flights_advanced(flight_details, max_results=flight_details.max_results,
+                                                                  render=True)
+            else:
+                yield await self.actuator.search_flights_on_a_date(flight_details, render=True)
+
+    async def search_flights(self, user_intent: FetchIntent, flight_details: FlightSearchQueryDetails) -> dict:
+        res = {}
+        async for res in self.iter_flight_results(user_intent, flight_details):
+            pass
+        return res
+
+    @staticmethod
+    def _fetched_filters(user_intent: FetchIntent, flight_details: FlightSearchQueryDetails) -> RefinementDetails:
+        """Filters the upstream search itself applied, i.e. what a follow-up can only loosen by searching again."""
+        advanced = flight_details.search_nearby_airports or user_intent.intent == UserIntent.FIND_FLIGHTS_ADVANCED
+        return RefinementDetails(
+            max_stops=0 if flight_details.non_stop else (2 if advanced else None),
+            min_bookable_seats=1 if advanced else None,
+            instant_ticketing_required=flight_details.instant_ticketing_required if advanced else None,
+            max_results=flight_details.max_results or 10,
+        )
+
+    @staticmethod
+    def _needs_search(session: ChatSession, view: RefinementDetails) -> bool:
+        """True if the cached offers cannot answer `view`: a filter was loosened, or more offers were asked for."""
+        fetched = session.fetched
+        if view.max_stops is not None and fetched.max_stops is not None and view.max_stops > fetched.max_stops:
+            return True
+        if view.min_bookable_seats is not None and fetched.min_bookable_seats is not None \
+                and view.min_bookable_seats < fetched.min_bookable_seats:
+            return True
+        if fetched.instant_ticketing_required and view.instant_ticketing_required is False:
+            return True
+        # Fewer offers than requested upstream means there are no more to fetch
+        return bool(view.max_results) and view.max_results > len(session.offers) >= (fetched.max_results or 10)
+
+    async def _flight_events(
+        self,
+        user_intent: FetchIntent,
+        flight_details: FlightSearchQueryDetails,
+        cheapest: Optional[FlightDatePrice] = None,
+        session_id: Optional[str] = None,
+        view: Optional[RefinementDetails] = None,
+    ) -> AsyncIterator[dict]:
+        """Search, stream the rendered offers (re-ranked by `view`), remember them in the session and finish."""
+        intent_str = user_intent.intent.value
+        offers, raw = None, []
+        async for res in self.iter_flight_results(user_intent, flight_details):
+            if 'data' in (res.get('results') or {}):
+                raw = res['results']['data']
+                if view is None and res.get('rendered') is not None:
+                    # Rendered with the decode/filter/sort, possibly off the event loop
+                    offers = res['rendered']
+                else:
+                    shown = self.actuator.refine_flight_offers(raw, **view.model_dump()) if view else raw
+                    with stage_seconds.labels("render").time(), span("render"):
+                        offers = flight_offer_list_reader(shown)
+                yield {"event": "offers", "data": offers}
+
+        if session_id and offers is not None:
+            session_store.save(ChatSession(
+                session_id=session_id, intent=intent_str, details=flight_details, offers=raw,
+                fetched=self._fetched_filters(user_intent, flight_details), view=view or RefinementDetails(),
+            ))
+        if offers is None:
+            yield {"event": "done", "response": NO_FLIGHTS_RESPONSE, "data": [], "intent": intent_str}
+            return
+        response = f"Found {len(offers)} flights for your request."
+        if cheapest is not None:
+            price = " ".join(filter(None, [f"{cheapest.price:g}", cheapest.currency]))
+            response = f"The cheapest day to fly is {cheapest.departure_date} (from {price}). {response}"
+        yield {"event": "done", "response": response, "data": offers, "intent": intent_str}
+
+    async def refine_events(self, session: ChatSession, refinement: RefinementDetails) -> AsyncIterator[dict]:
+        """
+        Answer a follow-up that only re-sorts or re-filters the session's last search.
+
+        The cached offers are re-filtered and re-sorted locally; only a loosened upstream filter (e.g.
+        allowing stops after a non-stop search) or a request for more offers than were fetched searches
+        again, and that search skips the LLM since the details are already known.
+        """
+        yield {"event": "intent", "intent": session.intent, "confidence": None,
+               "refinement": refinement.model_dump(mode="json", exclude_none=True)}
+        view = session.view.model_copy(update=refinement.model_dump(exclude_none=True))
+
+        if self._needs_search(session, view):
+            update = {"max_results": max(view.max_results or 0, session.details.max_results or 10)}
+            if view.max_stops is not None and view.max_stops > 0:
+                update["non_stop"] = False
+            details = session.details.model_copy(update=update)
+            yield {"event": "parameters", "details": details.model_dump(mode="json")}
+            async for event in self._flight_events(FetchIntent(intent=session.intent), details,
+                                                   session_id=session.session_id, view=view):
+                yield event
+            return
+
+        offers = self.actuator.refine_flight_offers(session.offers, **view.model_dump())
+        with stage_seconds.labels("render").time(), span("render"):
+            rendered = flight_offer_list_reader(offers)
+        session_store.save(session.model_copy(update={"view": view}))
+        yield {"event": "offers", "data": rendered}
+        response = f"Found {len(rendered)} flights for your request." if rendered else NO_FLIGHTS_RESPONSE
+        yield {"event": "done", "response": response, "data": rendered, "intent": session.intent}
+
+    async def run_events(self, prompt: str, session_id: Optional[str] = None) -> AsyncIterator[dict]:
+        """
+        Answer a prompt stage by stage, for streaming clients (POST /chat/stream).
+
+        Yields events in order: "intent", "parameters" (flight searches), "calendar" (flexible dates),
+        "offers" (the rendered offers so far, once per upstream result) and a final "done" carrying
+        the `ChatResponse` fields. With a `session_id`, flight searches are remembered and follow-ups
+        that only re-sort or re-filter them are answered by `refine_events`.
+        """
+        session = session_store.get(session_id) if session_id else None
+        if session is not None:
+            refinement = parse_refinement(prompt)
+            if refinement is not None:
+                async for event in self.refine_events(session, refinement):
+                    yield event
+                return
+
+        user_intent = await self.detect_intent(prompt)
+        intent_str = user_intent.intent.value
+        yield {"event": "intent", "intent": intent_str, "confidence": user_intent.confidence}
+
+        if user_intent.intent in (UserIntent.FIND_FLIGHTS_ANYWHERE, UserIntent.PLAN_TRIP):
+            if user_intent.intent == UserIntent.FIND_FLIGHTS_ANYWHERE:
+                result = await self.search_anywhere(prompt, user_intent)
+            else:
+                result = await self.plan_trip(prompt, user_intent)
+            if result["data"]:
+                yield {"event": "offers", "data": result["data"]}
+            yield {"event": "done", **result}
+            return
+
+        if user_intent.intent not in (UserIntent.FIND_FLIGHTS_ADVANCED, UserIntent.FIND_FLIGHTS_STANDARD):
+            # Fallback for "OTHER" or unhandled intents
+            yield {"event": "done", "response": FALLBACK_RESPONSE, "data": [], "intent": intent_str}
+            return
+
+        flight_details = await self.extract_flight_details(prompt)
+        yield {"event": "parameters", "details": flight_details.model_dump(mode="json")}
+        cheapest = None
+        if user_intent.date_range:
+            flight_details, cheapest = await self.resolve_flexible_dates(prompt, flight_details, user_intent)
+            if cheapest is not None:
+                yield {"event": "calendar", "cheapest": cheapest.model_dump(mode="json"),
+                       "details": flight_details.model_dump(mode="json")}
+
+        async for event in self._flight_events(user_intent, flight_details, cheapest, session_id):
+            yield event
+
+    async def run(self, prompt: str, session_id: Optional[str] = None) -> dict:
+        """Answer a prompt; returns the fields of `ChatResponse` (response, data, intent and the session_id, if any)."""
+        result = {"response": NO_FLIGHTS_RESPONSE, "data": [], "intent": UserIntent.OTHER.value}
+        async for event in self.run_events(prompt, session_id):
+            if event["event"] == "done":
+                result = {"response": event["response"], "data": event["data"], "intent": event["intent"]}
+                break
+        if session_id:
+            result["session_id"] = session_id
+        return result
+
+
+def admitted_pipeline(actuator: Optional[Actuator] = None) -> ChatPipeline:
+    """
+    A pipeline whose LLM and Amadeus calls go through the process-wide stage queues of
+    utils/admission.py, so /chat, /jobs and any other caller share one view of downstream capacity.
+    A plain pipeline with ADMISSION_CONTROL off.
+    """
+    if not admission_control_enabled:
+        return ChatPipeline(actuator)
+    return ChatPipeline(actuator, llm_limit=llm_stage, amadeus_limit=amadeus_stage)
@@ -1,10 +1,13 @@
 import asyncio
+import logging
 import os
 import sys
 import time
 import re
+import json
+import math
 import httpx
-from datetime import datetime
+from datetime import datetime, date, timedelta, timezone
 from dotenv import load_dotenv
 try:
     from fastapi import HTTPException
@@ -22,8 +25,74 @@ load_dotenv(dotenv_path)
 
 # Ensure utils can be imported
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from typing import Optional
-from utils.sensors import FlightSearchQueryDetails, SortBy, HotelSearchQueryDetails
+from typing import Optional, List, AsyncIterator
+from utils.sensors import (FlightSearchQueryDetails, SortBy, HotelSearchQueryDetails, CheapestFlightSearchDetails,
+                           FlightDatePrice, CheapestDateCalendar, InspirationSearchDetails, FlightDestination)
+from utils.destination_index import DestinationIndex
+from utils.hotel_index import HotelGeoIndex, to_km
+from utils.airports import get_airport_index
+from utils.ttl_cache import TTLCache
+from utils.rate_limiter import amadeus_rate_limiter
+from utils.offer_store import get_offer_store
+from config.main_config import offer_store_enabled
+from utils.metrics import (registry, cache_collector, stage_seconds, amadeus_request_seconds, amadeus_responses_total,
+                           amadeus_requests_in_flight)
+from utils.tracing import span, record_span
+from utils.offload import offloader
+from utils.output_reader import flight_offer_list_reader
+
+# Cheapest-date calendars are precomputed upstream and change slowly, so they are cached per route
+# for hours and shared by every Actuator in the process.
+calendar_cache = TTLCache(ttl=int(os.getenv("CALENDAR_CACHE_TTL", "21600")),
+                          max_entries=int(os.getenv("CALENDAR_CACHE_MAX_ENTRIES", "2048")))
+# Flight Inspiration Search results are precomputed upstream too; one DestinationIndex per origin
+inspiration_cache = TTLCache(ttl=int(os.getenv("INSPIRATION_CACHE_TTL", "21600")),
+                             max_entries=int(os.getenv("INSPIRATION_CACHE_MAX_ENTRIES", "512")))
+# Hotel List results are reference data: one HotelGeoIndex per city, kept for a week
+hotel_list_cache = TTLCache(ttl=int(os.getenv("HOTEL_LIST_CACHE_TTL", str(7 * 24 * 3600))),
+                            max_entries=int(os.getenv("HOTEL_LIST_CACHE_MAX_ENTRIES", "256")))
+# Raw flight-offers responses per exact query. Prices move, so the TTL is short and results served
+# from the cache carry `meta.cached_at`; the cache warmer (services/cache_warmer.py) keeps popular
+# queries fresh. OFFER_CACHE_TTL=0 turns it off.
+offer_cache = TTLCache(ttl=int(os.getenv("OFFER_CACHE_TTL", "120")),
+                       max_entries=int(os.getenv("OFFER_CACHE_MAX_ENTRIES", "4096")))
+registry.register_collector(cache_collector({
+    "offers": offer_cache, "calendar": calendar_cache, "inspiration": inspiration_cache, "hotel_list": hotel_list_cache,
+}))
+
+logger = logging.getLogger(__name__)
+
+
+def _offer_id(offer) -> Optional[str]:
+    """The offer's id for log messages (logging whole offers floods the log under load)."""
+    return offer.get("id") if isinstance(offer, dict) else None
+
+
+_processor: Optional["Actuator"] = None
+
+
+def process_flight_offers(text: str, max_stops: Optional[int] = None, min_seats: Optional[int] = None,
+                          instant_ticketing: bool = False, sort_by: Optional[SortBy] = None, render: bool = False) -> dict:
+    """
+    Decode a flight-offers response body, filter and sort its offers, and optionally render them.
+
+    A module-level function of plain arguments so utils/offload.py can run it in a worker thread or
+    process. Returns {"results": decoded body with the processed offers, "rendered": rendered offers or None,
+    "render_s": seconds spent rendering}; the worker times rendering since the caller only sees the whole call.
+    """
+    global _processor
+    if _processor is None:
+        _processor = Actuator()
+    data = json.loads(text)
+    results = _processor._filter_flight_offers(data.get("data", []), max_stops, min_seats, instant_ticketing)
+    if "data" in data:
+        data["data"] = _processor._sort_flight_offers(results, sort_by)
+    rendered, render_s = None, 0.0
+    if render and "data" in data:
+        start = time.perf_counter()
+        rendered = flight_offer_list_reader(data["data"])
+        render_s = time.perf_counter() - start
+    return {"results": data, "rendered": rendered, "render_s": render_s}
 
 
 # @tool
@@ -38,6 +107,24 @@ class Actuator:
         self.AMADEUS_KEY = os.getenv("AMADEUS_KEY", "YOUR_AMADEUS_KEY")
         self.AMADEUS_SECRET = os.getenv("AMADEUS_SECRET", "YOUR_AMADEUS_SECRET")
         self._token_cache = {"token": None, "exp": 0}
+        # Cap on origin x destination airport pairs searched by search_flights_metro_fanout
+        self.METRO_FANOUT_MAX_PAIRS = int(os.getenv("METRO_FANOUT_MAX_PAIRS", "6"))
+        self.calendar_cache = calendar_cache
+        self.offer_cache = offer_cache
+        self.inspiration_cache = inspiration_cache
+        self.hotel_list_cache = hotel_list_cache
+        # Radius (km) fetched on a cold hotel list so later, larger radius queries stay local (API max 300)
+        self.HOTEL_LIST_FETCH_RADIUS_KM = float(os.getenv("HOTEL_LIST_FETCH_RADIUS_KM", "50"))
+        # Largest radius the Hotel List API accepts
+        self.HOTEL_LIST_MAX_RADIUS_KM = 300.0
+        # Per-day offer search used when flight-dates has nothing for a route: live prices, so a shorter TTL
+        self.CALENDAR_FALLBACK_TTL = int(os.getenv("CALENDAR_FALLBACK_TTL", "1800"))
+        self.CALENDAR_FALLBACK_MAX_DAYS = int(os.getenv("CALENDAR_FALLBACK_MAX_DAYS", "14"))
+        self.CALENDAR_FALLBACK_CONCURRENCY = int(os.getenv("CALENDAR_FALLBACK_CONCURRENCY", "4"))
+        self.rate_limiter = amadeus_rate_limiter
+        # Hotel offers are fetched for the Hotel List result in chunks of hotel IDs
+        self.HOTEL_OFFERS_CHUNK_SIZE = int(os.getenv("HOTEL_OFFERS_CHUNK_SIZE", "20"))
+        self.HOTEL_OFFERS_CONCURRENCY = int(os.getenv("HOTEL_OFFERS_CONCURRENCY", "3"))
 
     async def get_amadeus_token(self):
         """Authenticate and return a cached Amadeus token."""
@@ -45,19 +132,22 @@ class Actuator:
             return self._token_cache["token"]
 
         async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{self.AMADEUS_BASE}/v1/security/oauth2/token",
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": self.AMADEUS_KEY,
-                    "client_secret": self.AMADEUS_SECRET,
-                },
-            )
+            start = time.perf_counter()
+            with span("amadeus.token"):
+                resp = await client.post(
+                    f"{self.AMADEUS_BASE}/v1/security/oauth2/token",
+                    headers={"Content-Type": "application/x-www-form-urlencoded"},
+                    data={
+                        "grant_type": "client_credentials",
+                        "client_id": self.AMADEUS_KEY,
+                        "client_secret": self.AMADEUS_SECRET,
+                    },
+                )
+            stage_seconds.labels("token_fetch").observe(time.perf_counter() - start)
+            amadeus_responses_total.labels("/v1/security/oauth2/token", resp.status_code).inc()
 
         if resp.status_code != 200:
-            # Print error for better visibility during testing
-            print(f"Auth Error: {resp.status_code} - {resp.text}")
+            logger.error("Amadeus auth failed: %s", resp.text[:500], extra={"status": resp.status_code})
             raise HTTPException(status_code=500, detail=f"Amadeus auth failed: {resp.text}")
 
         j = resp.json()
@@ -67,6 +157,21 @@ class Actuator:
         }
         return self._token_cache["token"]
 
+    async def _amadeus_get(self, path: str, token: str, params: dict) -> httpx.Response:
+        """GET an Amadeus API path under the shared rate limiter, recording latency and status per endpoint."""
+        with span(f"amadeus.{path.rsplit('/', 1)[-1]}", endpoint=path) as upstream:
+            async with self.rate_limiter, httpx.AsyncClient() as client:
+                with amadeus_requests_in_flight.track_inprogress():
+                    start = time.perf_counter()
+                    r = await client.get(f"{self.AMADEUS_BASE}{path}", headers={"Authorization": f"Bearer {token}"},
+                                         params=params)
+            upstream.set_attribute("http.status_code", r.status_code)
+        elapsed = time.perf_counter() - start
+        amadeus_request_seconds.labels(path).observe(elapsed)
+        stage_seconds.labels("amadeus").observe(elapsed)
+        amadeus_responses_total.labels(path, r.status_code).inc()
+        return r
+
     def _parse_duration(self, duration_str: str) -> int:
         """Parse PTxxHxxM format to minutes."""
         match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?', duration_str)
@@ -76,7 +181,8 @@ class Actuator:
         minutes = int(match.group(2)) if match.group(2) else 0
         return hours * 60 + minutes
 
-    async def search_flights_on_a_date(self, flight_search_query_object: FlightSearchQueryDetails) -> dict:
+    async def search_flights_on_a_date(self, flight_search_query_object: FlightSearchQueryDetails, refresh: bool = False,
+                                       render: bool = False) -> dict:
         """
         Search for flights matching specific criteria on a given date.
         
@@ -85,13 +191,48 @@ class Actuator:
         
         Args:
             flight_search_query_object (FlightSearchQueryDetails): Object containing search parameters.
+            refresh (bool): Bypass the offer cache and store the fresh response.
+            render (bool): Also return the offers rendered by `flight_offer_list_reader` under "rendered".
             
         Returns:
             dict: Raw dictionary response from the Amadeus API containing flight offers.
         """
-        token = await self.get_amadeus_token()
-        url = f"{self.AMADEUS_BASE}/v2/shopping/flight-offers"
-        
+        params = self._standard_search_params(flight_search_query_object)
+        status_code, text, cached_at = await self._fetch_flight_offers(params, refresh=refresh)
+
+        if status_code != 200:
+             raise HTTPException(status_code=status_code, detail=f"Amadeus search failed: {text}")
+
+        processed = await self._process_flight_offers(text, None, None, False, None, render)
+        self._mark_cached(processed["results"], cached_at)
+        result = {"source": "amadeus", "results": processed["results"]}
+        if render:
+            result["rendered"] = processed["rendered"]
+        return result
+
+    @staticmethod
+    async def _process_flight_offers(text: str, max_stops: Optional[int], min_seats: Optional[int],
+                                     instant_ticketing: bool, sort_by: Optional[SortBy], render: bool) -> dict:
+        """
+        `process_flight_offers` on the offload executor, recorded as the filter_sort and render stages.
+
+        The render span is a child of filter_sort, since both run in the one offloaded call.
+        """
+        executor = offloader.executor_for(len(text))
+        with span("filter_sort", bytes=len(text), executor=executor):
+            start = time.perf_counter()
+            processed = await offloader.run(len(text), process_flight_offers, text, max_stops, min_seats,
+                                            instant_ticketing, sort_by, render)
+            elapsed = time.perf_counter() - start
+            if render:
+                record_span("render", processed["render_s"], executor=executor)
+        stage_seconds.labels("filter_sort").observe(elapsed - processed["render_s"])
+        if render:
+            stage_seconds.labels("render").observe(processed["render_s"])
+        return processed
+
+    def _standard_search_params(self, flight_search_query_object: FlightSearchQueryDetails) -> dict:
+        """Flight-offers parameters of `search_flights_on_a_date`."""
         # Base parameters
         params = {
             "originLocationCode": flight_search_query_object.origin_iata,
@@ -109,14 +250,46 @@ class Actuator:
             params["travelClass"] = flight_search_query_object.travel_class
         if flight_search_query_object.non_stop:
             params["nonStop"] = "true"
+        return params
 
-        async with httpx.AsyncClient() as client:
-            r = await client.get(url, headers={"Authorization": f"Bearer {token}"}, params=params)
+    def offer_cache_key(self, params: dict) -> tuple:
+        return ("offers",) + tuple(sorted(params.items()))
 
-        if r.status_code != 200:
-             raise HTTPException(status_code=r.status_code, detail=f"Amadeus search failed: {r.text}")
+    def has_cached_flight_offers(self, query: FlightSearchQueryDetails, advanced: bool) -> bool:
+        """Whether a search of `query` would be answered from the offer cache, without an Amadeus call."""
+        params = self._map_search_params(query, query.max_results) if advanced else self._standard_search_params(query)
+        remaining = self.offer_cache.expires_in(self.offer_cache_key(params))
+        return remaining is not None and remaining > 0
+
+    async def _fetch_flight_offers(self, params: dict, refresh: bool = False) -> tuple:
+        """
+        GET /v2/shopping/flight-offers through the offer cache.
+
+        Returns (status_code, body text, cached_at): `cached_at` is when a response served from the
+        cache was fetched (ISO 8601, UTC), None for a fresh one. Only successful responses are cached;
+        `refresh` skips the cached copy and replaces it.
+        """
+        key = self.offer_cache_key(params)
+        if refresh or self.offer_cache.ttl <= 0:
+            self.offer_cache.invalidate(key)
+
+        async def load():
+            token = await self.get_amadeus_token()
+            r = await self._amadeus_get("/v2/shopping/flight-offers", token, params)
+            if r.status_code == 200 and offer_store_enabled:
+                # Parsed and written by the store's background thread
+                get_offer_store().record_search(r.text)
+            return (r.status_code, r.text, time.time()), (None if r.status_code == 200 and self.offer_cache.ttl > 0 else 0)
+
+        (status_code, text, fetched_at), cached = await self.offer_cache.get_or_load_entry(key, load)
+        cached_at = datetime.fromtimestamp(fetched_at, timezone.utc).isoformat(timespec="seconds") if cached else None
+        return status_code, text, cached_at
 
-        return {"source": "amadeus", "results": r.json()}
+    @staticmethod
+    def _mark_cached(results, cached_at: Optional[str]) -> None:
+        """Tell clients the offers (and their prices) are from a cached response of `cached_at`."""
+        if cached_at and isinstance(results, dict):
+            results.setdefault("meta", {})["cached_at"] = cached_at
 
     def _map_search_params(self, query_obj: FlightSearchQueryDetails, max_results: Optional[int]) -> dict:
         """Map flight search query object to Amadeus API parameters."""
@@ -190,7 +363,7 @@ class Actuator:
                 try: 
                     return offer["itineraries"][0]["segments"][0]["departure"]["at"]
                 except: 
-                    print(f"Failed to get departure time for offer: {offer}")
+                    logger.warning("Failed to get %s for offer %s", "departure time", _offer_id(offer))
                     return "9999-12-31"
             results.sort(key=get_dep_time)
         elif sort_by == SortBy.ARRIVAL_TIME:
@@ -198,7 +371,7 @@ class Actuator:
                 try: 
                     return offer["itineraries"][0]["segments"][-1]["arrival"]["at"]
                 except: 
-                    print(f"Failed to get arrival time for offer: {offer}")
+                    logger.warning("Failed to get %s for offer %s", "arrival time", _offer_id(offer))
                     return "9999-12-31"
              results.sort(key=get_arr_time)
         elif sort_by == SortBy.DURATION:
@@ -206,7 +379,7 @@ class Actuator:
                 try: 
                     return self._parse_duration(offer["itineraries"][0]["duration"])
                 except: 
-                    print(f"Failed to get duration for offer: {offer}")
+                    logger.warning("Failed to get %s for offer %s", "duration", _offer_id(offer))
                     return 999999
              results.sort(key=get_duration)
         elif sort_by == SortBy.PRICE:
@@ -214,7 +387,7 @@ class Actuator:
                 try: 
                     return float(offer["price"]["total"])
                 except: 
-                    print(f"Failed to get price for offer: {offer}")
+                    logger.warning("Failed to get %s for offer %s", "price", _offer_id(offer))
                     return 0.0
              results.sort(key=get_price)
         elif sort_by == SortBy.SEATS:
@@ -222,14 +395,14 @@ class Actuator:
                 try: 
                     return int(offer.get("numberOfBookableSeats", 0))
                 except: 
-                    print(f"Failed to get seats for offer: {offer}")    
+                    logger.warning("Failed to get %s for offer %s", "seats", _offer_id(offer))
                     return 0
              results.sort(key=get_seats, reverse=True) # Descending (more seats first)
         elif sort_by == SortBy.LAST_TICKETING_DATE:
              def get_ltd(offer):
                 try: return offer.get("lastTicketingDate", "9999-12-31")
                 except: 
-                    print(f"Failed to get last ticketing date for offer: {offer}")
+                    logger.warning("Failed to get %s for offer %s", "last ticketing date", _offer_id(offer))
                     return "9999-12-31"
              results.sort(key=get_ltd) # Ascending (earlier deadline first)
         
@@ -242,10 +415,15 @@ class Actuator:
         max_stops: Optional[int] = 2,
         min_bookable_seats: Optional[int] = 1,
         instant_ticketing_required: Optional[bool] = None,
-        max_results: Optional[int] = 10
+        max_results: Optional[int] = 10,
+        refresh: bool = False,
+        render: bool = False
     ) -> dict:
         """
         Perform an advanced flight search with client-side filtering and sorting.
+
+        Decoding, filtering, sorting and rendering run in `process_flight_offers`, on the offload
+        executor for large responses (utils/offload.py).
         
         Args:
             flight_search_data_object (FlightSearchQueryDetails): Base search criteria.
@@ -255,28 +433,23 @@ class Actuator:
             min_bookable_seats (Optional[int]): Min seats filter (overrides object).
             instant_ticketing_required (Optional[bool]): Instant ticketing filter (overrides object).
             max_results (Optional[int]): Max results to return (default 10).
+            refresh (bool): Bypass the offer cache and store the fresh response.
+            render (bool): Also return the offers rendered by `flight_offer_list_reader` under "rendered".
         
         Returns:
             dict: Search results.
         """
-        token = await self.get_amadeus_token()
-        url = f"{self.AMADEUS_BASE}/v2/shopping/flight-offers"
-        
         # 1. Map Inputs to Params
         params = self._map_search_params(flight_search_data_object, max_results)
 
         # Execute Request
-        async with httpx.AsyncClient() as client:
-            r = await client.get(url, headers={"Authorization": f"Bearer {token}"}, params=params)
+        status_code, text, cached_at = await self._fetch_flight_offers(params, refresh=refresh)
 
-        if r.status_code != 200:
-            if r.status_code == 500:
+        if status_code != 200:
+            if status_code == 500:
                  return {"source": "amadeus", "results": [], "error": "Amadeus API 500 System Error"}
-            raise HTTPException(status_code=r.status_code, detail=f"Amadeus search failed: {r.text}")
+            raise HTTPException(status_code=status_code, detail=f"Amadeus search failed: {text}")
 
-        data = r.json()
-        results = data.get("data", [])
-        
         # --- Client Side Processing ---
         
         # Extract filtering criteria (Argument > Object)
@@ -285,43 +458,586 @@ class Actuator:
         _instant_ticketing = instant_ticketing_required if instant_ticketing_required is not None else getattr(flight_search_data_object, 'instant_ticketing_required', False)
         _sort_by = sort_by if sort_by is not None else getattr(flight_search_data_object, 'sort_by', None)
 
-        # 1. Apply Filters
-        results = self._filter_flight_offers(results, _max_stops, _min_seats, _instant_ticketing)
+        processed = await self._process_flight_offers(text, _max_stops, _min_seats, _instant_ticketing, _sort_by, render)
+
+        self._mark_cached(processed["results"], cached_at)
+        result = {"source": "amadeus", "results": processed["results"]}
+        if render:
+            result["rendered"] = processed["rendered"]
+        return result
+
+    def refine_flight_offers(
+        self,
+        offers: list,
+        sort_by: Optional[SortBy] = None,
+        max_stops: Optional[int] = None,
+        min_bookable_seats: Optional[int] = None,
+        instant_ticketing_required: Optional[bool] = None,
+        max_results: Optional[int] = None,
+    ) -> list:
+        """
+        Re-filter and re-sort offers that were already fetched, without calling Amadeus.
+
+        Used for chat follow-ups ("now sort by duration", "only non-stop"); `offers` is left untouched.
+        """
+        with stage_seconds.labels("filter_sort").time(), span("filter_sort", offers=len(offers)):
+            results = list(offers)
+            if max_stops == 0:
+                # _filter_flight_offers leaves non-stop to the upstream nonStop parameter
+                results = [o for o in results if all(len(i.get("segments", [])) == 1 for i in o.get("itineraries", []))]
+            results = self._filter_flight_offers(results, max_stops, min_bookable_seats, bool(instant_ticketing_required))
+            results = self._sort_flight_offers(results, sort_by)
+        return results[:max_results] if max_results else results
+
+    def _metro_codes(self, location: str) -> List[str]:
+        """Airport codes of the metro area / city a code or city name belongs to (itself if unknown)."""
+        codes = [airport.code for airport in get_airport_index().metro_airports(location)]
+        if location in codes:
+            # The airport the user named goes first so it survives the pair cap
+            codes.remove(location)
+            codes.insert(0, location)
+        return codes or [location]
+
+    def _offer_signature(self, offer: dict) -> tuple:
+        """Identify the same flights sold twice: carrier, flight number and departure time of every segment."""
+        return tuple(
+            (seg.get("carrierCode"), seg.get("number"), seg.get("departure", {}).get("at"))
+            for itinerary in offer.get("itineraries", [])
+            for seg in itinerary.get("segments", [])
+        )
+
+    async def iter_flights_metro_fanout(
+        self,
+        flight_search_data_object: FlightSearchQueryDetails,
+        sort_by: Optional[SortBy] = SortBy.PRICE,
+        max_stops: Optional[int] = 2,
+        min_bookable_seats: Optional[int] = 1,
+        instant_ticketing_required: Optional[bool] = None,
+        max_results: Optional[int] = 10,
+        max_pairs: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Advanced search across every airport of the origin and destination metro areas.
+
+        "LON" / "London" expands to LCY, LGW, LHR, LTN, STN (from data/IATA.csv). Up to `max_pairs`
+        origin/destination pairs are searched concurrently with `search_flights_advanced`, and the offers
+        are merged into one list: duplicates are dropped (cheapest kept), the list is re-sorted and
+        truncated to `max_results`. Every offer carries the pair that produced it in `searchPair`, and
+        its id is prefixed with that pair ("LHR-CDG-3") to stay unique across pairs.
+
+        Yields:
+            dict: The merged search results so far, each time another pair returns;
+            `results.meta.pairs` lists the searched pairs and `results.meta.errors` any pair that failed.
+        """
+        origins = self._metro_codes(flight_search_data_object.origin_iata)
+        destinations = self._metro_codes(flight_search_data_object.destination_iata)
+        # Grow the origin x destination square outwards so a cap covers several airports on both sides
+        ranked = sorted(
+            ((i, j) for i in range(len(origins)) for j in range(len(destinations))),
+            key=lambda ij: (max(ij), ij),
+        )
+        pairs = [(origins[i], destinations[j]) for i, j in ranked if origins[i] != destinations[j]]
+        pairs = pairs[:max_pairs or self.METRO_FANOUT_MAX_PAIRS]
+
+        # Fetch the token once instead of once per concurrent pair
+        await self.get_amadeus_token()
+
+        async def search_pair(origin: str, destination: str) -> tuple:
+            query = flight_search_data_object.model_copy(update={"origin_iata": origin, "destination_iata": destination})
+            try:
+                return (origin, destination), await self.search_flights_advanced(
+                    query,
+                    sort_by=sort_by,
+                    max_stops=max_stops,
+                    min_bookable_seats=min_bookable_seats,
+                    instant_ticketing_required=instant_ticketing_required,
+                    max_results=max_results,
+                )
+            except Exception as e:
+                return (origin, destination), e
+
+        _sort_by = sort_by if sort_by is not None else getattr(flight_search_data_object, 'sort_by', None)
+        limit = int(max_results or flight_search_data_object.max_results or 10)
+        searched = [{"origin": o, "destination": d} for o, d in pairs]
+        merged, dictionaries, errors, first_exception, cached_at = {}, {}, [], None, None
+        tasks = [asyncio.ensure_future(search_pair(o, d)) for o, d in pairs]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                (origin, destination), response = await next_done
+                pair = {"origin": origin, "destination": destination}
+                if isinstance(response, Exception):
+                    first_exception = first_exception or response
+                    errors.append({**pair, "error": getattr(response, "detail", None) or str(response)})
+                    continue
+                results = response.get("results") or {}
+                if response.get("error"):
+                    errors.append({**pair, "error": response["error"]})
+                    continue
+                pair_cached_at = (results.get("meta") or {}).get("cached_at")
+                if pair_cached_at and (cached_at is None or pair_cached_at < cached_at):
+                    # The oldest cached response the merged offers may come from
+                    cached_at = pair_cached_at
+                for name, values in (results.get("dictionaries") or {}).items():
+                    dictionaries.setdefault(name, {}).update(values)
+                for offer in results.get("data", []):
+                    offer["searchPair"] = pair
+                    # Every pair numbers its offers from "1"
+                    offer["id"] = f"{origin}-{destination}-{offer.get('id')}"
+                    signature = self._offer_signature(offer) or offer["id"]
+                    kept = merged.get(signature)
+                    if kept is None or float(offer.get("price", {}).get("total", 0)) < float(kept.get("price", {}).get("total", 0)):
+                        merged[signature] = offer
+
+                offers = self._sort_flight_offers(list(merged.values()), _sort_by)[:limit]
+                merged_results = {
+                    "meta": {"count": len(offers), "pairs": searched, "errors": list(errors)},
+                    "data": offers,
+                    "dictionaries": dictionaries,
+                }
+                self._mark_cached(merged_results, cached_at)
+                yield {"source": "amadeus", "results": merged_results}
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if errors and len(errors) == len(pairs):
+            if first_exception is not None:
+                raise first_exception
+            yield {"source": "amadeus", "results": [], "error": errors[0]["error"]}
+
+    async def search_flights_metro_fanout(self, flight_search_data_object: FlightSearchQueryDetails, **kwargs) -> dict:
+        """
+        `iter_flights_metro_fanout` collected into one response (the final merged list).
+
+        Returns:
+            dict: Search results; `results.meta.pairs` lists the searched pairs and
+            `results.meta.errors` any pair that failed.
+        """
+        result = {"source": "amadeus", "results": {"meta": {"count": 0, "pairs": [], "errors": []}, "data": []}}
+        async for result in self.iter_flights_metro_fanout(flight_search_data_object, **kwargs):
+            pass
+        return result
+
+    def _calendar_params(self, details: CheapestFlightSearchDetails) -> dict:
+        """Map cheapest-date search details to /v1/shopping/flight-dates parameters."""
+        params = {"origin": details.origin.upper(), "destination": details.destination.upper()}
+        if details.departure_date:
+            params["departureDate"] = details.departure_date
+        if details.one_way is not None:
+            params["oneWay"] = "true" if details.one_way else "false"
+        if details.duration and not details.one_way:
+            params["duration"] = details.duration
+        if details.non_stop:
+            params["nonStop"] = "true"
+        if details.max_price:
+            params["maxPrice"] = int(details.max_price)
+        params["viewBy"] = "DATE"
+        return params
+
+    async def _fetch_flight_dates(self, details: CheapestFlightSearchDetails) -> Optional[CheapestDateCalendar]:
+        """Query the Flight Cheapest Date Search API; None when Amadeus has no cached data for the route."""
+        token = await self.get_amadeus_token()
+        r = await self._amadeus_get("/v1/shopping/flight-dates", token, self._calendar_params(details))
+
+        # The endpoint only covers routes Amadeus has precomputed; it answers 404 (or 500 in the test
+        # environment) for the rest.
+        if r.status_code in (404, 500):
+            return None
+        if r.status_code != 200:
+            raise HTTPException(status_code=r.status_code, detail=f"Amadeus cheapest date search failed: {r.text}")
+
+        body = r.json()
+        currency = body.get("meta", {}).get("currency")
+        dates = [
+            FlightDatePrice(
+                departure_date=item["departureDate"],
+                return_date=item.get("returnDate"),
+                price=float(item["price"]["total"]),
+                currency=currency,
+            )
+            for item in body.get("data", [])
+            if item.get("price", {}).get("total") is not None
+        ]
+        if not dates:
+            return None
+        dates.sort(key=lambda d: (d.price, d.departure_date))
+        return CheapestDateCalendar(origin=details.origin.upper(), destination=details.destination.upper(),
+                                    source="flight-dates", dates=dates, fetched_at=time.time())
+
+    def _fallback_days(self, details: CheapestFlightSearchDetails) -> List[date]:
+        """Departure days searched one by one when flight-dates has no data (at most CALENDAR_FALLBACK_MAX_DAYS)."""
+        tomorrow = date.today() + timedelta(days=1)
+        bounds = [date.fromisoformat(d.strip()) for d in (details.departure_date or "").split(",") if d.strip()]
+        start = max(bounds[0], tomorrow) if bounds else tomorrow
+        last = start + timedelta(days=self.CALENDAR_FALLBACK_MAX_DAYS - 1)
+        end = min(bounds[-1], last) if len(bounds) > 1 else (start if bounds else last)
+        return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+    async def _calendar_from_daily_offers(self, details: CheapestFlightSearchDetails, refresh: bool = False) -> CheapestDateCalendar:
+        """Build the calendar from a bounded concurrent flight-offers search per departure day."""
+        stay = int(details.duration.split(",")[0]) if details.duration and not details.one_way else None
+        limit = asyncio.Semaphore(self.CALENDAR_FALLBACK_CONCURRENCY)
+
+        async def cheapest_on(day: date) -> Optional[FlightDatePrice]:
+            query = FlightSearchQueryDetails(
+                origin_iata=details.origin.upper(),
+                destination_iata=details.destination.upper(),
+                departure_date=day.isoformat(),
+                return_date=(day + timedelta(days=stay)).isoformat() if stay else None,
+                currency=details.currency,
+                non_stop=details.non_stop,
+                max_results=5,
+            )
+            async with limit:
+                res = await self.search_flights_on_a_date(query, refresh=refresh)
+            offers = res.get("results", {}).get("data", [])
+            prices = [float(o["price"]["total"]) for o in offers if o.get("price", {}).get("total") is not None]
+            if details.max_price:
+                prices = [p for p in prices if p <= details.max_price]
+            if not prices:
+                return None
+            return FlightDatePrice(departure_date=query.departure_date, return_date=query.return_date,
+                                   price=min(prices), currency=details.currency)
+
+        days = self._fallback_days(details)
+        found = await asyncio.gather(*(cheapest_on(day) for day in days), return_exceptions=True)
+        failures = [f for f in found if isinstance(f, Exception)]
+        if failures and len(failures) == len(days):
+            raise failures[0]
+        dates = sorted((f for f in found if isinstance(f, FlightDatePrice)), key=lambda d: (d.price, d.departure_date))
+        return CheapestDateCalendar(origin=details.origin.upper(), destination=details.destination.upper(),
+                                    source="flight-offers", dates=dates, fetched_at=time.time())
+
+    def calendar_cache_key(self, details: CheapestFlightSearchDetails) -> tuple:
+        return ("calendar",) + tuple(sorted(details.model_dump().items()))
+
+    async def get_cheapest_date_calendar(self, details: CheapestFlightSearchDetails, refresh: bool = False) -> CheapestDateCalendar:
+        """
+        Date -> lowest price calendar for a route, cheapest date first.
+
+        Uses the precomputed Flight Cheapest Date Search and caches the calendar per route for
+        CALENDAR_CACHE_TTL seconds. Routes it does not cover fall back to a per-day flight-offers
+        search (CALENDAR_FALLBACK_MAX_DAYS days, CALENDAR_FALLBACK_CONCURRENCY at a time), cached for
+        CALENDAR_FALLBACK_TTL seconds. Concurrent lookups of the same route share one upstream call.
+
+        Args:
+            details (CheapestFlightSearchDetails): Route, departure window and fare filters.
+            refresh (bool): Bypass the cached calendar and store the fresh one.
+
+        Returns:
+            CheapestDateCalendar: Prices per date; empty if no fares were found.
+        """
+        key = self.calendar_cache_key(details)
+        if refresh:
+            self.calendar_cache.invalidate(key)
+
+        async def load():
+            calendar = await self._fetch_flight_dates(details)
+            if calendar is not None:
+                return calendar, None
+            calendar = await self._calendar_from_daily_offers(details, refresh=refresh)
+            return calendar, (self.CALENDAR_FALLBACK_TTL if calendar.dates else 0)
+
+        return await self.calendar_cache.get_or_load(key, load)
+
+    async def search_cheapest_flights_date_range(self, details: CheapestFlightSearchDetails) -> dict:
+        """
+        Cheapest dates to fly a route, as a dictionary.
+
+        Returns:
+            dict: {"source", "calendar", "data": [{departure_date, return_date, price, currency}, ...]},
+            or {"source", "error", "data": []} if Amadeus failed or found no fares.
+        """
+        try:
+            calendar = await self.get_cheapest_date_calendar(details)
+        except HTTPException as e:
+            return {"source": "amadeus", "error": e.detail, "data": []}
+        if not calendar.dates:
+            return {"source": "amadeus", "error": f"No fares found for {calendar.origin}-{calendar.destination}", "data": []}
+        return {
+            "source": "amadeus",
+            "calendar": calendar,
+            "data": [d.model_dump() for d in calendar.dates],
+        }
+
+    async def get_destination_index(
+        self, origin: str, one_way: bool = False, non_stop: bool = False, refresh: bool = False
+    ) -> DestinationIndex:
+        """
+        All destinations Amadeus prices from `origin`, as a cached `DestinationIndex`.
+
+        The Flight Inspiration Search (/v1/shopping/flight-destinations) is called without budget or
+        date filters so that every follow-up filter can be answered from the same index; it is cached
+        per (origin, one_way, non_stop) for INSPIRATION_CACHE_TTL seconds.
+        """
+        origin = origin.upper()
+        key = ("inspiration", origin, bool(one_way), bool(non_stop))
+        if refresh:
+            self.inspiration_cache.invalidate(key)
+
+        async def load():
+            token = await self.get_amadeus_token()
+            params = {"origin": origin, "oneWay": "true" if one_way else "false", "viewBy": "DESTINATION"}
+            if non_stop:
+                params["nonStop"] = "true"
+            r = await self._amadeus_get("/v1/shopping/flight-destinations", token, params)
+            if r.status_code != 200:
+                raise HTTPException(status_code=r.status_code, detail=f"Amadeus inspiration search failed: {r.text}")
+
+            body = r.json()
+            currency = body.get("meta", {}).get("currency")
+            locations = body.get("dictionaries", {}).get("locations", {})
+            airports = get_airport_index()
+            destinations = []
+            for item in body.get("data", []):
+                code = item.get("destination")
+                total = item.get("price", {}).get("total")
+                if not code or total is None or not item.get("departureDate"):
+                    continue
+                airport = airports.by_code(code)
+                trip_days = None
+                if item.get("returnDate"):
+                    trip_days = (date.fromisoformat(item["returnDate"]) - date.fromisoformat(item["departureDate"])).days
+                destinations.append(FlightDestination(
+                    destination=code,
+                    city=airport.city if airport else locations.get(code, {}).get("detailedName"),
+                    country=airport.country if airport else None,
+                    departure_date=item["departureDate"],
+                    return_date=item.get("returnDate"),
+                    trip_days=trip_days,
+                    price=float(total),
+                    currency=currency,
+                ))
+            return DestinationIndex(origin, destinations), None
+
+        return await self.inspiration_cache.get_or_load(key, load)
+
+    async def search_flight_inspiration(self, details: InspirationSearchDetails, refresh: bool = False) -> dict:
+        """
+        Cheapest destinations from an origin ("cheapest flights from MAD"), filtered locally.
+
+        Args:
+            details (InspirationSearchDetails): Origin plus optional budget, month, country and trip length.
+            refresh (bool): Bypass the cached destination index.
+
+        Returns:
+            dict: {"source", "data": [FlightDestination dicts]}, or {"source", "error", "data": []}.
+        """
+        try:
+            index = await self.get_destination_index(details.origin_iata, details.one_way, details.non_stop, refresh=refresh)
+        except HTTPException as e:
+            return {"source": "amadeus", "error": e.detail, "data": []}
+        return {
+            "source": "amadeus",
+            "origin": index.origin,
+            "data": [d.model_dump() for d in index.query(details)],
+        }
+
+    async def _fetch_hotel_list(self, city_code: str, radius_km: float, ratings: Optional[str] = None,
+                                amenities: Optional[str] = None) -> List[dict]:
+        """One call to the Hotel List API (by city)."""
+        token = await self.get_amadeus_token()
+        params = {"cityCode": city_code, "radius": math.ceil(radius_km), "radiusUnit": "KM"}
+        if ratings:
+            params["ratings"] = ratings
+        if amenities:
+            params["amenities"] = amenities
+
+        r = await self._amadeus_get("/v1/reference-data/locations/hotels/by-city", token, params)
+
+        if r.status_code != 200:
+            raise HTTPException(status_code=r.status_code, detail=f"Amadeus search failed: {r.text}")
+        return r.json().get("data", [])
+
+    async def get_hotel_geo_index(self, city_code: str, radius_km: float, lat: Optional[float] = None,
+                                  lon: Optional[float] = None) -> HotelGeoIndex:
+        """
+        The cached `HotelGeoIndex` of a city covering at least `radius_km` (around lat/lon, if given).
+
+        A cold city is fetched at HOTEL_LIST_FETCH_RADIUS_KM (or the requested radius if larger) and
+        kept for HOTEL_LIST_CACHE_TTL; upstream is only called again when a query disc reaches past
+        the cached radius, up to the API's maximum radius.
+        """
+        city_code = city_code.upper()
+        key = ("hotels", city_code)
+        index = self.hotel_list_cache.get(key)
+        # Twice at most: a point query on a cold city only learns how far the point is from the centre
+        # once the first list is in
+        for _ in range(2):
+            if index is not None and (index.covers(radius_km, lat, lon) or index.radius_km >= self.HOTEL_LIST_MAX_RADIUS_KM):
+                return index
+            needed_km = radius_km
+            if index is not None:
+                needed_km += index.offset_km(lat, lon)
+                self.hotel_list_cache.invalidate(key)
+            fetch_km = min(max(needed_km, self.HOTEL_LIST_FETCH_RADIUS_KM), self.HOTEL_LIST_MAX_RADIUS_KM)
+
+            async def load(fetch_km=fetch_km):
+                hotels = await self._fetch_hotel_list(city_code, fetch_km)
+                return HotelGeoIndex(city_code, hotels, fetch_km), None
+
+            index = await self.hotel_list_cache.get_or_load(key, load)
+        return index
 
-        # 2. Sorting
-        results = self._sort_flight_offers(results, _sort_by)
-        
-        data["data"] = results
-        return {"source": "amadeus", "results": data}
     async def search_hotels_by_city(
         self, 
         hotel_search_data: HotelSearchQueryDetails
     ) -> dict:
-        """Search for hotels in a specific city using Amadeus Hotel List API."""
-        token = await self.get_amadeus_token()
-        url = f"{self.AMADEUS_BASE}/v1/reference-data/locations/hotels/by-city"
-        
-        # Build params dict with only supported parameters for Hotel List API
+        """
+        Search for hotels in a specific city using Amadeus Hotel List API.
+
+        Radius, star rating and amenity filters are answered from the city's cached `HotelGeoIndex`;
+        a rating or amenity value is fetched upstream (once) only the first time it is asked for.
+        """
+        radius_km = to_km(hotel_search_data.radius or 5, hotel_search_data.radius_unit)
+        index = await self.get_hotel_geo_index(hotel_search_data.city_code, radius_km, hotel_search_data.latitude,
+                                               hotel_search_data.longitude)
+
+        missing = index.missing_facets(hotel_search_data.min_stars, hotel_search_data.amenities)
+        if missing:
+            lists = await asyncio.gather(*(
+                self._fetch_hotel_list(index.city_code, index.radius_km,
+                                       ratings=str(value) if kind == "stars" else None,
+                                       amenities=value if kind == "amenity" else None)
+                for kind, value in missing
+            ))
+            for facet, hotels in zip(missing, lists):
+                index.add_facet(facet, (h.get("hotelId") for h in hotels))
+
+        hotels = index.query(
+            radius_km,
+            stars=hotel_search_data.min_stars,
+            amenities=hotel_search_data.amenities,
+            lat=hotel_search_data.latitude,
+            lon=hotel_search_data.longitude,
+        )
+        return {"source": "amadeus", "results": {"meta": {"count": len(hotels)}, "data": hotels}}
+
+    def _hotel_offer_params(self, hotel_ids: List[str], hotel_search_data: HotelSearchQueryDetails) -> dict:
+        """Map hotel search details to /v3/shopping/hotel-offers parameters for one chunk of hotel IDs."""
         params = {
-            "cityCode": hotel_search_data.city_code,
-            "radius": hotel_search_data.radius,
-            "radiusUnit": hotel_search_data.radius_unit,
-            "ratings": hotel_search_data.min_stars,
+            "hotelIds": ",".join(hotel_ids),
+            "adults": hotel_search_data.adults,
+            "roomQuantity": hotel_search_data.room_quantity,
+            "currency": hotel_search_data.currency,
+            "bestRateOnly": "true",
         }
-        
-        # Add optional parameters only if they have values
-        if hotel_search_data.amenities:
-            params["amenities"] = ",".join(hotel_search_data.amenities)
-        
-        async with httpx.AsyncClient() as client:
-            r = await client.get(url, headers={"Authorization": f"Bearer {token}"}, params=params)
-        
-        if r.status_code != 200:
-            raise HTTPException(status_code=r.status_code, detail=f"Amadeus search failed: {r.text}")
-            
-        data = r.json()
-        return {"source": "amadeus", "results": data}
+        if hotel_search_data.check_in_date:
+            params["checkInDate"] = hotel_search_data.check_in_date
+        if hotel_search_data.check_out_date:
+            params["checkOutDate"] = hotel_search_data.check_out_date
+        if hotel_search_data.max_price:
+            params["priceRange"] = f"0-{int(hotel_search_data.max_price)}"
+        if hotel_search_data.board_type:
+            params["boardType"] = hotel_search_data.board_type
+        return params
+
+    def _priced_hotels(self, body: dict, hotel_search_data: HotelSearchQueryDetails) -> List[dict]:
+        """Cheapest available offer per hotel of one hotel-offers response, filtered by budget."""
+        hotels = []
+        for item in body.get("data", []):
+            offers = [o for o in item.get("offers", []) if o.get("price", {}).get("total") is not None]
+            if not item.get("available", True) or not offers:
+                continue
+            offer = min(offers, key=lambda o: float(o["price"]["total"]))
+            price = float(offer["price"]["total"])
+            if hotel_search_data.max_price and price > hotel_search_data.max_price:
+                continue
+            hotel = item.get("hotel", {})
+            hotels.append({
+                "hotel_id": hotel.get("hotelId"),
+                "name": hotel.get("name"),
+                "offer_id": offer.get("id"),
+                "check_in_date": offer.get("checkInDate"),
+                "check_out_date": offer.get("checkOutDate"),
+                "room": offer.get("room", {}).get("description", {}).get("text"),
+                "board_type": offer.get("boardType"),
+                "price": price,
+                "currency": offer["price"].get("currency"),
+            })
+        return hotels
+
+    async def iter_hotel_offers(
+        self,
+        hotel_search_data: HotelSearchQueryDetails,
+        hotel_ids: Optional[List[str]] = None,
+        chunk_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Price the hotels of a city, yielding each chunk of hotel IDs as soon as its offers arrive.
+
+        The Hotel List result (or `hotel_ids`) is split into chunks of HOTEL_OFFERS_CHUNK_SIZE IDs and
+        at most HOTEL_OFFERS_CONCURRENCY chunks are in flight, each under the Amadeus rate limiter.
+        Stops launching chunks once `max_results` priced hotels have passed the filters; chunks still
+        in flight are cancelled when the caller stops iterating.
+
+        Yields:
+            dict: {"chunk", "hotels": [priced hotels], "error"} per finished chunk, in completion order.
+        """
+        if hotel_ids is None:
+            listing = await self.search_hotels_by_city(hotel_search_data)
+            hotel_ids = [h["hotelId"] for h in listing["results"].get("data", []) if h.get("hotelId")]
+        size = chunk_size or self.HOTEL_OFFERS_CHUNK_SIZE
+        chunks = [hotel_ids[i:i + size] for i in range(0, len(hotel_ids), size)]
+        wanted = hotel_search_data.max_results or 10
+        token = await self.get_amadeus_token()
+
+        async def fetch(number: int, ids: List[str]) -> dict:
+            r = await self._amadeus_get("/v3/shopping/hotel-offers", token, self._hotel_offer_params(ids, hotel_search_data))
+            if r.status_code != 200:
+                # Typically "no rooms available" for every hotel of the chunk; the other chunks still count
+                return {"chunk": number, "hotels": [], "error": f"{r.status_code}: {r.text[:200]}"}
+            return {"chunk": number, "hotels": self._priced_hotels(r.json(), hotel_search_data), "error": None}
+
+        pending, next_chunk, found = set(), 0, 0
+        try:
+            while pending or next_chunk < len(chunks):
+                while next_chunk < len(chunks) and len(pending) < (concurrency or self.HOTEL_OFFERS_CONCURRENCY) \
+                        and found < wanted:
+                    pending.add(asyncio.ensure_future(fetch(next_chunk, chunks[next_chunk])))
+                    next_chunk += 1
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    found += len(result["hotels"])
+                    yield result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def search_hotel_offers(self, hotel_search_data: HotelSearchQueryDetails) -> dict:
+        """
+        Hotel List followed by chunked hotel offers: the first `max_results` priced hotels found in a city.
+
+        Pricing stops as soon as `max_results` hotels have arrived, so these are the cheapest of the
+        chunks priced so far, not of the whole city.
 
+        Returns:
+            dict: {"source", "results": {"data": [priced hotels by price], "meta": {...}}}
+        """
+        hotels, errors, chunks = [], [], 0
+        stream = self.iter_hotel_offers(hotel_search_data)
+        try:
+            async for chunk in stream:
+                chunks += 1
+                hotels.extend(chunk["hotels"])
+                if chunk["error"]:
+                    errors.append(chunk["error"])
+                if len(hotels) >= (hotel_search_data.max_results or 10):
+                    break
+        finally:
+            await stream.aclose()
+        hotels.sort(key=lambda h: h["price"])
+        return {
+            "source": "amadeus",
+            "results": {
+                "meta": {"count": len(hotels[:hotel_search_data.max_results or 10]), "chunks": chunks, "errors": errors},
+                "data": hotels[:hotel_search_data.max_results or 10],
+            },
+        }
 
 if __name__ == "__main__":
     search = Actuator()
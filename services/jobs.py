@@ -0,0 +1,309 @@
+"""
+Background /chat jobs: submit a prompt, get a job ID at once, then poll or subscribe for its events.
+
+Slow searches (large `max`, a slow Amadeus, a cold model) can outlive the load balancer's request
+timeout when answered inline, so `POST /jobs` queues them for a bounded pool of in-process workers:
+
+    manager = JobManager()
+    await manager.start()               # from the services/api.py lifespan
+    job = manager.submit(prompt)        # JobQueueFull once `max_queue` jobs are waiting
+    manager.get(job.job_id)             # status, events so far, result
+    async for event in manager.subscribe(job.job_id): ...
+    await manager.cancel(job.job_id)
+    await manager.stop()
+
+Jobs live in a `JobStore`; `MemoryJobStore` keeps them in process, and a persistent store only has to
+implement its four abstract methods. Finished jobs are dropped `result_ttl_s` after they finish.
+"""
+import abc
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+from enum import Enum
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.chat_pipeline import ChatPipeline, admitted_pipeline
+from utils.llm_metrics import llm_request_scope
+from utils.tracing import start_trace
+from utils.admission import deadline_scope
+from config.main_config import jobs_workers, jobs_max_queue, jobs_result_ttl_s, jobs_timeout_s
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class Job(BaseModel):
+    """One queued /chat prompt and everything it has produced so far"""
+    job_id: str = Field(default_factory=lambda: uuid.uuid4().hex, description="Job ID returned on submit")
+    prompt: str = Field(..., description="User prompt")
+    status: JobStatus = Field(JobStatus.QUEUED, description="Job state")
+    created_at: float = Field(default_factory=time.time, description="Submit time (epoch seconds)")
+    started_at: Optional[float] = Field(None, description="Time a worker picked the job up")
+    finished_at: Optional[float] = Field(None, description="Time the job succeeded, failed or was cancelled")
+    events: List[dict] = Field(default_factory=list, description="Pipeline stage events so far (see ChatPipeline.run_events)")
+    result: Optional[dict] = Field(None, description="ChatResponse fields once the job succeeded")
+    error: Optional[str] = Field(None, description="Failure reason")
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+
+class JobQueueFull(Exception):
+    """Raised by `JobManager.submit` when `max_queue` jobs are already waiting."""
+
+
+class JobStore(abc.ABC):
+    """Where jobs are kept. Subclass for a persistent backend (SQLite, Redis, ...)."""
+
+    @abc.abstractmethod
+    def put(self, job: Job) -> None:
+        ...
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, job_id: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def finished_before(self, cutoff: float) -> List[str]:
+        """IDs of finished jobs whose `finished_at` is older than `cutoff`."""
+
+
+class MemoryJobStore(JobStore):
+    def __init__(self) -> None:
+        self._jobs: Dict[str, Job] = {}
+
+    def put(self, job: Job) -> None:
+        self._jobs[job.job_id] = job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def delete(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+
+    def finished_before(self, cutoff: float) -> List[str]:
+        return [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+class JobManager:
+    """
+    Runs queued jobs on `workers` asyncio workers.
+
+    At most `max_queue` jobs wait at once (backpressure: `submit` raises `JobQueueFull`), each job
+    runs for at most `timeout_s`, and finished jobs are kept for `result_ttl_s`. By default jobs share
+    /chat's LLM and Amadeus stage queues (`admitted_pipeline`); a job they shed fails with the reason.
+
+    Cancelling a queued job frees its slot at once; its ID stays in the queue until a worker skips it.
+    """
+
+    def __init__(
+        self,
+        store: Optional[JobStore] = None,
+        workers: int = jobs_workers,
+        max_queue: int = jobs_max_queue,
+        result_ttl_s: float = jobs_result_ttl_s,
+        timeout_s: float = jobs_timeout_s,
+        pipeline_factory: Callable[[], ChatPipeline] = admitted_pipeline,
+    ) -> None:
+        self.store = store or MemoryJobStore()
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl_s = result_ttl_s
+        self.timeout_s = timeout_s
+        self.pipeline_factory = pipeline_factory
+
+        self._queue: Optional[asyncio.Queue] = None
+        # Queued jobs not yet picked up or cancelled; what `max_queue` bounds
+        self._waiting = 0
+        self._tasks: List[asyncio.Task] = []
+        # job_id -> task running it, and -> condition notified on every new event
+        self._running: Dict[str, asyncio.Task] = {}
+        self._changed: Dict[str, asyncio.Condition] = {}
+        self._stats = {"submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "expired": 0}
+
+    # --- Lifecycle --------------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        # Unbounded: cancelled job IDs stay queued until a worker skips them, so `_waiting` enforces max_queue
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._expire_loop()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # --- Jobs -------------------------------------------------------------------------------
+
+    def submit(self, prompt: str) -> Job:
+        if self._queue is None:
+            raise RuntimeError("JobManager.start() has not been awaited")
+        if self._waiting >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise JobQueueFull(f"{self.max_queue} jobs are already queued")
+        job = Job(prompt=prompt)
+        self._queue.put_nowait(job.job_id)
+        self._waiting += 1
+        self.store.put(job)
+        self._changed[job.job_id] = asyncio.Condition()
+        self._stats["submitted"] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are returned unchanged."""
+        job = self.store.get(job_id)
+        if job is None or job.finished:
+            return job
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+            # Returns once the worker has recorded the cancellation
+            async for _ in self.subscribe(job_id, since=len(job.events)):
+                pass
+        else:
+            # Still queued: the worker that pops it will skip it
+            self._waiting -= 1
+            await self._finish(job, JobStatus.CANCELLED, error="cancelled")
+        return self.store.get(job_id)
+
+    async def subscribe(self, job_id: str, since: int = 0) -> AsyncIterator[dict]:
+        """Events of a job from index `since`, as they happen, until it finishes."""
+        position = since
+        while True:
+            job = self.store.get(job_id)
+            if job is None:
+                return
+            while position < len(job.events):
+                yield job.events[position]
+                position += 1
+            condition = self._changed.get(job_id)
+            if job.finished or condition is None:
+                return
+            async with condition:
+                # Re-check under the lock so an event appended meanwhile is not missed
+                if position == len(self.store.get(job_id).events) and not self.store.get(job_id).finished:
+                    await condition.wait()
+
+    # --- Workers ----------------------------------------------------------------------------
+
+    async def _notify(self, job: Job) -> None:
+        self.store.put(job)
+        condition = self._changed.get(job.job_id)
+        if condition is not None:
+            async with condition:
+                condition.notify_all()
+
+    async def _finish(self, job: Job, status: JobStatus, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        job.status, job.result, job.error = status, result, error
+        job.finished_at = time.time()
+        self._stats[status.value] += 1
+        await self._notify(job)
+
+    async def _run(self, job: Job) -> None:
+        # The job's timeout is its deadline in the shared LLM and Amadeus stage queues
+        with start_trace("job", job.job_id), llm_request_scope(job.job_id), deadline_scope(self.timeout_s):
+            async for event in self.pipeline_factory().run_events(job.prompt):
+                job.events.append(event)
+                if event["event"] == "done":
+                    job.result = {"response": event["response"], "data": event["data"], "intent": event["intent"]}
+                await self._notify(job)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.store.get(job_id)
+                if job is None or job.finished:
+                    continue
+                self._waiting -= 1
+                job.status, job.started_at = JobStatus.RUNNING, time.time()
+                await self._notify(job)
+                task = asyncio.create_task(asyncio.wait_for(self._run(job), self.timeout_s))
+                self._running[job_id] = task
+                try:
+                    # wait() rather than await, so cancelling the job does not cancel the worker
+                    await asyncio.wait({task})
+                finally:
+                    self._running.pop(job_id, None)
+                    if not task.done():
+                        task.cancel()
+                if task.cancelled():
+                    await self._finish(job, JobStatus.CANCELLED, error="cancelled")
+                elif isinstance(task.exception(), asyncio.TimeoutError):
+                    await self._finish(job, JobStatus.FAILED, error=f"timed out after {self.timeout_s:g}s")
+                elif task.exception() is not None:
+                    e = task.exception()
+                    logger.error("Job %s failed: %s", job_id, e, exc_info=e)
+                    await self._finish(job, JobStatus.FAILED, error=getattr(e, "detail", None) or str(e))
+                else:
+                    await self._finish(job, JobStatus.SUCCEEDED, result=job.result)
+            finally:
+                self._queue.task_done()
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop jobs finished more than `result_ttl_s` ago; returns how many were dropped."""
+        expired = self.store.finished_before((now or time.time()) - self.result_ttl_s)
+        for job_id in expired:
+            self.store.delete(job_id)
+            self._changed.pop(job_id, None)
+        self._stats["expired"] += len(expired)
+        return len(expired)
+
+    async def _expire_loop(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.result_ttl_s, 60))
+            self.expire()
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "queued": self.queue_depth(),
+            "max_queue": self.max_queue,
+            "in_progress": len(self._running),
+            **self._stats,
+        }
+
+
+# Shared by the /jobs endpoints and the api lifespan (which starts the workers)
+job_manager = JobManager()
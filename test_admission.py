@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.api import app
+from services.chat_pipeline import ChatPipeline
+from utils.admission import DEADLINE, QUEUE_FULL, Overloaded, StageQueue, deadline_scope, llm_stage
+
+
+def test_full_queue_sheds_and_waiters_are_served_in_order():
+    async def scenario():
+        stage = StageQueue("test", capacity=1, max_queue=1)
+        order = []
+
+        async def call(name):
+            async with stage:
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        first = asyncio.create_task(call("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(call("second"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as shed:
+            await call("third")
+        assert shed.value.reason == QUEUE_FULL
+        await asyncio.gather(first, second)
+        assert order == ["first", "second"]
+        assert stage.in_use == 0 and stage.waiting == 0 and stage.hold_s is not None
+
+    asyncio.run(scenario())
+
+
+def test_deadline_sheds_before_and_while_waiting():
+    async def scenario():
+        stage = StageQueue("test", capacity=1, max_queue=10)
+        await stage.acquire()
+        # Unmeasured hold time: the request waits, and gives up when its deadline passes
+        with deadline_scope(0.05):
+            with pytest.raises(Overloaded) as shed:
+                await stage.acquire()
+        assert shed.value.reason == DEADLINE and stage.waiting == 0
+        # Once holds take 5 s, a request with 1 s left is turned away without waiting
+        stage.hold_s = 5.0
+        with deadline_scope(1):
+            with pytest.raises(Overloaded) as shed:
+                stage.admit()
+        assert shed.value.reason == DEADLINE and shed.value.retry_after_s >= 5
+        stage.release()
+        assert stage.in_use == 0
+
+    asyncio.run(scenario())
+
+
+def test_confident_intents_do_not_take_an_llm_slot():
+    async def scenario():
+        stage = StageQueue("test", capacity=1, max_queue=0)
+        await stage.acquire()
+        pipeline = ChatPipeline(llm_limit=stage)
+        intent = await pipeline.detect_intent("Find me cheapest flights from Delhi to Mumbai tomorrow")
+        assert intent.confidence is not None and stage.hold_s is None
+        # Only the LLM fallback waits for the (full) stage
+        with pytest.raises(Overloaded):
+            await pipeline.detect_intent("cheap trip")
+        stage.release()
+
+    asyncio.run(scenario())
+
+
+def test_chat_endpoint_sheds_with_retry_after(monkeypatch):
+    client = TestClient(app)
+    monkeypatch.setattr(llm_stage, "in_use", llm_stage.capacity)
+    monkeypatch.setattr(llm_stage, "max_queue", 0)
+    response = client.post("/chat", json={"prompt": "Flights from Delhi to Mumbai tomorrow"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.json()["reason"] == QUEUE_FULL
+
+    monkeypatch.setattr(llm_stage, "max_queue", 10)
+    monkeypatch.setattr(llm_stage, "hold_s", 1000.0)
+    response = client.post("/chat/stream", json={"prompt": "Flights from Delhi to Mumbai tomorrow"})
+    assert response.status_code == 503
+    assert response.json()["reason"] == DEADLINE
+
+    metrics = client.get("/metrics").text
+    assert 'travelagent_requests_shed_total{stage="llm",reason="queue_full"}' in metrics
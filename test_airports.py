@@ -0,0 +1,62 @@
+import os
+import sys
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.airports import country_key, damerau_levenshtein, get_airport_index, normalize
+
+index = get_airport_index()
+
+
+def codes(airports):
+    return [a.code for a in airports]
+
+
+def test_by_code_and_by_city():
+    lhr = index.by_code(" lhr ")
+    assert (lhr.city, lhr.country, lhr.is_metro) == ("London", "United Kingdom", False)
+    assert index.by_code("ZZZ") is None
+    london = codes(index.by_city("London"))
+    # The metro code comes first, then the city's own airports
+    assert london[0] == "LON" and {"LHR", "LGW", "STN"} <= set(london)
+    assert codes(index.by_city("Mumbai")) == codes(index.by_city("Bombay")) == ["BOM"]
+    assert normalize("São Paulo") == "sao paulo"
+
+
+def test_resolve():
+    assert codes(index.resolve("LHR")) == ["LHR"]
+    # All caps is a code, anything else a city
+    assert codes(index.resolve("GOA")) == ["GOA"]
+    assert codes(index.resolve("Goa")) == ["GOI"]
+    # A city named by its first words
+    assert {"BWI", "IAD", "DCA"} <= set(codes(index.resolve("Washington")))
+    assert codes(index.resolve("Washington")) == codes(index.resolve("washington dc"))
+    assert index.city_prefix("San") == []
+    assert index.resolve("Xqzvw") == []
+
+
+def test_metro_airports():
+    assert codes(index.metro_airports("LON")) == codes(index.metro_airports("London")) == ["LCY", "LGW", "LHR", "LTN", "STN"]
+    assert set(codes(index.metro_airports("Washington"))) == {"BWI", "IAD", "DCA"}
+    # A single-airport city is its own metro area
+    assert codes(index.metro_airports("Mumbai")) == ["BOM"]
+
+
+def test_fuzzy():
+    assert codes(index.fuzzy("Bangalor"))[0] == "BLR"
+    assert codes(index.fuzzy("Frankfrut"))[0] == "FRA"
+    # Transposed letters count as one edit
+    assert codes(index.fuzzy("Rmoe"))[0] == "ROM"
+    assert damerau_levenshtein("frankfrut", "frankfurt", 2) == 1
+    assert damerau_levenshtein("abc", "xyz", 1) == 2
+
+
+def test_country_key_matches_csv_and_user_spellings():
+    assert country_key("USA") == country_key("USA(LA)") == country_key("United States") == country_key("us")
+    assert country_key("Scotland,UK") == country_key("United Kingdom") == country_key("UK")
+    assert country_key("Fujian,PR China") == country_key("China")
+    assert country_key("Hokkaido, Japan") == country_key("japan")
+    assert country_key("India,Maharashtra") == country_key("India")
+    assert country_key("Croatia(Hrvatska)") == country_key("Croatia")
+    assert country_key("Spain") != country_key("France")
@@ -0,0 +1,60 @@
+import asyncio
+import json
+import os
+import sys
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.batch_runner import load_checkpoint, run_batch
+from utils.admission import amadeus_stage, llm_stage
+
+
+class FlakyPipeline:
+    """Answers every prompt, except that prompts containing "flaky" fail the first time."""
+
+    def __init__(self):
+        self.llm_limit = self.amadeus_limit = None
+        self.seen = []
+
+    async def run(self, prompt):
+        self.seen.append(prompt)
+        if "flaky" in prompt and self.seen.count(prompt) == 1:
+            raise RuntimeError("upstream timed out")
+        return {"response": f"answer to {prompt}", "data": [], "intent": "find_flights_standard"}
+
+
+def test_resume_skips_answered_and_retries_failed(tmp_path):
+    prompts = tmp_path / "prompts.jsonl"
+    output = tmp_path / "results.ndjson"
+    prompts.write_text("".join(json.dumps({"request_id": f"r{i}", "prompt": p}) + "\n"
+                               for i, p in enumerate(["one", "flaky two", "three"])))
+    pipeline = FlakyPipeline()
+
+    first = asyncio.run(run_batch(str(prompts), str(output), workers=2, llm_concurrency=1, amadeus_concurrency=1,
+                                  pipeline=pipeline))
+    assert (first["completed"], first["errors"]) == (3, 1)
+    assert load_checkpoint(str(output)) == {"r0", "r2"}
+
+    # An interrupted write leaves a torn last line, which is truncated away
+    with open(output, "a") as file:
+        file.write('{"request_id": "r9", "pro')
+    second = asyncio.run(run_batch(str(prompts), str(output), workers=2, llm_concurrency=1, amadeus_concurrency=1,
+                                   pipeline=pipeline))
+    assert (second["completed"], second["errors"], second["skipped_from_checkpoint"]) == (1, 0, 2)
+    assert pipeline.seen.count("one") == 1 and pipeline.seen.count("flaky two") == 2
+
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    # The failed row stays, its retry is appended
+    assert len(rows) == 4 and sorted(row["request_id"] for row in rows if "error" not in row) == ["r0", "r1", "r2"]
+    assert load_checkpoint(str(output)) == {"r0", "r1", "r2"}
+
+
+def test_batch_uses_private_unbounded_limits_by_default(tmp_path):
+    prompts = tmp_path / "prompts.jsonl"
+    prompts.write_text("".join(json.dumps({"request_id": f"r{i}", "prompt": f"p{i}"}) + "\n" for i in range(20)))
+    pipeline = FlakyPipeline()
+    summary = asyncio.run(run_batch(str(prompts), str(tmp_path / "results.ndjson"), workers=16, pipeline=pipeline))
+    assert (summary["completed"], summary["errors"]) == (20, 0)
+    assert pipeline.llm_limit is not llm_stage and pipeline.llm_limit.max_queue == -1
+    assert pipeline.amadeus_limit is not amadeus_stage and pipeline.amadeus_limit.capacity == 4
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import sys
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import DEPARTURE
+from services.cache_warmer import CacheWarmer
+from services.environment import Actuator, HTTPException
+from utils.sensors import FlightSearchQueryDetails
+
+OFFERS_PATH = "/v2/shopping/flight-offers"
+QUERY = FlightSearchQueryDetails(origin_iata="DEL", destination_iata="BOM", departure_date=DEPARTURE)
+
+
+def test_offer_cache_marks_cached_results(stubs):
+    _, amadeus = stubs
+    actuator = Actuator()
+
+    async def searches():
+        fresh = await actuator.search_flights_on_a_date(QUERY)
+        cached = await actuator.search_flights_on_a_date(QUERY)
+        refreshed = await actuator.search_flights_on_a_date(QUERY, refresh=True)
+        return fresh, cached, refreshed
+
+    fresh, cached, refreshed = asyncio.run(searches())
+    assert amadeus.calls[OFFERS_PATH] == 2
+    assert "cached_at" not in fresh["results"]["meta"] and "cached_at" not in refreshed["results"]["meta"]
+    assert cached["results"]["meta"]["cached_at"].endswith("+00:00")
+    assert cached["results"]["data"] == fresh["results"]["data"]
+
+
+def test_warmer_refreshes_popular_stale_lookups(stubs):
+    _, amadeus = stubs
+    warmer = CacheWarmer(actuator=Actuator(), routes=[], top_n=1, jitter=0, off_peak_hours="", quota_per_hour=100,
+                         quota_share=0.02)
+    other = QUERY.model_copy(update={"destination_iata": "GOI"})
+    for query in (QUERY, QUERY, other):
+        warmer.record_search(query)
+
+    async def cycles():
+        first = await warmer.run_cycle()
+        # Fresh entries are not refreshed again
+        second = await warmer.run_cycle()
+        return first, second
+
+    assert asyncio.run(cycles()) == (1, 0)
+    assert amadeus.calls[OFFERS_PATH] == 1
+    # The warmed entry now serves live lookups
+    warmer.record_search(QUERY)
+    metrics = warmer.metrics()
+    assert metrics["refreshed_offers"] == 1 and metrics["warm_hits"] == 1
+    assert metrics["quota"] == {"budget_per_hour": 2, "used_last_hour": 1, "amadeus_calls_total": 1,
+                                "exhausted_cycles": 0}
+
+
+def test_failed_refreshes_count_against_the_quota():
+    actuator = Actuator()
+    attempts = []
+
+    async def failing_search(query, refresh=False):
+        attempts.append(query.destination_iata)
+        raise HTTPException(status_code=500, detail="Amadeus search failed")
+
+    actuator.search_flights_on_a_date = failing_search
+    warmer = CacheWarmer(actuator=actuator, routes=[], top_n=5, jitter=0, off_peak_hours="", quota_per_hour=100,
+                         quota_share=0.02)
+    for destination in ("BOM", "GOI", "BLR"):
+        warmer.record_search(QUERY.model_copy(update={"destination_iata": destination}))
+
+    assert asyncio.run(warmer.run_cycle()) == 0
+    # A budget of 2 calls: the third lookup is not attempted
+    assert len(attempts) == 2 and warmer.quota_left() == 0
+    assert warmer.metrics()["quota"]["amadeus_calls_total"] == 2
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.api import app
+from services.chat_pipeline import ChatPipeline
+from conftest import DEPARTURE
+from services.environment import Actuator
+from utils.sensors import FlightSearchQueryDetails
+
+PROMPT = "Find flights from any London airport to Paris"
+FLIGHT_DETAILS = {"origin_iata": "LON", "destination_iata": "PAR", "currency": "EUR", "search_nearby_airports": True}
+# The first London airport answers quickly, the others only after a while
+PAIR_DELAYS = {"LCY": 0.05}
+SLOW_DELAY = 1.0
+
+
+def offers_latency(path: str, params: dict) -> float:
+    return PAIR_DELAYS.get(params.get("originLocationCode"), SLOW_DELAY)
+
+
+def test_run_events_stream_offers_as_pairs_return(stubs):
+    _, amadeus = stubs
+
+    async def collect():
+        start, events = time.perf_counter(), []
+        async for event in ChatPipeline(actuator=Actuator()).run_events(PROMPT):
+            events.append((time.perf_counter() - start, event))
+        return events
+
+    events = asyncio.run(collect())
+    names = [event["event"] for _, event in events]
+
+    assert names[:2] == ["intent", "parameters"]
+    assert names[-1] == "done"
+    assert set(names[2:-1]) == {"offers"}
+    # One offers event per airport pair that returned
+    assert len(names[2:-1]) == amadeus.calls["/v2/shopping/flight-offers"] > 1
+    assert events[1][1]["details"]["search_nearby_airports"] is True
+
+    # Offers from the fast pairs arrive before the slow pairs have answered
+    searched_at = events[1][0]
+    first_offers = next(t for t, event in events if event["event"] == "offers")
+    done_at, done = events[-1]
+    assert first_offers - searched_at < SLOW_DELAY <= done_at - searched_at
+    last_offers = [event for _, event in events if event["event"] == "offers"][-1]
+    assert done["data"] == last_offers["data"]
+    assert done["response"] == f"Found {len(done['data'])} flights for your request."
+
+
+def test_metro_fanout_offer_ids_are_unique(stubs):
+    details = FlightSearchQueryDetails(origin_iata="LON", destination_iata="PAR", departure_date=DEPARTURE,
+                                       currency="EUR", search_nearby_airports=True)
+    result = asyncio.run(Actuator().search_flights_metro_fanout(details, max_results=50))
+    offers = result["results"]["data"]
+    ids = [offer["id"] for offer in offers]
+    assert len(offers) > 10 and len(set(ids)) == len(ids)
+    assert all(offer["id"].startswith(f"{offer['searchPair']['origin']}-{offer['searchPair']['destination']}-")
+               for offer in offers)
+
+
+def test_run_matches_final_stream_event(stubs):
+    result = asyncio.run(ChatPipeline(actuator=Actuator()).run(PROMPT))
+
+    assert result["intent"] == "find_flights_standard"
+    assert 0 < len(result["data"]) <= 10
+    assert set(result) == {"response", "data", "intent"}
+
+
+@pytest.mark.parametrize("fmt", ["sse", "ndjson"])
+def test_chat_stream_endpoint(stubs, fmt):
+    client = TestClient(app)
+    response = client.post(f"/chat/stream?format={fmt}", json={"prompt": PROMPT})
+
+    assert response.status_code == 200
+    if fmt == "sse":
+        assert response.headers["content-type"].startswith("text/event-stream")
+        frames = [frame for frame in response.text.split("\n\n") if frame]
+        names = [frame.split("\n")[0].removeprefix("event: ") for frame in frames]
+        payloads = [json.loads(frame.split("\n")[1].removeprefix("data: ")) for frame in frames]
+    else:
+        payloads = [json.loads(line) for line in response.text.splitlines()]
+        names = [payload["event"] for payload in payloads]
+
+    assert names[0] == "intent" and names[-1] == "done"
+    assert "offers" in names
+    assert payloads[-1]["data"]
+
+
+def test_chat_stream_rejects_unknown_format():
+    response = TestClient(app).post("/chat/stream?format=xml", json={"prompt": PROMPT})
+    assert response.status_code == 422
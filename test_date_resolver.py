@@ -0,0 +1,82 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.date_resolver import resolve_date_expression
+
+# Monday
+NOW = datetime(2026, 10, 19, 9, 30)
+
+CASES = [
+    # (prompt, start_date, end_date, is_range)
+    ("Book a flight between BLR(Bengaluru) to Bombay(Bom) tomorrow.", "2026-10-20", None, False),
+    ("Find me cheapest flights between Madrid and London tommorrow.", "2026-10-20", None, False),
+    ("flights to Goa day after tomorrow", "2026-10-21", None, False),
+    ("flights to Goa today", "2026-10-19", None, False),
+    ("BLR to BOM next Friday", "2026-10-30", None, False),
+    ("BLR to BOM this Friday", "2026-10-23", None, False),
+    ("BLR to BOM on Friday", "2026-10-23", None, False),
+    ("BLR to BOM on Monday", "2026-10-26", None, False),
+    ("BLR to BOM this Monday", "2026-10-19", None, False),
+    ("Plan a trip from BLR to BOM next month.", "2026-11-01", "2026-11-30", True),
+    ("Any flights this month?", "2026-10-19", "2026-10-31", True),
+    ("Find the cheapest flight from BLR to BOM this weekend.", "2026-10-24", "2026-10-25", True),
+    ("Find the cheapest flight from BLR to BOM next weekend.", "2026-10-31", "2026-11-01", True),
+    ("Find flights from London to Paris next week", "2026-10-26", "2026-11-01", True),
+    ("Flights this week", "2026-10-19", "2026-10-25", True),
+    ("Fly to Tokyo in December", "2026-12-01", "2026-12-31", True),
+    ("Fly to Tokyo in March", "2027-03-01", "2027-03-31", True),
+    ("Fly to Tokyo in October", "2026-10-19", "2026-10-31", True),
+    ("Fly to Tokyo in May 2027", "2027-05-01", "2027-05-31", True),
+    ("DEL to BOM in two weeks", "2026-11-02", None, False),
+    ("DEL to BOM in 3 days", "2026-10-22", None, False),
+    ("DEL to BOM in a month", "2026-11-19", None, False),
+    ("Book a flight between BLR(Bengaluru) on Dec 25th, 2026 to Bombay(Bom).", "2026-12-25", None, False),
+    ("Find flights from BLR to DEL on 2025-12-25 for 1 adult.", "2025-12-25", None, False),
+    ("Flights on 5th of March", "2027-03-05", None, False),
+    ("Flights on November 2", "2026-11-02", None, False),
+    ("between Dec 20 and Dec 27", "2026-12-20", "2026-12-27", True),
+    ("between Dec 20 and 27", "2026-12-20", "2026-12-27", True),
+    ("from 2026-11-03 to 2026-11-09", "2026-11-03", "2026-11-09", True),
+    ("Dec 28 to Jan 3", "2026-12-28", "2027-01-03", True),
+    ("between tomorrow and Friday", "2026-10-20", "2026-10-23", True),
+    ("flights from 10 to 15 dec", "2026-12-10", "2026-12-15", True),
+    ("between 10 and 15 December", "2026-12-10", "2026-12-15", True),
+    ("10-15 Dec", "2026-12-10", "2026-12-15", True),
+    ("from 28 to 3 Jan", "2026-12-28", "2027-01-03", True),
+    # A weekday end is the first such weekday from the start on
+    ("next friday to sunday", "2026-10-30", "2026-11-01", True),
+    ("fly sunday to tuesday", "2026-10-25", "2026-10-27", True),
+    ("friday to next friday", "2026-10-23", "2026-10-30", True),
+    # A bare day end takes the start's month
+    ("flights Dec 20 to 27", "2026-12-20", "2026-12-27", True),
+    ("dec 20 - 27", "2026-12-20", "2026-12-27", True),
+    ("Dec 20 to 2 adults", "2026-12-20", None, False),
+]
+
+
+@pytest.mark.parametrize("prompt,start_date,end_date,is_range", CASES)
+def test_resolves_supported_phrasings(prompt, start_date, end_date, is_range):
+    details = resolve_date_expression(prompt, now=NOW)
+    assert details is not None
+    assert (details.start_date, details.end_date, details.is_range) == (start_date, end_date, is_range)
+
+
+@pytest.mark.parametrize("prompt", [
+    "Find flights from Delhi to Mumbai",
+    "cheapest flights from MAD",
+    "fly sometime around Diwali",
+    "fly out on Feb 30",
+    # More than one date: which one is the departure is left to the LLM
+    "return on Dec 30, leave Dec 20",
+    "fly out tomorrow and come back on Friday",
+    # An end before the start that is not a year-less month/day
+    "from Dec 20 to tomorrow",
+])
+def test_unrecognised_phrasings_fall_back(prompt):
+    assert resolve_date_expression(prompt, now=NOW) is None
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import sys
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import services.chat_pipeline as chat_pipeline
+import services.environment as environment
+from services.chat_pipeline import ChatPipeline
+from utils.destination_index import DestinationIndex
+from utils.sensors import (DateRangeDetails, FetchIntent, FlightDestination, InspirationSearchDetails, InspirationSort,
+                           UserIntent)
+
+
+def destination(code, country, price, departure_date, trip_days=None):
+    return FlightDestination(destination=code, country=country, departure_date=departure_date, trip_days=trip_days,
+                             price=price, currency="EUR")
+
+
+INDEX = DestinationIndex("MAD", [
+    destination("ROM", "Italy", 120, "2026-03-10", 4),
+    destination("MIL", "Italy", 60, "2026-04-02", 7),
+    destination("EDI", "Scotland,UK", 90, "2026-03-20", 3),
+    destination("LON", "United Kingdom", 45, "2026-03-05", 10),
+    destination("NYC", "USA(NY)", 400, "2026-03-15"),
+    destination("XXX", None, 30, "2026-05-01", 2),
+])
+
+
+def codes(**filters):
+    return [d.destination for d in INDEX.query(InspirationSearchDetails(origin_iata="MAD", **filters))]
+
+
+def test_budget_month_and_trip_length_filters():
+    assert codes() == ["XXX", "LON", "MIL", "EDI", "ROM", "NYC"]
+    assert codes(max_price=90) == ["XXX", "LON", "MIL", "EDI"]
+    assert codes(max_price=20) == []
+    assert codes(departure_month="2026-03", max_price=100) == ["LON", "EDI"]
+    # Destinations without a trip length pass the upper bound, not the lower one
+    assert codes(min_trip_days=4) == ["LON", "MIL", "ROM"]
+    assert codes(max_trip_days=3) == ["XXX", "EDI", "NYC"]
+    assert codes(max_results=2) == ["XXX", "LON"]
+
+
+def test_country_filter_matches_regions_and_aliases():
+    assert codes(country="italy") == ["MIL", "ROM"]
+    # "Scotland,UK" in IATA.csv is the same country as "United Kingdom" and "UK"
+    assert codes(country="UK") == codes(country="United Kingdom") == ["LON", "EDI"]
+    assert codes(country="United States") == ["NYC"]
+    assert codes(country="Italy", departure_month="2026-03") == ["ROM"]
+    assert codes(country="Spain") == []
+    assert INDEX.countries() == ["Italy", "Scotland,UK", "USA(NY)", "United Kingdom"]
+
+
+def test_sort_orders():
+    assert codes(sort_by=InspirationSort.DURATION)[:3] == ["NYC", "XXX", "EDI"]
+    assert codes(sort_by=InspirationSort.DEPARTURE_DATE, country="UK") == ["LON", "EDI"]
+
+
+def test_city_name_origins_resolve_to_their_code(stubs, monkeypatch):
+    _, amadeus = stubs
+    environment.inspiration_cache.clear()
+    monkeypatch.setattr(chat_pipeline, "fetch_inspiration_details",
+                        lambda prompt: InspirationSearchDetails(origin_iata="Madrid", max_price=1000))
+    march = FetchIntent(intent=UserIntent.FIND_FLIGHTS_ANYWHERE, date_range_details=DateRangeDetails(
+        start_date="2026-03-01", end_date="2026-03-31", is_range=True))
+    pipeline = ChatPipeline()
+
+    details = asyncio.run(pipeline.extract_inspiration_details("Cheapest flights from Madrid in March", march))
+    assert (details.origin_iata, details.departure_month) == ("MAD", "2026-03")
+
+    anywhere = FetchIntent(intent=UserIntent.FIND_FLIGHTS_ANYWHERE)
+    result = asyncio.run(pipeline.search_anywhere("Cheapest flights from Madrid", anywhere))
+    assert result["response"] == "Found 10 destinations from MAD."
+    prices = [d["price"] for d in result["data"]]
+    assert prices == sorted(prices)
+    # The index is cached per origin: a second search with other filters does not call Amadeus
+    assert asyncio.run(pipeline.actuator.search_flight_inspiration(
+        InspirationSearchDetails(origin_iata="MAD", country="France")))["data"][0]["destination"] == "PAR"
+    assert amadeus.calls["/v1/shopping/flight-destinations"] == 1
+    environment.inspiration_cache.clear()
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import sys
+import time
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import services.chat_pipeline as chat_pipeline
+from services.chat_pipeline import ChatPipeline
+from utils.sensors import (CheapestDateCalendar, DateRangeDetails, FetchIntent, FlightDatePrice,
+                           FlightSearchQueryDetails, UserIntent)
+
+DETAILS = FlightSearchQueryDetails(origin_iata="DEL", destination_iata="BOM", departure_date="2026-12-01")
+
+
+class CalendarActuator:
+    def __init__(self):
+        self.windows = []
+
+    async def get_cheapest_date_calendar(self, details):
+        self.windows.append(details.departure_date)
+        cheapest = FlightDatePrice(departure_date="2026-12-03", price=42.0, currency="EUR")
+        return CheapestDateCalendar(origin="DEL", destination="BOM", source="flight-dates", dates=[cheapest],
+                                    fetched_at=time.time())
+
+
+def resolve(monkeypatch, user_intent):
+    extractor_calls = []
+
+    def fetch_date_range_from_query(prompt):
+        extractor_calls.append(prompt)
+        return DateRangeDetails(start_date="2026-12-10", end_date="2026-12-20", is_range=True)
+
+    monkeypatch.setattr(chat_pipeline, "fetch_date_range_from_query", fetch_date_range_from_query)
+    monkeypatch.setattr(chat_pipeline.cache_warmer, "record_calendar", lambda details: None)
+    actuator = CalendarActuator()
+    details, cheapest = asyncio.run(ChatPipeline(actuator=actuator).resolve_flexible_dates(
+        "Delhi to Mumbai sometime in December", DETAILS, user_intent))
+    return details, cheapest, actuator.windows, extractor_calls
+
+
+def test_reuses_the_intent_date_range(monkeypatch):
+    window = DateRangeDetails(start_date="2026-12-01", end_date="2026-12-07", is_range=True)
+    intent = FetchIntent(intent=UserIntent.FIND_FLIGHTS_STANDARD, date_range=True, date_range_details=window)
+    details, cheapest, windows, extractor_calls = resolve(monkeypatch, intent)
+    assert extractor_calls == [] and windows == ["2026-12-01,2026-12-07"]
+    assert details.departure_date == "2026-12-03" and cheapest.price == 42.0
+
+
+def test_extracts_the_range_when_the_intent_has_none(monkeypatch):
+    intent = FetchIntent(intent=UserIntent.FIND_FLIGHTS_STANDARD, date_range=True)
+    _, _, windows, extractor_calls = resolve(monkeypatch, intent)
+    assert len(extractor_calls) == 1 and windows == ["2026-12-10,2026-12-20"]
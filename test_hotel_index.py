@@ -0,0 +1,78 @@
+import asyncio
+import math
+import os
+import sys
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.environment import Actuator, hotel_list_cache
+from utils.hotel_index import HotelGeoIndex, haversine_km
+from utils.sensors import HotelSearchQueryDetails
+
+CENTRE = (48.8566, 2.3522)
+
+
+def hotel(hotel_id, km_east, rating=None):
+    """A Hotel List item `km_east` km east of the centre."""
+    lon = CENTRE[1] + km_east / (111.32 * math.cos(math.radians(CENTRE[0])))
+    item = {"hotelId": hotel_id, "geoCode": {"latitude": CENTRE[0], "longitude": lon},
+            "distance": {"value": round(haversine_km(*CENTRE, CENTRE[0], lon), 2), "unit": "KM"}}
+    if rating:
+        item["rating"] = rating
+    return item
+
+
+def point_east(km):
+    return CENTRE[0], CENTRE[1] + km / (111.32 * math.cos(math.radians(CENTRE[0])))
+
+
+HOTELS = [hotel("H0", 0.2, 3), hotel("H1", 2, 4), hotel("H5", 5, 5), hotel("H9", 9, 4), hotel("H40", 40, 3)]
+
+
+def test_radius_and_point_queries():
+    index = HotelGeoIndex("PAR", HOTELS, 50)
+    assert [h["hotelId"] for h in index.query(6)] == ["H0", "H1", "H5"]
+    assert [h["hotelId"] for h in index.query(6, stars=[4])] == ["H1"]
+    assert [h["hotelId"] for h in index.query(1.5, lat=point_east(9)[0], lon=point_east(9)[1])] == ["H9"]
+    assert index.missing_facets(stars=[4], amenities=["spa"]) == [("amenity", "SPA")]
+    index.add_facet(("amenity", "SPA"), ["H5", "unknown"])
+    assert [h["hotelId"] for h in index.query(50, amenities=["spa"])] == ["H5"]
+
+
+def test_coverage_accounts_for_the_point_offset():
+    index = HotelGeoIndex("PAR", HOTELS, 50)
+    assert index.covers(50) and not index.covers(51)
+    assert index.covers(10, *point_east(30))
+    # 45 km out, a 10 km disc reaches past the 50 km that were fetched
+    assert not index.covers(10, *point_east(45))
+    # Without located hotels the centre is unknown, so no point query is covered
+    assert not HotelGeoIndex("XXX", [], 50).covers(1, *CENTRE)
+
+
+def test_point_queries_near_the_edge_go_upstream():
+    actuator = Actuator()
+    fetches = []
+
+    async def fetch(city_code, radius_km, ratings=None, amenities=None):
+        fetches.append(radius_km)
+        return [h for h in HOTELS + [hotel("H52", 52)] if h["distance"]["value"] <= radius_km]
+
+    actuator._fetch_hotel_list = fetch
+    hotel_list_cache.clear()
+    try:
+        listing = asyncio.run(actuator.search_hotels_by_city(HotelSearchQueryDetails(city_code="PAR", radius=5)))
+        assert [h["hotelId"] for h in listing["results"]["data"]] == ["H0", "H1", "H5"]
+        assert fetches == [50]
+
+        lat, lon = point_east(45)
+        details = HotelSearchQueryDetails(city_code="PAR", radius=10, latitude=lat, longitude=lon)
+        listing = asyncio.run(actuator.search_hotels_by_city(details))
+        assert [h["hotelId"] for h in listing["results"]["data"]] == ["H40", "H52"]
+        assert len(fetches) == 2 and fetches[1] >= 54.9
+
+        # Now covered by the larger list
+        asyncio.run(actuator.search_hotels_by_city(details))
+        assert len(fetches) == 2
+    finally:
+        hotel_list_cache.clear()
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sys
+import time
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.environment import Actuator
+from utils.sensors import HotelSearchQueryDetails
+
+OFFERS_PATH = "/v3/shopping/hotel-offers"
+HOTEL_IDS = [f"PASTB{i:03d}" for i in range(40)]
+
+
+def offers_latency(path, params):
+    # Chunks holding a "SLOW" hotel hang, "LATE" ones lag behind, the rest answer quickly
+    hotel_ids = params.get("hotelIds", "")
+    return 2.0 if "SLOW" in hotel_ids else 0.3 if "LATE" in hotel_ids else 0.05
+
+
+def tracked(actuator):
+    """Wrap the Actuator's Amadeus GET to record the most hotel-offers calls in flight at once."""
+    inner, state = actuator._amadeus_get, {"in_flight": 0, "peak": 0}
+
+    async def get(path, token, params):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            return await inner(path, token, params)
+        finally:
+            state["in_flight"] -= 1
+
+    actuator._amadeus_get = get
+    return state
+
+
+def collect(actuator, details, **kwargs):
+    async def run():
+        return [chunk async for chunk in actuator.iter_hotel_offers(details, **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_chunks_are_priced_with_bounded_concurrency(stubs):
+    _, amadeus = stubs
+    actuator = Actuator()
+    state = tracked(actuator)
+    details = HotelSearchQueryDetails(city_code="PAR", max_results=100)
+    chunks = collect(actuator, details, hotel_ids=HOTEL_IDS[:12], chunk_size=5, concurrency=2)
+    assert sorted(c["chunk"] for c in chunks) == [0, 1, 2]
+    assert sorted(h["hotel_id"] for c in chunks for h in c["hotels"]) == HOTEL_IDS[:12]
+    assert amadeus.calls[OFFERS_PATH] == 3 and state["peak"] == 2
+
+
+def test_failed_chunks_are_reported_and_budget_filters(stubs):
+    _, amadeus = stubs
+    amadeus.status = lambda path, params: 400 if "PASTB000" in params.get("hotelIds", "") else 200
+    details = HotelSearchQueryDetails(city_code="PAR", max_results=100, max_price=250)
+    chunks = {c["chunk"]: c for c in collect(Actuator(), details, hotel_ids=HOTEL_IDS[:10], chunk_size=5)}
+    assert chunks[0]["hotels"] == [] and chunks[0]["error"].startswith("400")
+    assert chunks[1]["error"] is None and all(h["price"] <= 250 for h in chunks[1]["hotels"])
+
+
+def test_stops_once_enough_hotels_are_priced(stubs):
+    _, amadeus = stubs
+    details = HotelSearchQueryDetails(city_code="PAR", max_results=8)
+    hotel_ids = HOTEL_IDS[:5] + [f"PALATE{i:02d}" for i in range(5)] + HOTEL_IDS[10:]
+    chunks = collect(Actuator(), details, hotel_ids=hotel_ids, chunk_size=5, concurrency=2)
+    # Two chunks in flight, a third launched after the first: 10 hotels before the late second chunk
+    # answers, so the other five chunks never start
+    assert [c["chunk"] for c in chunks] == [0, 2, 1] and amadeus.calls[OFFERS_PATH] == 3
+
+
+def test_search_cancels_outstanding_chunks(stubs):
+    _, amadeus = stubs
+    actuator = Actuator()
+    state = tracked(actuator)
+    details = HotelSearchQueryDetails(city_code="PAR", max_results=5)
+    hotel_ids = HOTEL_IDS[:5] + [f"PASLOW{i:02d}" for i in range(5)]
+
+    async def search():
+        stream = actuator.iter_hotel_offers(details, hotel_ids=hotel_ids, chunk_size=5, concurrency=2)
+        first = await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0)
+        return first
+
+    start = time.perf_counter()
+    first = asyncio.run(search())
+    assert first["chunk"] == 0 and time.perf_counter() - start < 1.5
+    # The slow chunk was in flight and is no longer
+    assert amadeus.calls[OFFERS_PATH] == 2 and state["in_flight"] == 0
+
+
+def test_search_hotel_offers_returns_the_first_priced_hotels_by_price(stubs):
+    _, amadeus = stubs
+    result = asyncio.run(Actuator().search_hotel_offers(HotelSearchQueryDetails(city_code="PAR", max_results=3)))
+    prices = [h["price"] for h in result["results"]["data"]]
+    assert len(prices) == 3 and prices == sorted(prices)
+    # The first chunk already priced three hotels
+    assert result["results"]["meta"]["chunks"] == 1 and amadeus.calls["/v1/reference-data/locations/hotels/by-city"] >= 1
@@ -0,0 +1,51 @@
+import json
+import os
+import sys
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import utils.prompts as prompts
+from config.main_config import intent_confidence_threshold
+from utils.intent_classifier import classify_intent, extract_features
+from utils.sensors import SortBy, UserIntent
+
+
+def test_confident_prompts():
+    cheapest = classify_intent("Find me cheapest flights from Delhi to Mumbai tomorrow")
+    assert cheapest.intent == UserIntent.FIND_FLIGHTS_ADVANCED and cheapest.sorting_details == SortBy.PRICE
+    assert cheapest.confidence >= intent_confidence_threshold
+    for prompt, intent in [("Flights from Delhi to Mumbai on 5 March", UserIntent.FIND_FLIGHTS_STANDARD),
+                           ("Where can I fly from MAD for cheap", UserIntent.FIND_FLIGHTS_ANYWHERE),
+                           ("Plan a trip to Paris with hotel for 3 nights", UserIntent.PLAN_TRIP),
+                           ("Book a table for two", UserIntent.OTHER)]:
+        result = classify_intent(prompt)
+        assert (result.intent, result.confidence >= intent_confidence_threshold) == (intent, True), prompt
+
+    weekend = classify_intent("Flights from Delhi to Goa this weekend")
+    assert weekend.date_range and weekend.date_range_details.is_range
+
+
+def test_ambiguous_prompts_abstain():
+    for prompt in ["cheap trip", "Delhi to Mumbai", "train or flight to Goa"]:
+        assert classify_intent(prompt).confidence < intent_confidence_threshold, prompt
+
+
+def test_abstaining_falls_back_to_the_llm(monkeypatch):
+    calls = []
+
+    def chat(stage, model, content):
+        calls.append(stage)
+        return {"message": {"content": json.dumps({"intent": "plan_trip", "date_range": False})}}
+
+    monkeypatch.setattr(prompts, "_chat", chat)
+    assert prompts.fetch_intent_of_the_query("Book a table for two").intent == UserIntent.OTHER
+    assert calls == []
+    fallback = prompts.fetch_intent_of_the_query("cheap trip")
+    assert (fallback.intent, fallback.confidence) == (UserIntent.PLAN_TRIP, None) and calls == ["intent"]
+
+
+def test_extract_features():
+    features = extract_features("Direct flights from DEL to BOM", has_date=True)
+    assert {"bias", "w:direct", "b:direct_flights", "kw:filters", "kw:flight", "kw:route", "kw:date"} <= set(features)
+    assert "kw:date" not in extract_features("Direct flights", has_date=False)
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.jobs import JobManager, JobQueueFull, JobStatus, JobStore
+
+
+class FakePipeline:
+    """Stands in for ChatPipeline: a few stage events; "slow" prompts take a second, "fail" prompts raise."""
+
+    async def run_events(self, prompt: str):
+        delay = 1 if "slow" in prompt else 0.01
+        yield {"event": "intent", "intent": "find_flights_standard", "confidence": 1.0}
+        await asyncio.sleep(delay)
+        if "fail" in prompt:
+            raise ValueError("LLM Error")
+        yield {"event": "offers", "data": [{"Price": "100 EUR"}]}
+        await asyncio.sleep(delay)
+        yield {"event": "done", "response": f"Found 1 flights for {prompt}.", "data": [{"Price": "100 EUR"}],
+               "intent": "find_flights_standard"}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_job_runs_and_streams_events():
+    async def scenario():
+        manager = JobManager(workers=2, max_queue=10, pipeline_factory=FakePipeline)
+        await manager.start()
+        job = manager.submit("LON-PAR")
+        assert job.status == JobStatus.QUEUED
+        events = [event["event"] async for event in manager.subscribe(job.job_id)]
+        await manager.stop()
+        return events, manager.get(job.job_id)
+
+    events, job = run(scenario())
+    assert events == ["intent", "offers", "done"]
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.result == {"response": "Found 1 flights for LON-PAR.", "data": [{"Price": "100 EUR"}],
+                          "intent": "find_flights_standard"}
+
+
+def test_failure_timeout_and_cancel():
+    async def scenario():
+        manager = JobManager(workers=3, max_queue=10, timeout_s=0.2, pipeline_factory=FakePipeline)
+        await manager.start()
+        failed, slow, cancelled = manager.submit("fail"), manager.submit("slow"), manager.submit("slow, cancelled")
+        await asyncio.sleep(0.05)
+        await manager.cancel(cancelled.job_id)
+        for job in (failed, slow):
+            async for _ in manager.subscribe(job.job_id):
+                pass
+        await manager.stop()
+        return [manager.get(job.job_id) for job in (failed, slow, cancelled)]
+
+    failed, slow, cancelled = run(scenario())
+    assert (failed.status, failed.error) == (JobStatus.FAILED, "LLM Error")
+    assert slow.status == JobStatus.FAILED and "timed out" in slow.error
+    assert cancelled.status == JobStatus.CANCELLED and cancelled.events[0]["event"] == "intent"
+
+
+def test_backpressure_and_expiry():
+    async def scenario():
+        manager = JobManager(workers=1, max_queue=2, result_ttl_s=60, pipeline_factory=FakePipeline)
+        await manager.start()
+        # Without running workers the queue only fills
+        for task in manager._tasks:
+            task.cancel()
+        first, second = manager.submit("a"), manager.submit("b")
+        with pytest.raises(JobQueueFull):
+            manager.submit("c")
+        await manager.cancel(first.job_id)
+        # The cancelled job's slot is free again
+        third = manager.submit("c")
+        assert manager.queue_depth() == 2
+        expired = manager.expire(now=manager.get(first.job_id).finished_at + 61)
+        await manager.stop()
+        return expired, manager, first, second, third
+
+    expired, manager, first, second, third = run(scenario())
+    assert expired == 1
+    assert manager.get(first.job_id) is None
+    assert manager.get(second.job_id).status == manager.get(third.job_id).status == JobStatus.QUEUED
+    assert manager.metrics()["rejected"] == 1
+
+
+def test_job_store_is_abstract():
+    with pytest.raises(TypeError):
+        JobStore()
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.llm_metrics import (LOCAL_MODEL, instrument_extractor, llm_metrics, llm_request_scope, mark_parse_outcome,
+                               record_llm_response)
+
+RESPONSE = {"prompt_eval_count": 100, "eval_count": 20, "load_duration": 5e6, "prompt_eval_duration": 2e6,
+            "eval_duration": 40e6}
+
+
+@instrument_extractor("test_llm")
+def llm_extractor(prompt):
+    record_llm_response("gemma3:4b", RESPONSE)
+    if "garbled" in prompt:
+        mark_parse_outcome("fallback")
+    return prompt
+
+
+@instrument_extractor("test_local")
+def local_extractor(prompt):
+    if "broken" in prompt:
+        raise ValueError("no date")
+    return prompt
+
+
+def test_concurrent_request_scopes_do_not_mix():
+    async def request(name, llm_calls, local_calls):
+        with llm_request_scope(name) as summary:
+            for i in range(llm_calls):
+                await asyncio.to_thread(llm_extractor, f"{name} {i}")
+                await asyncio.sleep(0)
+            for i in range(local_calls):
+                local_extractor(f"{name} {i}")
+                await asyncio.sleep(0)
+        return summary
+
+    async def scenario():
+        return await asyncio.gather(request("a", 3, 1), request("b", 1, 2))
+
+    a, b = asyncio.run(scenario())
+    assert (a["request_id"], a["calls"], b["request_id"], b["calls"]) == ("a", 4, "b", 3)
+    assert a["stages"]["test_llm"]["calls"] == 3 and a["stages"]["test_llm"]["prompt_tokens"] == 300
+    assert b["stages"]["test_llm"]["calls"] == 1 and b["stages"]["test_llm"]["completion_tokens"] == 20
+    assert (b["stages"]["test_local"]["calls"], b["stages"]["test_local"]["models"]) == (2, [LOCAL_MODEL])
+    assert a in llm_metrics.recent_requests and b in llm_metrics.recent_requests
+
+
+def test_calls_outside_a_scope_only_reach_the_aggregates():
+    llm_metrics.reset()
+    llm_extractor("plain")
+    llm_extractor("garbled")
+    local_extractor("tomorrow")
+    with pytest.raises(ValueError):
+        local_extractor("broken")
+    rows = {row["stage"]: row for row in llm_metrics.snapshot()}
+    llm, local = rows["test_llm"], rows["test_local"]
+    assert (llm["model"], llm["calls"], llm["parse_outcomes"]) == ("gemma3:4b", 2, {"ok": 1, "fallback": 1})
+    assert llm["avg_prompt_tokens"] == 100 and llm["avg_load_ms"] == 5 and llm["tokens_per_second"] == 500
+    assert (local["model"], local["parse_outcomes"]) == (LOCAL_MODEL, {"local": 1, "error": 1})
+    assert len(llm_metrics.recent_requests) == 0
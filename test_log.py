@@ -0,0 +1,83 @@
+import io
+import json
+import logging
+import os
+import queue
+import sys
+import time
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.log import (DroppingQueueHandler, JsonFormatter, RateLimitFilter, RequestContextFilter, setup_logging,
+                       shutdown_logging)
+from utils.tracing import start_trace
+
+
+def make_logger(stream, window_s=60.0, burst=2):
+    """A logger wired like setup_logging(), but writing synchronously so the test can read it."""
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(RateLimitFilter(window_s=window_s, burst=burst))
+    logger = logging.getLogger(f"test_log.{id(stream)}")
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+def records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_records_carry_request_id_and_extra_fields():
+    stream = io.StringIO()
+    logger = make_logger(stream)
+    with start_trace("POST /chat", request_id="req-42"):
+        logger.warning("Amadeus auth failed: %s", "bad key", extra={"status": 401})
+    logger.warning("outside a request")
+
+    inside, outside = records(stream)
+    assert inside["message"] == "Amadeus auth failed: bad key"
+    assert inside["request_id"] == "req-42" and inside["status"] == 401 and inside["level"] == "WARNING"
+    assert outside["request_id"] is None
+
+
+def test_repeated_messages_are_rate_limited():
+    stream = io.StringIO()
+    logger = make_logger(stream, window_s=0.05, burst=2)
+    for offer_id in range(10):
+        logger.warning("Failed to get %s for offer %s", "price", offer_id)
+    logger.warning("a different message")
+    assert [r["message"] for r in records(stream)] == [
+        "Failed to get price for offer 0", "Failed to get price for offer 1", "a different message"]
+
+    time.sleep(0.06)
+    logger.warning("Failed to get %s for offer %s", "price", 10)
+    assert records(stream)[-1]["suppressed"] == 8
+
+
+def test_errors_are_not_rate_limited():
+    stream = io.StringIO()
+    logger = make_logger(stream, burst=1)
+    for reason in ("token expired", "quota exceeded", "token expired"):
+        logger.error("%s", reason)
+    assert [r["message"] for r in records(stream)] == ["token expired", "quota exceeded", "token expired"]
+
+
+def test_setup_logging_quiets_httpx():
+    root_level = logging.getLogger().level
+    setup_logging(stream=io.StringIO())
+    try:
+        assert logging.getLogger("httpx").getEffectiveLevel() == logging.WARNING
+    finally:
+        shutdown_logging()
+        logging.getLogger().setLevel(root_level)
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    record = logging.makeLogRecord({"msg": "x %s", "args": (1,)})
+    handler.handle(record)
+    handler.handle(logging.makeLogRecord({"msg": "y"}))
+    assert handler.queue.qsize() == 1 and handler.queue.get_nowait().msg == "x 1"
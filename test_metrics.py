@@ -0,0 +1,61 @@
+import os
+import sys
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.metrics import MetricsRegistry
+
+
+def samples(text):
+    """Exposition text -> {series: value}, without the HELP/TYPE lines."""
+    return {line.rsplit(" ", 1)[0]: line.rsplit(" ", 1)[1] for line in text.splitlines() if not line.startswith("#")}
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_seconds", "Latency", ("stage",), buckets=(0.5, 0.1, 1.0))
+    for value in (0.05, 0.1, 0.3, 2.0):
+        latency.labels("render").observe(value)
+    text = registry.render()
+    assert "# HELP test_seconds Latency\n# TYPE test_seconds histogram\n" in text
+    rendered = samples(text)
+    # Buckets are sorted, and a value equal to a bound falls in that bound's bucket
+    assert [(series, value) for series, value in rendered.items() if "_bucket" in series] == [
+        ('test_seconds_bucket{stage="render",le="0.1"}', "2"),
+        ('test_seconds_bucket{stage="render",le="0.5"}', "3"),
+        ('test_seconds_bucket{stage="render",le="1"}', "3"),
+        ('test_seconds_bucket{stage="render",le="+Inf"}', "4"),
+    ]
+    assert rendered['test_seconds_count{stage="render"}'] == "4"
+    assert float(rendered['test_seconds_sum{stage="render"}']) == 2.45
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    errors = registry.counter("test_errors_total", "Errors", ("message",))
+    errors.labels('bad "quote" \\ and\nnewline').inc()
+    assert 'test_errors_total{message="bad \\"quote\\" \\\\ and\\nnewline"} 1' in registry.render()
+
+
+def test_int_and_str_label_values_share_one_series():
+    registry = MetricsRegistry()
+    responses = registry.counter("test_responses_total", "Responses", ("endpoint", "status"))
+    responses.labels("/offers", 200).inc()
+    responses.labels("/offers", "200").inc(2)
+    responses.labels("/offers", 500).inc()
+    lines = [line for line in registry.render().splitlines() if not line.startswith("#")]
+    assert lines == ['test_responses_total{endpoint="/offers",status="200"} 3',
+                     'test_responses_total{endpoint="/offers",status="500"} 1']
+
+
+def test_gauges_unlabelled_metrics_and_collectors():
+    registry = MetricsRegistry()
+    in_flight = registry.gauge("test_in_flight", "In flight")
+    with in_flight.track_inprogress():
+        assert "test_in_flight 1" in registry.render()
+    assert "test_in_flight 0" in registry.render()
+    # Registering a name twice returns the first metric
+    assert registry.gauge("test_in_flight", "again") is in_flight
+    registry.register_collector(lambda: ["# TYPE test_cache_hits counter", "test_cache_hits 7"])
+    assert registry.render().endswith("test_cache_hits 7\n")
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.model_router import ModelRouter
+
+
+def make_router(threshold=2):
+    return ModelRouter({"intent": "big", "flight": "big", "date": "other"}, {"intent": "fast", "flight": "fast"},
+                       threshold, default_model="default")
+
+
+def test_overloaded_primary_degrades_to_the_fallback():
+    router = make_router()
+    assert router.model_for("intent") == "big" and router.model_for("hotel") == "default"
+    with router.track("big"):
+        assert router.model_for("intent") == "big"
+        with router.track(router.model_for("flight")):
+            # Two calls in flight reach the threshold
+            assert router.model_for("intent") == router.model_for("flight") == "fast"
+            # A stage without a fallback keeps its model
+            assert router.model_for("date") == "other"
+        assert router.model_for("intent") == "big"
+    # A threshold of 0 disables degradation
+    router = make_router(threshold=0)
+    with router.track("big"):
+        assert router.model_for("intent") == "big"
+
+
+def test_track_releases_on_exceptions():
+    router = make_router(threshold=1)
+    with pytest.raises(RuntimeError):
+        with router.track("big"):
+            assert router.in_flight("big") == 1 and router.model_for("intent") == "fast"
+            raise RuntimeError("Ollama unreachable")
+    assert router.in_flight("big") == 0 and router.model_for("intent") == "big"
+
+
+def test_configured_models_are_distinct_in_routing_order():
+    assert make_router().configured_models() == ["big", "other", "fast"]
+    assert ModelRouter({}, {}, 2).configured_models() == []
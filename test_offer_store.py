@@ -0,0 +1,58 @@
+import json
+import os
+import sys
+import time
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.offer_store import OfferStore, flatten_offer
+
+
+def offer(origin, destination, price, currency="EUR", departure="2026-12-01", stops=0):
+    segments = [{"departure": {"iataCode": origin, "at": f"{departure}T08:00:00"},
+                 "arrival": {"iataCode": destination}, "carrierCode": "BA", "number": "100", "numberOfStops": stops}]
+    return {"itineraries": [{"duration": "PT1H20M", "segments": segments}], "oneWay": True,
+            "price": {"grandTotal": str(price), "currency": currency}, "validatingAirlineCodes": ["BA"],
+            "travelerPricings": [{"fareDetailsBySegment": [{"cabin": "ECONOMY"}]}], "numberOfBookableSeats": 4}
+
+
+def test_flatten_offer():
+    row = flatten_offer(offer("LHR", "CDG", 120.5, stops=1), 1000.0)
+    assert row == (1000.0, "LHR", "CDG", "2026-12-01", None, "BA", "BA100", 1, 80, 120.5, "EUR", "ECONOMY", 4, 1)
+    assert flatten_offer({"itineraries": []}, 0) is None
+    assert flatten_offer({**offer("LHR", "CDG", 1), "price": {}}, 0) is None
+
+
+def test_background_writer_and_metro_queries(tmp_path):
+    store = OfferStore(str(tmp_path / "offers.sqlite3"))
+    try:
+        store.record_search(json.dumps({"data": [offer("LHR", "CDG", 100), offer("LGW", "ORY", 200)]}))
+        store.record_search("not json")
+        store.record_search(json.dumps({"data": [offer("LHR", "CDG", 90, currency="GBP")]}))
+        store.flush(timeout=5)
+        assert (store.stats["written"], store.stats["failed"]) == (3, 1)
+
+        # Metro codes cover every airport of the city; airport codes only themselves
+        assert store.price_percentiles("LON", "PAR")["offers"] == 2
+        assert store.price_percentiles("lhr", "cdg")["offers"] == 1
+        assert store.price_percentiles("LHR", "CDG", currency="GBP")["p50"] == 90
+        history = store.price_history("LON", "PAR")
+        assert {(row["currency"], row["offers"]) for row in history} == {("EUR", 2), ("GBP", 1)}
+        assert store.price_history("LON", "PAR", departure_date="2026-12-02") == []
+    finally:
+        store.close()
+
+
+def test_price_verdict(tmp_path):
+    store = OfferStore(str(tmp_path / "offers.sqlite3"))
+    now = time.time()
+    store.import_rows(flatten_offer(offer("DEL", "BOM", price), now) for price in range(100, 200, 5))
+    assert store.price_verdict("DEL", "BOM", 100)["verdict"] == "good"
+    assert store.price_verdict("DEL", "BOM", 150)["verdict"] == "typical"
+    assert store.price_verdict("DEL", "BOM", 195)["verdict"] == "high"
+    assert store.price_verdict("DEL", "BOM", 150, min_offers=21) == {"verdict": "unknown", "percentile": None,
+                                                                     "offers": 20}
+    # Offers searched before the window are ignored
+    store.import_rows([flatten_offer(offer("DEL", "GOI", 100), now - 100 * 86400)])
+    assert store.price_percentiles("DEL", "GOI")["offers"] == 0
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import os
+import sys
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.offer_generator import synthetic_offers
+from services.environment import Actuator, process_flight_offers
+from utils.metrics import stage_seconds
+from utils.offload import INLINE, PROCESS, THREAD, Offloader
+from utils.sensors import FlightSearchQueryDetails, SortBy
+from utils.tracing import start_trace
+
+TEXT = json.dumps({"meta": {"count": 120}, "data": synthetic_offers(120, travelers=2), "dictionaries": {}})
+
+
+def test_offloaded_results_match_inline():
+    args = (TEXT, 1, 2, False, SortBy.DURATION, True)
+    inline = process_flight_offers(*args)
+    assert inline["rendered"] and len(inline["rendered"]) == len(inline["results"]["data"])
+    assert inline["render_s"] > 0 and process_flight_offers(TEXT)["render_s"] == 0
+
+    for mode in (THREAD, PROCESS):
+        offloader = Offloader(mode, workers=1, min_bytes=0)
+        try:
+            offloaded = asyncio.run(offloader.run(len(TEXT), process_flight_offers, *args))
+            assert (offloaded["results"], offloaded["rendered"]) == (inline["results"], inline["rendered"])
+        finally:
+            offloader.shutdown()
+
+
+def test_small_responses_stay_inline():
+    offloader = Offloader(PROCESS, workers=1, min_bytes=len(TEXT) + 1)
+    assert offloader.executor_for(len(TEXT)) == INLINE
+    asyncio.run(offloader.run(len(TEXT), process_flight_offers, TEXT))
+    # No worker process was started for it
+    assert offloader._executor is None
+
+
+def test_offloaded_processing_records_filter_sort_and_render(monkeypatch):
+    async def fetch(params, refresh=False):
+        return 200, TEXT, None
+
+    actuator = Actuator()
+    monkeypatch.setattr(actuator, "_fetch_flight_offers", fetch)
+    render_count = stage_seconds.labels("render")
+    before = sum(render_count.counts)
+    details = FlightSearchQueryDetails(origin_iata="DEL", destination_iata="BOM", departure_date="2026-12-01")
+    with start_trace("POST /chat") as trace:
+        result = asyncio.run(actuator.search_flights_on_a_date(details, render=True))
+    assert len(result["rendered"]) == 120 and sum(render_count.counts) == before + 1
+    spans = {s.name: s for s in trace.spans}
+    assert spans["render"].parent_id == spans["filter_sort"].span_id
+    assert spans["render"].duration_ms <= spans["filter_sort"].duration_ms
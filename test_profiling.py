@@ -0,0 +1,51 @@
+import os
+import sys
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import utils.profiling as profiling
+from utils.profiling import DETERMINISTIC, SAMPLING, enforce_retention, profile_mode_for, profile_path
+
+
+def test_profile_mode_for(monkeypatch):
+    monkeypatch.setattr(profiling, "profile_sample_rate", 0.0)
+    monkeypatch.setattr(profiling, "profile_admin_token", "")
+    # No token configured: a header alone never turns profiling on
+    assert profile_mode_for("anything") is None
+
+    monkeypatch.setattr(profiling, "profile_admin_token", "s3cret")
+    assert profile_mode_for("s3cret") == DETERMINISTIC
+    assert profile_mode_for("s3cret", SAMPLING) == SAMPLING
+    assert profile_mode_for("s3cret", "bogus") == DETERMINISTIC
+    assert profile_mode_for("wrong") is None and profile_mode_for("s3cre") is None and profile_mode_for(None) is None
+
+    # Sampled requests use the low-overhead sampler; a wrong token is never sampled
+    monkeypatch.setattr(profiling, "profile_sample_rate", 1.0)
+    assert profile_mode_for(None) == SAMPLING
+    assert profile_mode_for("wrong") is None
+
+
+def write(directory, name, size, mtime):
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+
+def test_enforce_retention(tmp_path):
+    for i in range(5):
+        write(tmp_path, f"p{i}.prof", 400 * 1024, 1000 + i)
+    # Newest first: p4 and p3 fit in 1 MB, the third file would exceed it
+    assert enforce_retention(str(tmp_path), max_files=4, max_mb=1) == 3
+    assert sorted(os.listdir(tmp_path)) == ["p3.prof", "p4.prof"]
+    assert enforce_retention(str(tmp_path), max_files=1, max_mb=10) == 1
+    assert os.listdir(tmp_path) == ["p4.prof"]
+    assert enforce_retention(str(tmp_path / "missing")) == 0
+
+
+def test_profile_path_only_serves_plain_names(tmp_path):
+    write(tmp_path, "20261019T091203-req.prof", 1, 1000)
+    (tmp_path / "sub").mkdir()
+    assert profile_path("20261019T091203-req.prof", str(tmp_path)) == str(tmp_path / "20261019T091203-req.prof")
+    for name in ("missing.prof", "../secret", "sub/x", ".hidden", "sub", "a b"):
+        assert profile_path(name, str(tmp_path)) is None, name
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import sys
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import DEPARTURE
+from services.chat_pipeline import ChatPipeline
+from services.environment import Actuator
+from utils.refinement import parse_refinement
+from utils.sensors import SortBy
+from utils.session_store import ChatSession, SessionStore, session_store
+
+OFFERS_PATH = "/v2/shopping/flight-offers"
+
+
+def test_parse_refinement():
+    assert parse_refinement("now sort by duration").sort_by == SortBy.DURATION
+    assert parse_refinement("only non-stop please").max_stops == 0
+    assert parse_refinement("show me the 5 cheapest").model_dump(exclude_none=True) == \
+        {"sort_by": SortBy.PRICE, "max_results": 5}
+    assert parse_refinement("with at least 3 seats").min_bookable_seats == 3
+    # New routes and dates go through the full pipeline
+    assert parse_refinement("cheapest flights from Delhi to Goa") is None
+    assert parse_refinement("what about next friday") is None
+    assert parse_refinement("hello there") is None
+    # Sort words inside a new request are not a refinement of the last search
+    assert parse_refinement("what is the price of hotels in Paris") is None
+    assert parse_refinement("book a hotel in rome for the cheapest price") is None
+    assert parse_refinement("Find me cheapest flights Delhi Mumbai") is None
+
+
+def test_refinement_is_answered_from_the_session(stubs):
+    llm, amadeus = stubs
+    session_id = "refine-test"
+    pipeline = ChatPipeline(actuator=Actuator())
+
+    async def conversation():
+        first = await pipeline.run("Find flights from Delhi to Mumbai next month", session_id)
+        searches, llm_calls = amadeus.calls.get(OFFERS_PATH, 0), llm.calls
+        fastest = await pipeline.run("now sort by duration", session_id)
+        top = await pipeline.run("just the top 3", session_id)
+        assert amadeus.calls.get(OFFERS_PATH, 0) == searches and llm.calls == llm_calls
+        return first, fastest, top
+
+    try:
+        first, fastest, top = asyncio.run(conversation())
+    finally:
+        session_store.delete(session_id)
+
+    assert first["session_id"] == session_id and len(first["data"]) == 10
+    durations = [offer["Duration"] for offer in fastest["data"]]
+    assert sorted(fastest["data"], key=str) == sorted(first["data"], key=str)
+    assert durations == sorted(durations, key=Actuator()._parse_duration)
+    # The sort order sticks for later refinements of the same session
+    assert top["data"] == fastest["data"][:3]
+
+
+def test_session_store_bounds():
+    store = SessionStore(idle_ttl_s=60, max_sessions=2, max_offers=3)
+    search = {"origin_iata": "DEL", "destination_iata": "BOM", "departure_date": DEPARTURE}
+    for i in range(3):
+        store.save(ChatSession(session_id=str(i), intent="find_flights_standard", details=search, offers=[{}] * 5))
+    assert store.get("0") is None
+    assert len(store.get("2").offers) == 3
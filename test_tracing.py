@@ -0,0 +1,95 @@
+import asyncio
+import json
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.api import app
+from utils.tracing import FileSpanExporter, current_trace, span, start_trace
+
+
+def test_spans_nest_across_gather_and_threads():
+    def extract():
+        with span("llm.flight", model="gemma3:4b"):
+            pass
+
+    async def search(n):
+        with span("amadeus.flight-offers", page=n):
+            await asyncio.sleep(0.001)
+
+    async def scenario():
+        with start_trace("POST /chat", "req-1") as trace:
+            with span("pipeline") as pipeline:
+                await asyncio.to_thread(extract)
+                await asyncio.gather(search(1), search(2))
+            return trace, pipeline
+
+    trace, pipeline = asyncio.run(scenario())
+    parents = {s.name: s.parent_id for s in trace.spans}
+    assert parents["pipeline"] == trace.root.span_id
+    assert parents["llm.flight"] == parents["amadeus.flight-offers"] == pipeline.span_id
+    assert trace.spans[-1] is trace.root and len(trace.spans) == 5
+    # Outside a trace spans are no-ops
+    with span("orphan") as orphan:
+        orphan.set_attribute("ignored", True)
+    assert current_trace() is None
+
+
+def test_server_timing_and_summary():
+    with start_trace("POST /chat", "req-2") as trace:
+        for _ in range(2):
+            with span("amadeus flight/offers"):
+                pass
+        try:
+            with span("render"):
+                raise ValueError("bad offer")
+        except ValueError:
+            pass
+    header = trace.server_timing()
+    assert header.startswith("total;dur=")
+    # Names are made HTTP tokens, and repeated spans are summed with their count
+    assert 'amadeus_flight_offers;dur=' in header and 'desc="x2"' in header and "render;dur=" in header
+    summary = trace.summary()
+    assert summary["request_id"] == "req-2" and summary["spans"][0]["name"] == "POST /chat"
+    assert summary["spans"][0]["start_ms"] == 0 and summary["spans"][-1]["error"] == "ValueError: bad offer"
+
+
+def test_otlp_export(tmp_path):
+    with start_trace("POST /chat", "req-3", route="/chat") as trace:
+        with span("llm.intent", tokens=12, ratio=0.5, cached=False):
+            pass
+    exporter = FileSpanExporter(str(tmp_path / "traces.jsonl"))
+    exporter.export(trace)
+    exporter.flush()
+    exporter.close()
+    (line,) = (tmp_path / "traces.jsonl").read_text().splitlines()
+    resource_spans = json.loads(line)["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"][0] == {"key": "service.name",
+                                                           "value": {"stringValue": "travel-agent"}}
+    child, root = resource_spans["scopeSpans"][0]["spans"]
+    assert (root["kind"], child["kind"]) == (2, 1) and "parentSpanId" not in root
+    assert child["parentSpanId"] == root["spanId"] and child["traceId"] == root["traceId"] == trace.trace_id
+    assert {"key": "request.id", "value": {"stringValue": "req-3"}} in root["attributes"]
+    assert child["attributes"] == [{"key": "tokens", "value": {"intValue": "12"}},
+                                   {"key": "ratio", "value": {"doubleValue": 0.5}},
+                                   {"key": "cached", "value": {"boolValue": False}}]
+    assert int(child["endTimeUnixNano"]) >= int(child["startTimeUnixNano"]) and root["status"] == {"code": 1}
+
+
+def test_chat_debug_field(stubs):
+    client = TestClient(app)
+    response = client.post("/chat?debug=true", json={"prompt": "Flights from Delhi to Mumbai"},
+                           headers={"X-Request-ID": "req-debug"})
+    assert response.status_code == 200
+    debug = response.json()["debug"]
+    assert debug["request_id"] == response.headers["X-Request-ID"] == "req-debug"
+    # The root span is still open when the response is built, so only the stages are listed
+    names = [s["name"] for s in debug["spans"]]
+    assert names[0] == "llm.intent" and any(name.startswith("amadeus") for name in names)
+    assert response.headers["Server-Timing"].startswith("total;dur=")
+
+    assert "debug" not in client.post("/chat", json={"prompt": "Flights from Delhi to Mumbai"}).json()
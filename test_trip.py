@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import services.chat_pipeline as chat_pipeline
+from config.main_config import trip_max_packages
+from services.chat_pipeline import NO_TRIP_RESPONSE, ChatPipeline
+from services.environment import HTTPException
+from utils.admission import QUEUE_FULL, Overloaded
+from utils.sensors import DateRangeDetails, FetchIntent, FlightSearchQueryDetails, UserIntent
+
+TRIP = FetchIntent(intent=UserIntent.PLAN_TRIP)
+
+
+def flight(price, currency="EUR"):
+    segment = {"number": "100", "departure": {"iataCode": "LHR", "at": "2026-12-01T08:00:00"},
+               "arrival": {"iataCode": "CDG", "at": "2026-12-01T10:20:00"}}
+    return {"itineraries": [{"segments": [segment]}], "price": {"grandTotal": str(price), "currency": currency}}
+
+
+def hotel(name, price, currency="EUR"):
+    return {"name": name, "price": price, "currency": currency}
+
+
+def plan(flights, hotels, prompt="Trip to Paris from 3 to 7 March"):
+    """plan_trip with each branch returning (or raising) the given result."""
+    pipeline = ChatPipeline()
+
+    async def branch(result):
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    pipeline._trip_flights = lambda prompt, start, end: branch(flights)
+    pipeline._trip_hotels = lambda prompt, start, end: branch(hotels)
+    return asyncio.run(pipeline.plan_trip(prompt, TRIP))
+
+
+def test_trip_dates():
+    ranged = TRIP.model_copy(update={"date_range_details": DateRangeDetails(start_date="2026-12-01",
+                                                                             end_date="2026-12-05", is_range=True)})
+    assert ChatPipeline._trip_dates("any time", ranged) == ("2026-12-01", "2026-12-05")
+    # Resolved locally when the intent has no dates; a single day has no return date
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    assert ChatPipeline._trip_dates("Trip to Paris tomorrow", TRIP) == (tomorrow, None)
+    assert ChatPipeline._trip_dates("Trip to Paris", TRIP) == (None, None)
+    backwards = TRIP.model_copy(update={"date_range_details": DateRangeDetails(start_date="2026-12-05",
+                                                                                end_date="2026-12-01")})
+    assert ChatPipeline._trip_dates("any time", backwards) == ("2026-12-05", None)
+
+
+def test_packages_are_ranked_by_total_price():
+    result = plan([flight(300), flight(100), flight(50, "GBP")], [hotel("A", 80), hotel("B", 20)])
+    assert result["intent"] == "plan_trip"
+    assert [p["total_price"] for p in result["data"]] == [120, 180, 320, 380]
+    assert result["data"][0]["hotel"]["name"] == "B" and result["data"][0]["currency"] == "EUR"
+
+
+def test_degraded_results():
+    result = plan([flight(100)], HTTPException(status_code=502, detail="hotel API down"))
+    assert result["response"] == "Found 1 flights for your trip, but the hotel search did not return results."
+    assert result["data"][0]["hotel"] is None
+
+    result = plan(asyncio.TimeoutError(), [hotel("A", 80)])
+    assert result["response"] == "Found 1 hotels for your trip, but the flight search did not return results."
+
+    # Both branches answered, but nothing could be combined
+    result = plan([flight(100, "GBP")], [hotel("A", 80)])
+    assert "different currencies" in result["response"] and len(result["data"]) == 2
+
+    assert plan([], [])["response"] == NO_TRIP_RESPONSE
+
+
+def test_both_branches_shed():
+    with pytest.raises(Overloaded):
+        plan(Overloaded("amadeus", QUEUE_FULL, 1.0), Overloaded("amadeus", QUEUE_FULL, 1.0))
+
+
+def test_trip_flights_record_the_search_they_run(monkeypatch):
+    pipeline = ChatPipeline()
+    recorded, searched = [], []
+
+    async def extract(prompt):
+        return FlightSearchQueryDetails(origin_iata="LON", destination_iata="PAR", max_results=3)
+
+    async def search(details, max_results=None):
+        searched.append((details, max_results))
+        return {"results": {"data": [flight(100)]}}
+
+    pipeline.extract_flight_details = extract
+    monkeypatch.setattr(pipeline.actuator, "search_flights_advanced", search)
+    monkeypatch.setattr(chat_pipeline.cache_warmer, "record_search", lambda details, advanced: recorded.append(details))
+    asyncio.run(pipeline._trip_flights("Trip to Paris", "2026-12-01", "2026-12-05"))
+    (details, max_results), = searched
+    assert recorded == [details] and details.max_results == max_results == trip_max_packages
+    assert (details.departure_date, details.return_date) == ("2026-12-01", "2026-12-05")
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.environment import Actuator
+from utils.ttl_cache import TTLCache
+
+
+def test_coalesced_callers_share_one_load_and_are_not_marked_cached():
+    cache, calls = TTLCache(ttl=60), []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "calendar", None
+
+    async def scenario():
+        first = await asyncio.gather(*(cache.get_or_load_entry("MAD-PAR", load) for _ in range(3)))
+        return first, await cache.get_or_load_entry("MAD-PAR", load)
+
+    first, later = asyncio.run(scenario())
+    assert first == [("calendar", False)] * 3 and later == ("calendar", True) and len(calls) == 1
+
+
+def test_cancelling_the_first_caller_does_not_cancel_the_others():
+    cache = TTLCache(ttl=60)
+
+    async def load():
+        await asyncio.sleep(0.05)
+        return "offers", None
+
+    async def scenario():
+        loader = asyncio.create_task(cache.get_or_load("MAD-PAR", load))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load("MAD-PAR", load))
+        await asyncio.sleep(0.01)
+        loader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await loader
+        return await waiter
+
+    assert asyncio.run(scenario()) == "offers"
+    # The load finished for the waiter and was stored
+    assert cache.get("MAD-PAR") == "offers"
+
+
+def test_failures_reach_every_caller_and_are_not_cached():
+    cache, calls = TTLCache(ttl=60), []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("Amadeus down")
+
+    async def scenario():
+        return await asyncio.gather(cache.get_or_load("k", load), cache.get_or_load("k", load), return_exceptions=True)
+
+    assert [str(e) for e in asyncio.run(scenario())] == ["Amadeus down"] * 2 and len(calls) == 1
+    with pytest.raises(ValueError):
+        asyncio.run(cache.get_or_load("k", load))
+    assert len(calls) == 2
+
+
+def test_only_offers_from_the_stored_entry_carry_cached_at(stubs):
+    actuator = Actuator()
+    params = {"originLocationCode": "DEL", "destinationLocationCode": "BOM", "departureDate": "2026-12-01",
+              "adults": 1, "max": 2}
+
+    async def scenario():
+        fresh = await asyncio.gather(*(actuator._fetch_flight_offers(params) for _ in range(2)))
+        return fresh, await actuator._fetch_flight_offers(params)
+
+    fresh, cached = asyncio.run(scenario())
+    _, amadeus = stubs
+    assert amadeus.calls["/v2/shopping/flight-offers"] == 1
+    assert [cached_at for _, _, cached_at in fresh] == [None, None]
+    assert cached[0] == 200 and cached[2] is not None
@@ -0,0 +1,176 @@
+"""
+Admission control for /chat: bounded queues in front of the expensive stages, and load shedding.
+
+A single Ollama backend and the Amadeus quota serve a handful of requests at a time. Without a
+bound, a traffic spike queues requests until clients give up, and the server keeps working on
+answers nobody will read. Each stage (`llm_stage`, `amadeus_stage`) therefore admits a fixed number
+of concurrent calls and a bounded number of waiters, and sheds with `Overloaded` when
+
+- its queue is full ("queue_full", mapped to 429), or
+- the expected wait (waiters ahead / slots x mean time a slot is held) would run past the request's
+  deadline, or the deadline has already passed ("deadline", mapped to 503).
+
+Both carry a `retry_after_s` for the Retry-After header. The deadline is set per request with
+`deadline_scope(seconds)`; stages are checked when entered, so a request that ran out of time stops
+at the next stage boundary instead of starting work in flight calls cannot take back:
+
+	with deadline_scope(chat_deadline_s):
+		check_admission()          # shed at the door before any work
+		async with llm_stage:      # waits for a slot, or raises Overloaded
+			...
+
+Queue depth, slots in use and shed counts are exported on GET /metrics.
+"""
+import asyncio
+import math
+import os
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Iterator, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.main_config import (llm_stage_concurrency, llm_stage_max_queue, amadeus_stage_concurrency,
+                                amadeus_stage_max_queue)
+from utils.metrics import stage_queue_depth, stage_slots_in_use, requests_shed_total
+
+QUEUE_FULL, DEADLINE = "queue_full", "deadline"
+
+# time.monotonic() by which the current request must be answered, None for no deadline
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class Overloaded(Exception):
+	"""A stage shed the request; `reason` is "queue_full" or "deadline"."""
+
+	def __init__(self, stage: str, reason: str, retry_after_s: float) -> None:
+		super().__init__(f"The {stage} stage is overloaded ({reason}), retry in {retry_after_s:.0f}s")
+		self.stage = stage
+		self.reason = reason
+		self.retry_after_s = retry_after_s
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+	"""Give the enclosed work `seconds` from now to finish (None or <= 0: no deadline)."""
+	token = _deadline.set(time.monotonic() + seconds if seconds and seconds > 0 else None)
+	try:
+		yield
+	finally:
+		_deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+	"""Seconds left until the current request's deadline, None without one."""
+	deadline = _deadline.get()
+	return None if deadline is None else deadline - time.monotonic()
+
+
+class StageQueue:
+	"""
+	At most `capacity` holders at once and `max_queue` waiters (negative: unbounded), served FIFO.
+
+	Used as an async context manager around one call of the stage. The mean hold time is an EWMA of
+	the measured holds; until the first one is measured, only full queues and passed deadlines shed.
+	"""
+
+	def __init__(self, name: str, capacity: int, max_queue: int, alpha: float = 0.2) -> None:
+		self.name = name
+		self.capacity = max(1, capacity)
+		self.max_queue = max_queue
+		self.alpha = alpha
+		self.in_use = 0
+		self.hold_s: Optional[float] = None
+		self._waiters: Deque[asyncio.Future] = deque()
+		# Start times of the slots held by the current task, innermost last
+		self._held: ContextVar[Tuple[float, ...]] = ContextVar(f"{name}_stage_held", default=())
+
+	@property
+	def waiting(self) -> int:
+		return len(self._waiters)
+
+	def expected_wait(self) -> float:
+		"""Seconds a request joining the queue now would wait for a slot."""
+		if self.in_use < self.capacity and not self._waiters:
+			return 0.0
+		return (len(self._waiters) + 1) / self.capacity * (self.hold_s or 0.0)
+
+	def _shed(self, reason: str) -> None:
+		requests_shed_total.labels(self.name, reason).inc()
+		raise Overloaded(self.name, reason, max(1.0, math.ceil(self.expected_wait())))
+
+	def admit(self) -> None:
+		"""Raise `Overloaded` if a request arriving now should not wait for this stage."""
+		remaining = remaining_time()
+		if remaining is not None and remaining <= 0:
+			self._shed(DEADLINE)
+		if self.in_use < self.capacity and not self._waiters:
+			return
+		if 0 <= self.max_queue <= len(self._waiters):
+			self._shed(QUEUE_FULL)
+		if remaining is not None and self.expected_wait() > remaining:
+			self._shed(DEADLINE)
+
+	async def acquire(self) -> None:
+		self.admit()
+		if self.in_use < self.capacity and not self._waiters:
+			self.in_use += 1
+			stage_slots_in_use.labels(self.name).set(self.in_use)
+			return
+		waiter = asyncio.get_running_loop().create_future()
+		self._waiters.append(waiter)
+		stage_queue_depth.labels(self.name).set(len(self._waiters))
+		try:
+			# A released slot is handed to the waiter directly, so in_use stays unchanged
+			await asyncio.wait_for(waiter, remaining_time())
+		except BaseException as e:
+			if waiter.done() and not waiter.cancelled():
+				# Granted just as the wait was given up: pass the slot on
+				self.release()
+			elif waiter in self._waiters:
+				self._waiters.remove(waiter)
+			stage_queue_depth.labels(self.name).set(len(self._waiters))
+			if isinstance(e, asyncio.TimeoutError):
+				self._shed(DEADLINE)
+			raise
+
+	def release(self) -> None:
+		while self._waiters:
+			waiter = self._waiters.popleft()
+			if not waiter.done():
+				waiter.set_result(None)
+				stage_queue_depth.labels(self.name).set(len(self._waiters))
+				return
+		stage_queue_depth.labels(self.name).set(0)
+		self.in_use -= 1
+		stage_slots_in_use.labels(self.name).set(self.in_use)
+
+	async def __aenter__(self) -> "StageQueue":
+		await self.acquire()
+		self._held.set(self._held.get() + (time.monotonic(),))
+		return self
+
+	async def __aexit__(self, *exc) -> None:
+		held = self._held.get()
+		if held:
+			# An async generator may be closed from another context; then the hold is just not measured
+			self._held.set(held[:-1])
+			hold = time.monotonic() - held[-1]
+			self.hold_s = hold if self.hold_s is None else self.alpha * hold + (1 - self.alpha) * self.hold_s
+		self.release()
+
+
+llm_stage = StageQueue("llm", llm_stage_concurrency, llm_stage_max_queue)
+amadeus_stage = StageQueue("amadeus", amadeus_stage_concurrency, amadeus_stage_max_queue)
+
+
+def check_admission() -> None:
+	"""
+	Door check for a new /chat request against the LLM stage.
+
+	The intent classifier answers most prompts locally, but flight, hotel and trip searches still
+	need an LLM extraction, so a request the LLM stage would shed anyway is turned away up front.
+	"""
+	llm_stage.admit()
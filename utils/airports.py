@@ -0,0 +1,389 @@
+"""
+Airport reference index over data/IATA.csv.
+
+The CSV is parsed with the csv module (names such as "Bangkok, Don Muang" or "Chicago(IL), Midway"
+are quoted), every airport is kept per city, and lookups are served from in-memory tables:
+
+	- `by_code` / `by_city`: O(1) dict lookups (city aliases such as "Mumbai" for "Bombay" included)
+	- `city_prefix`: the one city whose name starts with the given words ("Washington" -> "Washington DC")
+	- `autocomplete`: prefix search over a sorted key array (bisect, the compact form of a trie)
+	- `fuzzy`: typo-tolerant lookup via a symmetric-delete index, verified with Damerau-Levenshtein
+
+The index is built lazily on first use by `get_airport_index()`. `python utils/airports.py --compile`
+writes a precompiled pickle next to the CSV that later processes load instead of re-parsing.
+"""
+import bisect
+import csv
+import pickle
+import re
+import threading
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.data_config import IATA_CODES_FILE, IATA_INDEX_FILE
+
+_INDEX_FORMAT = 2
+_CITY_SPLIT_RE = re.compile(r"\s*(?:,|\(|\s-\s?|-\s)")
+_HEAD_SPLIT_RE = re.compile(r"\s*(?:,|\s-\s?|-\s)")
+_PAREN_RE = re.compile(r"\(([^)]*)\)")
+_METRO_RE = re.compile(r"\s*Metropolitan Area$")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+class Airport(NamedTuple):
+	code: str
+	name: str
+	city: str
+	country: str
+	is_metro: bool = False
+	region: str = ""  # state code telling same-named cities apart, e.g. "GA" in "Albany (GA)"
+
+
+def normalize(text: str) -> str:
+	"""Lowercase, strip accents and collapse punctuation so "São Paulo" == "sao paulo"."""
+	text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+	return _NON_ALNUM_RE.sub(" ", text).strip()
+
+
+# Spellings of the IATA.csv country column and of users, mapped to one name per country
+_COUNTRY_ALIASES = {
+	"usa": "united states", "us": "united states", "united states of america": "united states", "america": "united states",
+	"uk": "united kingdom", "great britain": "united kingdom", "britain": "united kingdom", "england": "united kingdom",
+	"scotland": "united kingdom", "wales": "united kingdom", "northern ireland": "united kingdom",
+	"uae": "united arab emirates", "emirates": "united arab emirates",
+	"korea south": "south korea", "korea": "south korea", "republic of korea": "south korea",
+	"pr china": "china", "prc": "china", "viet nam": "vietnam", "holland": "netherlands", "the netherlands": "netherlands",
+	"czechia": "czech republic", "maledives": "maldives", "saudi arabien": "saudi arabia", "the bahamas": "bahamas",
+	"lao pdr": "laos", "turkiye": "turkey", "ivory coast": "cote d ivoire", "st kitts and nevis": "saint kitts and nevis",
+	"saint vincent the grenadines": "saint vincent and the grenadines", "sao tome principe": "sao tome and principe",
+	# Entries whose last part is not the country
+	"india maharashtra": "india", "fiji suva": "fiji", "gabon loyautte": "gabon", "macau china sar": "macau",
+	"switzerland france": "switzerland", "congo drc": "dr congo", "congo roc": "republic of the congo",
+}
+_COUNTRY_STATE_RE = re.compile(r"\(\s*[A-Z]{2}\s*\)")
+
+
+def country_key(country: str) -> str:
+	"""
+	One comparable name per country: "USA", "USA(LA)" and "United States" -> "united states",
+	"Scotland,UK" -> "united kingdom", "Fujian,PR China" -> "china", "Croatia(Hrvatska)" -> "croatia".
+	"""
+	text = normalize(_COUNTRY_STATE_RE.sub(" ", country))
+	if text in _COUNTRY_ALIASES:
+		return _COUNTRY_ALIASES[text]
+	text = normalize(_PAREN_RE.sub(" ", country))
+	if text in _COUNTRY_ALIASES:
+		return _COUNTRY_ALIASES[text]
+	parts = [normalize(part) for part in re.split(r"[,/]", _PAREN_RE.sub(" ", country)) if normalize(part)]
+	if len(parts) > 1:
+		# "Fujian,PR China", "Hokkaido, Japan", "Ibiza/Spain": the country comes last
+		return _COUNTRY_ALIASES.get(parts[-1], parts[-1])
+	return text
+
+
+def _split_name(name: str) -> Tuple[str, List[str], str, str]:
+	"""
+	Return (city, city aliases, airport-specific part, region) for a CSV name column.
+
+	`region` is a state code attached to the city itself ("Albany(NY) - ..."), not to the airport
+	("New York- Newark (NJ)").
+	"""
+	parts = _CITY_SPLIT_RE.split(_PAREN_RE.sub(" ", name), maxsplit=1)
+	city = _METRO_RE.sub("", parts[0]).strip()
+	head = _HEAD_SPLIT_RE.split(name, maxsplit=1)[0]
+	aliases, region = [], ""
+	for alias in _PAREN_RE.findall(name):
+		alias = alias.strip()
+		# "(IL)", "(NY)" are state codes, "(Mumbai)", "(London)" are city names
+		if len(alias) <= 3 and alias.isupper():
+			if not region and f"({alias})" in head.replace(" ", ""):
+				region = alias
+		elif alias != city:
+			aliases.append(alias)
+	if "/" in city:
+		# "Frankfurt/Main", "Groton/New London"
+		aliases.extend(part.strip() for part in city.split("/") if len(part.strip()) > 3)
+	airport_part = parts[1].strip(" ,-") if len(parts) > 1 else ""
+	return city, aliases, airport_part, region
+
+
+def damerau_levenshtein(a: str, b: str, max_distance: int) -> int:
+	"""Optimal string alignment distance, returning max_distance + 1 once it is exceeded."""
+	if abs(len(a) - len(b)) > max_distance:
+		return max_distance + 1
+	previous2, previous = None, list(range(len(b) + 1))
+	for i in range(1, len(a) + 1):
+		current = [i] + [0] * len(b)
+		row_min = i
+		for j in range(1, len(b) + 1):
+			cost = 0 if a[i - 1] == b[j - 1] else 1
+			current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+			if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+				current[j] = min(current[j], previous2[j - 2] + 1)
+			row_min = min(row_min, current[j])
+		if row_min > max_distance:
+			return max_distance + 1
+		previous2, previous = previous, current
+	return previous[-1]
+
+
+def _deletes(word: str, distance: int) -> set:
+	results, frontier = {word}, {word}
+	for _ in range(distance):
+		frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+		results |= frontier
+	return results
+
+
+class AirportIndex:
+	"""In-memory airport tables; build with `from_csv` or `load`."""
+
+	def __init__(
+		self,
+		airports: List[Airport],
+		keys: Dict[str, Tuple[int, ...]],
+		city_keys: Optional[set] = None,
+		max_distance: int = 2,
+	) -> None:
+		self.airports = airports
+		self.keys = keys
+		# Fuzzy matching covers city names and aliases; long airport names would bloat the delete index
+		self.city_keys = city_keys if city_keys is not None else set(keys)
+		self.max_distance = max_distance
+		self._codes = {}
+		group_sizes = {}
+		for i, airport in enumerate(airports):
+			self._codes.setdefault(airport.code, i)
+			group = self.city_group(airport)
+			group_sizes[group] = group_sizes.get(group, 0) + 1
+		self._ranks = [
+			(-group_sizes[self.city_group(a)], not a.is_metro, i) for i, a in enumerate(airports)
+		]
+		self._sorted_keys = sorted(keys)
+		self._deletes = None
+		self._deletes_lock = threading.Lock()
+
+	@classmethod
+	def from_csv(cls, path: str = IATA_CODES_FILE) -> "AirportIndex":
+		rows = []
+		with open(path, "r", newline="", encoding="utf-8") as file:
+			reader = csv.reader(file)
+			next(reader, None)  # header
+			for row in reader:
+				if len(row) < 4 or not row[3].strip():
+					continue
+				name, country, code = row[1].strip(), row[2].strip(), row[3].strip().upper()
+				city, aliases, airport_part, region = _split_name(name)
+				rows.append((code, name, city, country, region, aliases, airport_part))
+
+		# Same-named cities in different countries (London UK / London, Canada) are separate groups; so are
+		# cities listed once per state ("Albany (GA)", "Albany(NY) - ...").
+		states_per_city = {}
+		for code, name, city, country, region, aliases, airport_part in rows:
+			if region:
+				states_per_city.setdefault((normalize(city), country), set()).add(region)
+		rows = [
+			(code, name, city, country, region if len(states_per_city.get((normalize(city), country), ())) > 1 else "",
+			 aliases, airport_part)
+			for code, name, city, country, region, aliases, airport_part in rows
+		]
+		codes_per_city = {}
+		for code, _, city, country, region, *_ in rows:
+			codes_per_city.setdefault((normalize(city), country, region), set()).add(code)
+
+		airports, keys, city_keys = [], {}, set()
+		for code, name, city, country, region, aliases, airport_part in rows:
+			# A metro entry is the bare city ("Paris", "New York(NY)") or "...Metropolitan Area" grouping other airports
+			is_metro = (not airport_part or bool(_METRO_RE.search(name))) \
+				and len(codes_per_city[(normalize(city), country, region)]) > 1
+			airport_id = len(airports)
+			airports.append(Airport(code, name, city, country, is_metro, region))
+			names = {normalize(city), *(normalize(a) for a in aliases)}
+			city_keys.update(names)
+			for key in names | {normalize(airport_part)}:
+				if key:
+					keys.setdefault(key, []).append(airport_id)
+		city_keys.discard("")
+		return cls(airports, {k: tuple(v) for k, v in keys.items()}, city_keys)
+
+	def save(self, path: str = IATA_INDEX_FILE) -> None:
+		"""Write the compact precompiled form (plain tuples, fuzzy deletes included)."""
+		self._ensure_deletes()
+		payload = {
+			"format": _INDEX_FORMAT,
+			"airports": [tuple(a) for a in self.airports],
+			"keys": self.keys,
+			"city_keys": sorted(self.city_keys),
+			"deletes": self._deletes,
+			"max_distance": self.max_distance,
+		}
+		with open(path, "wb") as file:
+			pickle.dump(payload, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+	@classmethod
+	def load(cls, path: str = IATA_INDEX_FILE) -> "AirportIndex":
+		with open(path, "rb") as file:
+			payload = pickle.load(file)
+		if payload.get("format") != _INDEX_FORMAT:
+			raise ValueError(f"Unsupported airport index format in {path}")
+		index = cls([Airport(*a) for a in payload["airports"]], payload["keys"], set(payload["city_keys"]),
+		            payload["max_distance"])
+		index._deletes = payload["deletes"]
+		return index
+
+	@staticmethod
+	def city_group(airport: Airport) -> tuple:
+		"""Key shared by all airports of one city (metro area)."""
+		return normalize(airport.city), airport.country, airport.region
+
+	def _rank(self, i: int) -> tuple:
+		return self._ranks[i]
+
+	def _airports(self, ids, ranked: bool = True) -> List[Airport]:
+		# Bigger city groups first and their metro code first, then file order; a code listed twice
+		# (e.g. STN) is returned once
+		seen, result = set(), []
+		for i in (sorted(ids, key=self._rank) if ranked else ids):
+			if self.airports[i].code not in seen:
+				seen.add(self.airports[i].code)
+				result.append(self.airports[i])
+		return result
+
+	def by_code(self, code: str) -> Optional[Airport]:
+		i = self._codes.get(code.strip().upper())
+		return self.airports[i] if i is not None else None
+
+	def by_city(self, city: str) -> List[Airport]:
+		"""All airports of a city (or airport name), metro code first."""
+		return self._airports(self.keys.get(normalize(city), ()))
+
+	def autocomplete(self, prefix: str, limit: int = 10) -> List[Airport]:
+		"""Airports whose city, city alias or airport name starts with `prefix`."""
+		prefix = normalize(prefix)
+		if not prefix:
+			return []
+		ids = []
+		start = bisect.bisect_left(self._sorted_keys, prefix)
+		for key in self._sorted_keys[start:]:
+			if not key.startswith(prefix):
+				break
+			ids.extend(self.keys[key])
+		return self._airports(ids)[:limit]
+
+	def _ensure_deletes(self) -> Dict[str, Tuple[str, ...]]:
+		if self._deletes is None:
+			with self._deletes_lock:
+				if self._deletes is None:
+					deletes = {}
+					for key in self.city_keys:
+						for variant in _deletes(key, self.max_distance):
+							deletes.setdefault(variant, []).append(key)
+					self._deletes = {k: tuple(v) for k, v in deletes.items()}
+		return self._deletes
+
+	def fuzzy(self, query: str, max_distance: Optional[int] = None, limit: int = 5) -> List[Airport]:
+		"""Typo-tolerant city/airport lookup ("Bangalor", "Frankfrut"), closest matches first."""
+		query = normalize(query)
+		if not query:
+			return []
+		max_distance = min(self.max_distance if max_distance is None else max_distance, self.max_distance)
+		# Short names need a tighter bound or everything matches
+		max_distance = min(max_distance, max(len(query) // 4, 1))
+		deletes = self._ensure_deletes()
+		candidates = set()
+		for variant in _deletes(query, max_distance):
+			candidates.update(deletes.get(variant, ()))
+		scored = []
+		for key in candidates:
+			distance = damerau_levenshtein(query, key, max_distance)
+			if distance <= max_distance:
+				scored.append((distance, key))
+		ids = []
+		for _, key in sorted(scored):
+			ids.extend(sorted(self.keys[key], key=self._rank))
+		return self._airports(ids, ranked=False)[:limit]
+
+	def city_prefix(self, query: str) -> List[Airport]:
+		"""
+		Airports of the one city whose name starts with the words of `query` ("Washington" -> "Washington DC").
+
+		Empty if no city or several cities match ("San" -> San Diego, San Jose, ...).
+		"""
+		query = normalize(query)
+		if not query:
+			return []
+		prefix = query + " "
+		ids = []
+		for key in self._sorted_keys[bisect.bisect_left(self._sorted_keys, prefix):]:
+			if not key.startswith(prefix):
+				break
+			if key in self.city_keys:
+				ids.extend(self.keys[key])
+		airports = self._airports(ids)
+		if len({self.city_group(a) for a in airports}) != 1:
+			return []
+		return airports
+
+	def metro_airports(self, text: str) -> List[Airport]:
+		"""
+		Individual airports of the city/metro area `text` refers to ("LON", "London", "LHR" -> LCY, LGW, LHR, ...).
+
+		The metro code itself is left out; a city with a single airport returns just that airport.
+		"""
+		resolved = self.resolve(text)
+		if not resolved:
+			return []
+		group = self.city_group(resolved[0])
+		members = [a for a in self.by_city(resolved[0].city) if self.city_group(a) == group]
+		airports = [a for a in members if not a.is_metro]
+		return airports or resolved[:1]
+
+	def resolve(self, text: str) -> List[Airport]:
+		"""
+		Best effort: exact city/airport name, IATA code, the one city whose name starts with the input's
+		words, then fuzzy match.
+
+		An all-caps three letter input ("GOA", "LHR") is treated as a code first, "Goa" as a city.
+		"""
+		text = text.strip()
+		code_like = len(text) == 3 and text.isalpha()
+		if code_like and text.isupper() and self.by_code(text):
+			return [self.by_code(text)]
+		airports = self.by_city(text)
+		if not airports and code_like and self.by_code(text):
+			airports = [self.by_code(text)]
+		return airports or self.city_prefix(text) or self.fuzzy(text)
+
+
+_index: Optional[AirportIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_airport_index() -> AirportIndex:
+	"""Load the shared index on first use: precompiled file if it is up to date, else the CSV."""
+	global _index
+	if _index is None:
+		with _index_lock:
+			if _index is None:
+				compiled_is_fresh = os.path.exists(IATA_INDEX_FILE) and \
+					os.path.getmtime(IATA_INDEX_FILE) >= os.path.getmtime(IATA_CODES_FILE)
+				if compiled_is_fresh:
+					try:
+						_index = AirportIndex.load()
+					except (OSError, ValueError, pickle.UnpicklingError):
+						_index = None
+				if _index is None:
+					_index = AirportIndex.from_csv()
+	return _index
+
+
+if __name__ == "__main__":
+	if "--compile" in sys.argv:
+		AirportIndex.from_csv().save()
+		print(f"Wrote {IATA_INDEX_FILE} ({os.path.getsize(IATA_INDEX_FILE) // 1024} KiB)")
+	else:
+		index = get_airport_index()
+		for query in sys.argv[1:] or ["London", "Bombay", "Mumbai", "LHR", "chic", "Bangalor"]:
+			print(f"{query!r}: {[a.code for a in index.resolve(query)]} / prefix {[a.code for a in index.autocomplete(query)]}")
@@ -0,0 +1,277 @@
+"""
+Rule based resolver for the relative and explicit date phrasings users type into the chat
+("tomorrow", "next Friday", "this weekend", "next month", "in December", "between X and Y").
+
+Conventions (all relative to the `now` passed in, which defaults to the local date):
+	- "next <weekday>", "next week", "next weekend" refer to the calendar week starting next Monday.
+	- "this <weekday>" is the next occurrence on or after today, "<weekday>" / "coming <weekday>" strictly after today.
+	- Explicit dates without a year roll over to next year once they are in the past.
+	- "in <month>" is the whole month (from today if it is the current month), in the next year if it has passed.
+"""
+import re
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sensors import DateRangeDetails
+
+
+_MONTHS = {
+	"january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4,
+	"may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8,
+	"september": 9, "sept": 9, "sep": 9, "october": 10, "oct": 10, "november": 11, "nov": 11,
+	"december": 12, "dec": 12,
+}
+_WEEKDAYS = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6}
+_NUMBER_WORDS = {
+	"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+	"seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}
+
+_MONTH = r"(?:" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\b\.?"
+_WEEKDAY = r"(?:" + "|".join(_WEEKDAYS) + r")\b"
+_DAY = r"\d{1,2}(?:st|nd|rd|th)?\b"
+_YEAR = r"(?:,?\s+\d{4}\b)?"
+_TOMORROW = r"(?:tomorrow|tommorrow|tomorow|tmrw)\b"
+# A bare day number ending a range ("Dec 20 to 27"), unless it counts something ("Dec 20 to 2 adults")
+_END_DAY = (rf"{_DAY}(?!\s*(?:adults?|people|passengers?|persons?|pax|travell?ers?|kids?|children|infants?"
+            r"|seats?|stops?|nights?|days?|weeks?|hours?|hrs?)\b)")
+
+# A single day, explicit or relative. Used on its own and as either side of a range.
+_SINGLE_DAY = (
+	r"(?:\d{4}-\d{1,2}-\d{1,2}\b"
+	rf"|{_DAY}\s+(?:of\s+)?{_MONTH}{_YEAR}"
+	rf"|{_MONTH}\s+{_DAY}{_YEAR}"
+	rf"|(?:the\s+)?day\s+after\s+{_TOMORROW}|{_TOMORROW}|today\b|tonight\b"
+	rf"|(?:(?:next|this|coming)\s+)?{_WEEKDAY})"
+)
+
+_ISO_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_DAY_MONTH_RE = re.compile(rf"(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({_MONTH})(?:,?\s+(\d{{4}}))?")
+_MONTH_DAY_RE = re.compile(rf"({_MONTH})\s+(\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s+(\d{{4}}))?")
+_BARE_DAY_RE = re.compile(r"(\d{1,2})(?:st|nd|rd|th)?")
+_WEEKDAY_RE = re.compile(rf"(?:(next|this|coming)\s+)?({_WEEKDAY})")
+
+_RANGE_RE = re.compile(
+	rf"\b(?:between|from)\s+({_SINGLE_DAY})\s*(?:and|to|till|until|through|-)\s*({_SINGLE_DAY}|{_END_DAY})"
+	rf"|\b({_SINGLE_DAY})\s*(?:to|till|until|through|-)\s*({_SINGLE_DAY}|{_END_DAY})"
+	# "between 10 and 15 December", "from 10 to 15 dec", "10-15 Dec": the month is only on the right
+	rf"|\b(?:between\s+({_DAY})\s*and|(?:from\s+)?({_DAY})\s*(?:to|till|until|through|-))"
+	rf"\s*({_DAY}\s+(?:of\s+)?{_MONTH}{_YEAR})"
+)
+_WEEKEND_RE = re.compile(r"\b(this|next|coming)?\s*weekend\b")
+_WEEK_RE = re.compile(r"\b(this|next|coming)\s+week\b")
+_MONTH_REL_RE = re.compile(r"\b(this|next|coming)\s+month\b")
+_NAMED_MONTH_RE = re.compile(rf"\b(?:in|during|for|throughout|whole\s+of)\s+(?:the\s+month\s+of\s+)?({_MONTH})(?!\s+\d{{1,2}}\b)(?:\s+(\d{{4}})\b)?")
+_IN_N_RE = re.compile(r"\b(?:in|after)\s+(\d+|" + "|".join(_NUMBER_WORDS) + r")\s+(day|week|month)s?\b")
+_SINGLE_RE = re.compile(rf"\b{_SINGLE_DAY}")
+
+
+def _month_number(token: str) -> int:
+	return _MONTHS[token.rstrip(".")]
+
+
+def _end_of_month(year: int, month: int) -> date:
+	return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _roll_forward(candidate: date, today: date) -> date:
+	"""Move a year-less date into next year once it is already in the past."""
+	if candidate < today:
+		return candidate.replace(year=candidate.year + 1)
+	return candidate
+
+
+def _week_start(today: date, weeks_ahead: int) -> date:
+	return today - timedelta(days=today.weekday()) + timedelta(weeks=weeks_ahead)
+
+
+def _parse_day(text: str, today: date, anchor: Optional[date] = None) -> Optional[Tuple[date, bool]]:
+	"""
+	Parse a single day phrase into a date.
+
+	Returns:
+		(date, explicit_year) or None if the phrase is not a recognised day.
+		`anchor` lets a bare day number ("27" in "Dec 20 to 27") inherit month and year.
+	"""
+	text = text.strip()
+	m = _ISO_RE.fullmatch(text)
+	if m:
+		return date(int(m.group(1)), int(m.group(2)), int(m.group(3))), True
+	m = _DAY_MONTH_RE.fullmatch(text) or _MONTH_DAY_RE.fullmatch(text)
+	if m:
+		day_token, month_token = (m.group(1), m.group(2)) if m.re is _DAY_MONTH_RE else (m.group(2), m.group(1))
+		if m.group(3):
+			return date(int(m.group(3)), _month_number(month_token), int(day_token)), True
+		return _roll_forward(date(today.year, _month_number(month_token), int(day_token)), today), False
+	if re.fullmatch(rf"(?:the\s+)?day\s+after\s+{_TOMORROW}", text):
+		return today + timedelta(days=2), False
+	if re.fullmatch(_TOMORROW, text):
+		return today + timedelta(days=1), False
+	if text in ("today", "tonight"):
+		return today, False
+	m = _WEEKDAY_RE.fullmatch(text)
+	if m:
+		qualifier, target = m.group(1), _WEEKDAYS[m.group(2)]
+		if qualifier == "next":
+			return _week_start(today, 1) + timedelta(days=target), False
+		delta = (target - today.weekday()) % 7
+		if delta == 0 and qualifier != "this":
+			delta = 7
+		return today + timedelta(days=delta), False
+	m = _BARE_DAY_RE.fullmatch(text)
+	if m and anchor is not None:
+		candidate = anchor.replace(day=int(m.group(1)))
+		if candidate < anchor:
+			year, month = (anchor.year + 1, 1) if anchor.month == 12 else (anchor.year, anchor.month + 1)
+			candidate = date(year, month, int(m.group(1)))
+		return candidate, False
+	return None
+
+
+def _details(start: date, end: Optional[date] = None) -> DateRangeDetails:
+	return DateRangeDetails(
+		start_date=start.isoformat(),
+		end_date=end.isoformat() if end else None,
+		is_range=end is not None,
+	)
+
+
+def _resolve_range(m: re.Match, today: date) -> Optional[DateRangeDetails]:
+	if m.group(7):
+		return _resolve_day_range(m, today)
+	left, right = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+	start = _parse_day(left, today)
+	if start is None:
+		return None
+	end = _parse_day(right, today, anchor=start[0])
+	if end is None:
+		return None
+	end_date, end_has_year = end
+	weekday = _WEEKDAY_RE.fullmatch(right.strip())
+	if weekday is not None:
+		if weekday.group(1) != "next" or end_date < start[0]:
+			# "next friday to sunday": the first such weekday on or after the start
+			end_date = start[0] + timedelta(days=(_WEEKDAYS[weekday.group(2)] - start[0].weekday()) % 7)
+	elif end_date < start[0]:
+		if end_has_year or not (_DAY_MONTH_RE.fullmatch(right.strip()) or _MONTH_DAY_RE.fullmatch(right.strip())):
+			return None
+		# "Dec 28 to Jan 3" crosses the year boundary
+		end_date = end_date.replace(year=end_date.year + 1)
+	return _details(start[0], end_date)
+
+
+def _resolve_day_range(m: re.Match, today: date) -> Optional[DateRangeDetails]:
+	"""A range whose start is a bare day number taking the month (and year) of its end."""
+	end = _parse_day(m.group(7), today)
+	if end is None:
+		return None
+	end_date = end[0]
+	start_day = int(_BARE_DAY_RE.match(m.group(5) or m.group(6)).group(1))
+	if start_day <= end_date.day:
+		return _details(end_date.replace(day=start_day), end_date)
+	# "28 to 3 Jan" starts in the month before
+	year, month = (end_date.year - 1, 12) if end_date.month == 1 else (end_date.year, end_date.month - 1)
+	return _details(date(year, month, start_day), end_date)
+
+
+def _resolve_weekend(m: re.Match, today: date) -> DateRangeDetails:
+	if m.group(1) == "next":
+		saturday = _week_start(today, 1) + timedelta(days=5)
+	elif today.weekday() == 6:
+		return _details(today, today)
+	else:
+		saturday = today + timedelta(days=5 - today.weekday())
+	return _details(saturday, saturday + timedelta(days=1))
+
+
+def _resolve_week(m: re.Match, today: date) -> DateRangeDetails:
+	if m.group(1) == "this":
+		return _details(today, _week_start(today, 0) + timedelta(days=6))
+	start = _week_start(today, 1)
+	return _details(start, start + timedelta(days=6))
+
+
+def _resolve_relative_month(m: re.Match, today: date) -> DateRangeDetails:
+	if m.group(1) == "this":
+		return _details(today, _end_of_month(today.year, today.month))
+	year, month = (today.year + 1, 1) if today.month == 12 else (today.year, today.month + 1)
+	return _details(date(year, month, 1), _end_of_month(year, month))
+
+
+def _resolve_named_month(m: re.Match, today: date) -> DateRangeDetails:
+	month = _month_number(m.group(1))
+	if m.group(2):
+		year = int(m.group(2))
+	else:
+		year = today.year + 1 if month < today.month else today.year
+	start = today if (year, month) == (today.year, today.month) else date(year, month, 1)
+	return _details(start, _end_of_month(year, month))
+
+
+def _resolve_in_n(m: re.Match, today: date) -> DateRangeDetails:
+	count = int(m.group(1)) if m.group(1).isdigit() else _NUMBER_WORDS[m.group(1)]
+	unit = m.group(2)
+	if unit == "day":
+		return _details(today + timedelta(days=count))
+	if unit == "week":
+		return _details(today + timedelta(weeks=count))
+	month_index = today.month - 1 + count
+	year, month = today.year + month_index // 12, month_index % 12 + 1
+	return _details(date(year, month, min(today.day, calendar.monthrange(year, month)[1])))
+
+
+def _resolve_single(m: re.Match, today: date) -> Optional[DateRangeDetails]:
+	parsed = _parse_day(m.group(0), today)
+	return _details(parsed[0]) if parsed else None
+
+
+# Ordered from most to least specific; the first rule that resolves wins.
+_RULES = (
+	(_RANGE_RE, _resolve_range),
+	(_WEEKEND_RE, _resolve_weekend),
+	(_WEEK_RE, _resolve_week),
+	(_MONTH_REL_RE, _resolve_relative_month),
+	(_NAMED_MONTH_RE, _resolve_named_month),
+	(_IN_N_RE, _resolve_in_n),
+	(_SINGLE_RE, _resolve_single),
+)
+
+
+def resolve_date_expression(prompt: str, now: Optional[datetime] = None) -> Optional[DateRangeDetails]:
+	"""
+	Resolve the date or date range in a prompt without calling the LLM.
+
+	Args:
+		prompt (str): The user's natural language query.
+		now (Optional[datetime]): Reference time for relative phrases (default: now).
+
+	Returns:
+		Optional[DateRangeDetails]: The resolved dates, or None if no supported phrasing was found,
+		or the prompt holds more than one date expression ("return on Dec 30, leave Dec 20"), and
+		the caller should fall back to the LLM.
+	"""
+	today = (now or datetime.now()).date()
+	text = prompt.lower()
+	for pattern, resolver in _RULES:
+		for m in pattern.finditer(text):
+			try:
+				details = resolver(m, today)
+			except ValueError:
+				# Impossible calendar dates such as "Feb 30"
+				details = None
+			if details is not None:
+				return None if _has_other_date(text, m) else details
+	return None
+
+
+def _has_other_date(text: str, used: re.Match) -> bool:
+	"""Whether a date phrase outside the resolved one is in the text (which one is meant is then a guess)."""
+	start, end = used.span()
+	for pattern, _ in _RULES:
+		for m in pattern.finditer(text):
+			if m.group(0).strip() and (m.end() <= start or m.start() >= end):
+				return True
+	return False
@@ -0,0 +1,73 @@
+"""
+Per-origin index of Flight Inspiration Search results ("cheapest flights from MAD to anywhere").
+
+Amadeus returns one cheapest fare per destination. The index keeps them pre-sorted by price,
+trip length and departure date, with lookups by country and departure month, so follow-up
+filters ("under 200", "in March", "only Italy") are answered without another upstream call.
+"""
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sensors import FlightDestination, InspirationSearchDetails, InspirationSort
+from utils.airports import country_key
+
+
+class DestinationIndex:
+	"""Destinations from one origin, queryable by budget, month, country and trip length"""
+
+	def __init__(self, origin: str, destinations: List[FlightDestination], fetched_at: Optional[float] = None) -> None:
+		self.origin = origin
+		self.destinations = destinations
+		self.fetched_at = fetched_at or time.time()
+
+		ids = range(len(destinations))
+		self._by_price = sorted(ids, key=lambda i: (destinations[i].price, destinations[i].departure_date))
+		self._prices = [destinations[i].price for i in self._by_price]
+		self._orders = {
+			InspirationSort.PRICE: self._by_price,
+			InspirationSort.DURATION: sorted(ids, key=lambda i: (destinations[i].trip_days or 0, destinations[i].price)),
+			InspirationSort.DEPARTURE_DATE: sorted(ids, key=lambda i: (destinations[i].departure_date, destinations[i].price)),
+		}
+		self._by_country: Dict[str, List[int]] = defaultdict(list)
+		self._by_month: Dict[str, List[int]] = defaultdict(list)
+		for i, d in enumerate(destinations):
+			if d.country:
+				# "USA" in IATA.csv matches "United States" from the LLM
+				self._by_country[country_key(d.country)].append(i)
+			self._by_month[d.departure_date[:7]].append(i)
+
+	def __len__(self) -> int:
+		return len(self.destinations)
+
+	def query(self, details: InspirationSearchDetails) -> List[FlightDestination]:
+		"""Destinations matching the budget/month/country/trip-length filters of `details`, in `details.sort_by` order."""
+		candidates = None
+		if details.max_price is not None:
+			# Price order is precomputed, so the budget filter is a prefix of it
+			candidates = set(self._by_price[:bisect_right(self._prices, details.max_price)])
+		for bucket, value in ((self._by_month, details.departure_month), (self._by_country, details.country)):
+			if value:
+				ids = set(bucket.get(country_key(value) if bucket is self._by_country else value, ()))
+				candidates = ids if candidates is None else candidates & ids
+
+		results = []
+		for i in self._orders[details.sort_by or InspirationSort.PRICE]:
+			if candidates is not None and i not in candidates:
+				continue
+			d = self.destinations[i]
+			if details.min_trip_days is not None and (d.trip_days or 0) < details.min_trip_days:
+				continue
+			if details.max_trip_days is not None and d.trip_days is not None and d.trip_days > details.max_trip_days:
+				continue
+			results.append(d)
+			if len(results) >= (details.max_results or 10):
+				break
+		return results
+
+	def countries(self) -> List[str]:
+		return sorted({d.country for d in self.destinations if d.country})
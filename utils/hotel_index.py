@@ -0,0 +1,155 @@
+"""
+In-process index over a city's Hotel List (Amadeus reference data) for radius, rating and amenity queries.
+
+One upstream list per city, fetched at a generous radius, is indexed three ways:
+
+- by distance from the city centre (sorted, bisect) for the usual "within N km" query;
+- by a lat/lon grid of `CELL_DEG` degree cells for radius queries around any point;
+- by star rating and amenity. The list API only reports those for hotels matching a `ratings`
+  or `amenities` filter, so each value is fetched once as a facet (a set of hotel IDs) and kept
+  with the index.
+"""
+import math
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# ~1.1 km of latitude per cell
+CELL_DEG = 0.01
+_EARTH_RADIUS_KM = 6371.0088
+MILE_KM = 1.609344
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+	p1, p2 = math.radians(lat1), math.radians(lat2)
+	dp, dl = p2 - p1, math.radians(lon2 - lon1)
+	a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+	return 2 * _EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def to_km(radius: float, unit: Optional[str]) -> float:
+	return radius * MILE_KM if (unit or "KM").upper() == "MILE" else float(radius)
+
+
+def _distance_km(hotel: dict) -> float:
+	distance = hotel.get("distance") or {}
+	if distance.get("value") is None:
+		return math.inf
+	return to_km(float(distance["value"]), distance.get("unit"))
+
+
+class HotelGeoIndex:
+	"""Hotels of one city, fetched within `radius_km` of its centre"""
+
+	def __init__(self, city_code: str, hotels: List[dict], radius_km: float, fetched_at: Optional[float] = None) -> None:
+		self.city_code = city_code
+		self.hotels = hotels
+		self.radius_km = radius_km
+		self.fetched_at = fetched_at or time.time()
+		self._ids = {h.get("hotelId"): i for i, h in enumerate(hotels)}
+
+		self._by_distance = sorted(range(len(hotels)), key=lambda i: _distance_km(hotels[i]))
+		self._distances = [_distance_km(hotels[i]) for i in self._by_distance]
+
+		# The list only reports each hotel's distance from the city centre, not the centre itself: the
+		# nearest located hotel stands in for it, off by at most its own distance
+		self._centre: Optional[Tuple[float, float, float]] = None
+		for i, distance in zip(self._by_distance, self._distances):
+			geo = hotels[i].get("geoCode") or {}
+			if distance != math.inf and geo.get("latitude") is not None and geo.get("longitude") is not None:
+				self._centre = (geo["latitude"], geo["longitude"], distance)
+				break
+
+		self._cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+		for i, h in enumerate(hotels):
+			geo = h.get("geoCode") or {}
+			if geo.get("latitude") is not None and geo.get("longitude") is not None:
+				self._cells[self._cell(geo["latitude"], geo["longitude"])].append(i)
+
+		# facet ("stars", 4) / ("amenity", "SPA") -> hotel positions
+		self._facets: Dict[Tuple[str, object], Set[int]] = {}
+		stars = defaultdict(set)
+		for i, h in enumerate(hotels):
+			if h.get("rating"):
+				stars[int(h["rating"])].add(i)
+		if stars:
+			# The list reported ratings itself, so every star value is known
+			for value in range(1, 6):
+				self._facets[("stars", value)] = stars.get(value, set())
+
+	def __len__(self) -> int:
+		return len(self.hotels)
+
+	@staticmethod
+	def _cell(lat: float, lon: float) -> Tuple[int, int]:
+		return int(math.floor(lat / CELL_DEG)), int(math.floor(lon / CELL_DEG))
+
+	# --- Facets -----------------------------------------------------------------------------
+
+	def missing_facets(self, stars: Optional[Iterable[int]] = None, amenities: Optional[Iterable[str]] = None) -> List[Tuple[str, object]]:
+		wanted = [("stars", int(s)) for s in stars or ()] + [("amenity", a.upper()) for a in amenities or ()]
+		return [facet for facet in wanted if facet not in self._facets]
+
+	def add_facet(self, facet: Tuple[str, object], hotel_ids: Iterable[str]) -> None:
+		"""Record which hotels have a star rating / amenity (IDs outside the cached list are ignored)."""
+		self._facets[facet] = {self._ids[h] for h in hotel_ids if h in self._ids}
+
+	# --- Queries ----------------------------------------------------------------------------
+
+	def offset_km(self, lat: Optional[float] = None, lon: Optional[float] = None) -> float:
+		"""Upper bound of the distance from the city centre to (lat, lon): 0 without a point, inf if unknown."""
+		if lat is None or lon is None:
+			return 0.0
+		if self._centre is None:
+			return math.inf
+		c_lat, c_lon, error_km = self._centre
+		return haversine_km(c_lat, c_lon, lat, lon) + error_km
+
+	def covers(self, radius_km: float, lat: Optional[float] = None, lon: Optional[float] = None) -> bool:
+		"""Whether the disc of `radius_km` (around the centre, or around lat/lon) lies inside the fetched radius."""
+		return self.offset_km(lat, lon) + radius_km <= self.radius_km
+
+	def within(self, radius_km: float) -> List[int]:
+		"""Positions of hotels within `radius_km` of the city centre, nearest first."""
+		return self._by_distance[:bisect_right(self._distances, radius_km)]
+
+	def near(self, lat: float, lon: float, radius_km: float) -> List[int]:
+		"""Positions of hotels within `radius_km` of (lat, lon), nearest first."""
+		d_lat = radius_km / 111.0
+		d_lon = radius_km / max(111.0 * math.cos(math.radians(lat)), 1e-6)
+		(low_i, low_j), (high_i, high_j) = self._cell(lat - d_lat, lon - d_lon), self._cell(lat + d_lat, lon + d_lon)
+		found = []
+		for ci in range(low_i, high_i + 1):
+			for cj in range(low_j, high_j + 1):
+				for i in self._cells.get((ci, cj), ()):
+					geo = self.hotels[i]["geoCode"]
+					distance = haversine_km(lat, lon, geo["latitude"], geo["longitude"])
+					if distance <= radius_km:
+						found.append((distance, i))
+		return [i for _, i in sorted(found)]
+
+	def query(
+		self,
+		radius_km: float,
+		stars: Optional[Iterable[int]] = None,
+		amenities: Optional[Iterable[str]] = None,
+		lat: Optional[float] = None,
+		lon: Optional[float] = None,
+		limit: Optional[int] = None,
+	) -> List[dict]:
+		"""
+		Hotels within `radius_km` (of the centre, or of lat/lon) with any of `stars` and all of `amenities`.
+
+		Facets must have been added first (see `missing_facets`); unknown facets match nothing.
+		"""
+		positions = self.near(lat, lon, radius_km) if lat is not None and lon is not None else self.within(radius_km)
+		if stars:
+			allowed = set().union(*(self._facets.get(("stars", int(s)), set()) for s in stars))
+			positions = [i for i in positions if i in allowed]
+		for amenity in amenities or ():
+			allowed = self._facets.get(("amenity", amenity.upper()), set())
+			positions = [i for i in positions if i in allowed]
+		if limit is not None:
+			positions = positions[:limit]
+		return [self.hotels[i] for i in positions]
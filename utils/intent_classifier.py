@@ -0,0 +1,217 @@
+"""
+Local intent classifier that answers `fetch_intent_of_the_query` without an LLM round trip.
+
+A multinomial logistic regression over sparse keyword features is trained (pure Python, no GPU,
+no network) from the labelled prompts in `data/intent_prompts.jsonl` on first use. Its softmax
+output is temperature scaled on a validation fold so `FetchIntent.confidence` can be compared
+against `intent_confidence_threshold`; below the threshold callers fall back to the LLM.
+
+Run `python utils/intent_classifier.py [--llm]` to report held-out accuracy and latency.
+"""
+import json
+import math
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sensors import FetchIntent, UserIntent, SortBy
+from utils.date_resolver import resolve_date_expression
+from config.data_config import DATA_DIR
+from config.main_config import intent_confidence_threshold
+
+INTENT_TRAINING_FILE = os.path.join(DATA_DIR, "intent_prompts.jsonl")
+
+_LABELS = [UserIntent.FIND_FLIGHTS_ADVANCED, UserIntent.FIND_FLIGHTS_STANDARD, UserIntent.FIND_FLIGHTS_ANYWHERE,
+           UserIntent.PLAN_TRIP, UserIntent.OTHER]
+
+# Keyword groups give the model features that generalise beyond the exact training vocabulary
+_KEYWORD_GROUPS = {
+	"sorting": r"\b(cheap\w*|lowest|low cost|budget|best price|fastest|quickest|shortest|earliest|latest|sort\w*|most seats)\b",
+	"filters": r"\b(direct|non-?stop|stops?|refundable|instant ticketing|seats?|only|exclude\w*|under|below|max\w*|at most|no more than)\b",
+	"flexible": r"\b(flexible|anytime|cheapest (dates|days|time)|when is)\b",
+	"flight": r"\b(flights?|fly|flying|airfare|fares?|air tickets?|plane)\b",
+	"route": r"\bfrom\s+\w+.*\bto\s+\w+|\b[A-Z]{3}\b\s*(to|-)\s*\b[A-Z]{3}\b",
+	"anywhere": r"\b(anywhere|any ?where|wherever|where (can|could|should|to) (i|we)|destinations?|inspir\w*|surprise me|places? to (go|fly|visit))\b",
+	# An origin with no destination after it ("cheapest flights from MAD")
+	"origin_only": r"\bfrom\s+\w+(?!.*\b(to|and|for)\s+[A-Za-z]{3})",
+	"trip": r"\b(trip|holiday|vacation|getaway|package|combo|honeymoon|stay|accommodation|nights?|days)\b",
+	"non_flight": r"\b(hotels?|resorts?|hostel|homestay|train|bus|cab|car|ferry|cruise|weather|visa|restaurants?|table)\b",
+}
+_KEYWORD_RES = {name: re.compile(pattern, re.IGNORECASE) for name, pattern in _KEYWORD_GROUPS.items()}
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+_SORTING_KEYWORDS = [
+	(re.compile(r"\b(fastest|quickest|shortest)\b"), SortBy.DURATION),
+	(re.compile(r"\b(earliest departure|leaves? earliest|departure time)\b"), SortBy.DEPARTURE_TIME),
+	(re.compile(r"\b(arrives? earliest|arrival time|earliest arrival|latest arrival)\b"), SortBy.ARRIVAL_TIME),
+	(re.compile(r"\b(most seats|bookable seats|seats available)\b"), SortBy.SEATS),
+	(re.compile(r"\blast ticketing\b"), SortBy.LAST_TICKETING_DATE),
+	(re.compile(r"\b(cheap\w*|lowest|low cost|budget|best price|price)\b"), SortBy.PRICE),
+	(re.compile(r"\bearliest\b"), SortBy.DEPARTURE_TIME),
+]
+_FLEXIBLE_RE = re.compile(r"\b(flexible|anytime|cheapest (dates|days|time))\b")
+_MULTICITY_RE = re.compile(r"\bto\b.*\bto\b.*\bto\b|\b(back to|coming back|multi ?city|round the world)\b")
+
+
+def extract_features(prompt: str, has_date: Optional[bool] = None) -> List[str]:
+	"""Sparse binary features: unigrams, bigrams, keyword groups and a parsed-date flag."""
+	if has_date is None:
+		has_date = resolve_date_expression(prompt) is not None
+	lowered = prompt.lower()
+	tokens = _TOKEN_RE.findall(lowered)
+	features = ["bias"]
+	features.extend(f"w:{t}" for t in tokens)
+	features.extend(f"b:{a}_{b}" for a, b in zip(tokens, tokens[1:]))
+	features.extend(f"kw:{name}" for name, pattern in _KEYWORD_RES.items() if pattern.search(prompt))
+	if has_date:
+		features.append("kw:date")
+	return features
+
+
+def _softmax(scores: List[float], temperature: float = 1.0) -> List[float]:
+	top = max(scores)
+	exps = [math.exp((s - top) / temperature) for s in scores]
+	total = sum(exps)
+	return [e / total for e in exps]
+
+
+class IntentClassifier:
+	"""Multinomial logistic regression over `extract_features`, with temperature scaling."""
+
+	def __init__(self, weights: Optional[Dict[str, List[float]]] = None, temperature: float = 1.0) -> None:
+		self.weights = weights or {}
+		self.temperature = temperature
+
+	def _scores(self, features: List[str]) -> List[float]:
+		scores = [0.0] * len(_LABELS)
+		for feature in features:
+			w = self.weights.get(feature)
+			if w is not None:
+				for i in range(len(_LABELS)):
+					scores[i] += w[i]
+		return scores
+
+	def predict_proba(self, prompt: str, has_date: Optional[bool] = None) -> List[float]:
+		return _softmax(self._scores(extract_features(prompt, has_date)), self.temperature)
+
+	def fit(self, rows: List[dict], epochs: int = 60, learning_rate: float = 0.3, l2: float = 1e-3) -> "IntentClassifier":
+		"""Train with plain SGD; rows are in file order so training is deterministic."""
+		samples = [(extract_features(r["prompt"]), _LABELS.index(UserIntent(r["intent"]))) for r in rows]
+		self.weights = {}
+		for epoch in range(epochs):
+			lr = learning_rate / (1 + epoch * 0.1)
+			for features, label in samples:
+				probs = _softmax(self._scores(features))
+				for feature in features:
+					w = self.weights.setdefault(feature, [0.0] * len(_LABELS))
+					for i in range(len(_LABELS)):
+						grad = probs[i] - (1.0 if i == label else 0.0)
+						w[i] -= lr * (grad + l2 * w[i])
+		return self
+
+	def calibrate(self, rows: List[dict]) -> "IntentClassifier":
+		"""Pick the softmax temperature that minimises negative log likelihood on `rows`."""
+		samples = [(self._scores(extract_features(r["prompt"])), _LABELS.index(UserIntent(r["intent"]))) for r in rows]
+		best_t, best_nll = 1.0, float("inf")
+		for step in range(5, 51):
+			t = step / 10
+			nll = -sum(math.log(max(_softmax(scores, t)[label], 1e-12)) for scores, label in samples)
+			if nll < best_nll:
+				best_t, best_nll = t, nll
+		self.temperature = best_t
+		return self
+
+	def classify(self, prompt: str) -> FetchIntent:
+		"""Return a `FetchIntent` for the prompt with the model's confidence attached."""
+		date_range_details = resolve_date_expression(prompt)
+		probs = self.predict_proba(prompt, has_date=date_range_details is not None)
+		best = max(range(len(_LABELS)), key=probs.__getitem__)
+		intent = _LABELS[best]
+		lowered = prompt.lower()
+
+		date_range = bool(date_range_details and date_range_details.is_range) or bool(_FLEXIBLE_RE.search(lowered))
+		sorting_details = None
+		if intent == UserIntent.FIND_FLIGHTS_ADVANCED:
+			sorting_details = next((sort for pattern, sort in _SORTING_KEYWORDS if pattern.search(lowered)), None)
+
+		return FetchIntent(
+			intent=intent,
+			date_range=date_range,
+			date_range_details=date_range_details if date_range else None,
+			multicity_trip=intent != UserIntent.OTHER and bool(_MULTICITY_RE.search(lowered)),
+			sorting_details=sorting_details,
+			confidence=round(probs[best], 4),
+		)
+
+
+def load_labelled_prompts(path: str = INTENT_TRAINING_FILE) -> List[dict]:
+	with open(path, "r") as file:
+		return [json.loads(line) for line in file if line.strip()]
+
+
+def split_rows(rows: List[dict], holdout_every: int = 5) -> Tuple[List[dict], List[dict]]:
+	"""Deterministic split: every `holdout_every`-th row is held out."""
+	train = [r for i, r in enumerate(rows) if i % holdout_every != holdout_every - 1]
+	held_out = [r for i, r in enumerate(rows) if i % holdout_every == holdout_every - 1]
+	return train, held_out
+
+
+def train_classifier(rows: List[dict]) -> IntentClassifier:
+	"""Fit on 4/5 of the rows to calibrate the temperature, then refit on everything."""
+	train, validation = split_rows(rows)
+	temperature = IntentClassifier().fit(train).calibrate(validation).temperature
+	return IntentClassifier(temperature=temperature).fit(rows)
+
+
+_classifier: Optional[IntentClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier() -> IntentClassifier:
+	"""
+	Train the shared classifier from the labelled prompt file on first use.
+
+	Training takes about a second, so the API calls this at startup rather than on the first /chat.
+	"""
+	global _classifier
+	if _classifier is None:
+		with _classifier_lock:
+			if _classifier is None:
+				_classifier = train_classifier(load_labelled_prompts())
+	return _classifier
+
+
+def classify_intent(prompt: str) -> FetchIntent:
+	return get_intent_classifier().classify(prompt)
+
+
+if __name__ == "__main__":
+	rows = load_labelled_prompts()
+	train, held_out = split_rows(rows)
+	model = train_classifier(train)
+
+	def report(name, predict):
+		correct, flags_correct, latencies = 0, 0, []
+		for row in held_out:
+			start = time.perf_counter()
+			result = predict(row["prompt"])
+			latencies.append((time.perf_counter() - start) * 1000)
+			correct += result.intent.value == row["intent"]
+			flags_correct += bool(result.date_range) == row["date_range"] and bool(result.multicity_trip) == row["multicity_trip"]
+		latencies.sort()
+		print(f"{name}: intent accuracy {correct / len(held_out):.1%}, flag accuracy {flags_correct / len(held_out):.1%}, "
+		      f"p50 {latencies[len(latencies) // 2]:.3f} ms, p95 {latencies[int(len(latencies) * 0.95)]:.3f} ms")
+
+	print(f"Trained on {len(train)} prompts, evaluating on {len(held_out)} held-out prompts (T={model.temperature})")
+	report("local classifier", model.classify)
+	confident = [r for r in held_out if model.classify(r["prompt"]).confidence >= intent_confidence_threshold]
+	confident_correct = sum(model.classify(r["prompt"]).intent.value == r["intent"] for r in confident)
+	print(f"confident (>= {intent_confidence_threshold}) on {len(confident)}/{len(held_out)} held-out prompts, "
+	      f"accuracy {confident_correct / max(len(confident), 1):.1%}; the rest go to the LLM")
+
+	if "--llm" in sys.argv:
+		from utils.prompts import fetch_intent_of_the_query
+		report("LLM", lambda p: fetch_intent_of_the_query(p, use_local_classifier=False))
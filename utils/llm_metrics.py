@@ -0,0 +1,196 @@
+"""
+Per-call instrumentation for the LLM extractors in utils/prompts.py.
+
+`instrument_extractor(stage)` wraps an extractor; `record_llm_response` (called from `_chat`) copies
+the Ollama timing and token fields into the call being measured. Finished calls are aggregated
+per (stage, model) in the in-process `llm_metrics` registry and, inside `llm_request_scope`, into a
+per-request summary.
+"""
+import functools
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.main_config import llm_cost_per_1k_tokens
+from utils.tracing import span
+
+# Model name recorded for calls answered without the LLM (date resolver, intent classifier)
+LOCAL_MODEL = "local"
+
+
+class LLMCallRecord(BaseModel):
+	"""One extractor call"""
+	stage: str = Field(..., description="Extractor stage: intent, date, flight, hotel or inspiration")
+	model: str = Field(LOCAL_MODEL, description="Model that served the call, 'local' if no LLM was used")
+	parse_outcome: str = Field("ok", description="ok, fallback, local or error")
+	wall_ms: float = Field(0.0, description="Wall time of the whole extractor call")
+	prompt_eval_count: int = Field(0, description="Prompt tokens evaluated by Ollama")
+	eval_count: int = Field(0, description="Tokens generated by Ollama")
+	load_ms: float = Field(0.0, description="Ollama model load time")
+	prompt_eval_ms: float = Field(0.0, description="Ollama prompt evaluation time")
+	eval_ms: float = Field(0.0, description="Ollama generation time")
+	cost: float = Field(0.0, description="Token cost from llm_cost_per_1k_tokens (0 for unpriced models)")
+
+
+_current_call: ContextVar[Optional[dict]] = ContextVar("llm_current_call", default=None)
+_current_request: ContextVar[Optional[List[LLMCallRecord]]] = ContextVar("llm_current_request", default=None)
+
+
+def _field(response, name: str):
+	value = getattr(response, name, None)
+	if value is None and isinstance(response, dict):
+		value = response.get(name)
+	return value or 0
+
+
+def record_llm_response(model: str, response) -> None:
+	"""Attach the Ollama response metadata to the extractor call currently being measured."""
+	call = _current_call.get()
+	if call is None:
+		return
+	call["model"] = model
+	call["prompt_eval_count"] += _field(response, "prompt_eval_count")
+	call["eval_count"] += _field(response, "eval_count")
+	call["load_ms"] += _field(response, "load_duration") / 1e6
+	call["prompt_eval_ms"] += _field(response, "prompt_eval_duration") / 1e6
+	call["eval_ms"] += _field(response, "eval_duration") / 1e6
+
+
+def mark_parse_outcome(outcome: str) -> None:
+	"""Override the parse outcome of the current call, e.g. "fallback" when the LLM output was unusable."""
+	call = _current_call.get()
+	if call is not None:
+		call["parse_outcome"] = outcome
+
+
+class LLMMetricsRegistry:
+	"""Thread-safe aggregates per (stage, model) plus bounded recent calls and request summaries."""
+
+	def __init__(self, max_recent: int = 200) -> None:
+		self._lock = threading.Lock()
+		self._stats = defaultdict(lambda: defaultdict(float))
+		self._outcomes = defaultdict(lambda: defaultdict(int))
+		self.recent_calls = deque(maxlen=max_recent)
+		self.recent_requests = deque(maxlen=max_recent)
+
+	def record(self, call: LLMCallRecord) -> None:
+		key = (call.stage, call.model)
+		with self._lock:
+			stats = self._stats[key]
+			stats["calls"] += 1
+			stats["max_wall_ms"] = max(stats["max_wall_ms"], call.wall_ms)
+			for name in ("wall_ms", "prompt_eval_count", "eval_count", "load_ms", "prompt_eval_ms", "eval_ms", "cost"):
+				stats[name] += getattr(call, name)
+			self._outcomes[key][call.parse_outcome] += 1
+			self.recent_calls.append(call)
+
+	def snapshot(self) -> List[dict]:
+		"""Aggregates per (stage, model) with averages."""
+		with self._lock:
+			rows = []
+			for (stage, model), stats in sorted(self._stats.items()):
+				calls = stats["calls"]
+				generated_s = stats["eval_ms"] / 1000
+				rows.append({
+					"stage": stage,
+					"model": model,
+					"calls": int(calls),
+					"parse_outcomes": dict(self._outcomes[(stage, model)]),
+					"avg_wall_ms": round(stats["wall_ms"] / calls, 3),
+					"max_wall_ms": round(stats["max_wall_ms"], 3),
+					"avg_load_ms": round(stats["load_ms"] / calls, 3),
+					"avg_prompt_tokens": round(stats["prompt_eval_count"] / calls, 1),
+					"avg_completion_tokens": round(stats["eval_count"] / calls, 1),
+					"tokens_per_second": round(stats["eval_count"] / generated_s, 1) if generated_s else None,
+					"total_cost": round(stats["cost"], 6),
+				})
+			return rows
+
+	def reset(self) -> None:
+		with self._lock:
+			self._stats.clear()
+			self._outcomes.clear()
+			self.recent_calls.clear()
+			self.recent_requests.clear()
+
+
+llm_metrics = LLMMetricsRegistry()
+
+
+def summarize_calls(calls: List[LLMCallRecord]) -> Dict[str, dict]:
+	"""Totals per stage for a list of calls."""
+	by_stage = {}
+	for call in calls:
+		stage = by_stage.setdefault(call.stage, {"calls": 0, "models": [], "wall_ms": 0.0, "prompt_tokens": 0,
+		                                         "completion_tokens": 0, "load_ms": 0.0, "eval_ms": 0.0, "cost": 0.0})
+		stage["calls"] += 1
+		if call.model not in stage["models"]:
+			stage["models"].append(call.model)
+		stage["wall_ms"] += call.wall_ms
+		stage["prompt_tokens"] += call.prompt_eval_count
+		stage["completion_tokens"] += call.eval_count
+		stage["load_ms"] += call.load_ms
+		stage["eval_ms"] += call.eval_ms
+		stage["cost"] += call.cost
+	return by_stage
+
+
+@contextmanager
+def llm_request_scope(request_id: Optional[str] = None):
+	"""
+	Collect every extractor call made inside the block into one request summary.
+
+	Yields the summary dict, which is filled in (and added to `llm_metrics.recent_requests`) on exit.
+	"""
+	calls: List[LLMCallRecord] = []
+	summary = {"request_id": request_id or uuid.uuid4().hex}
+	token = _current_request.set(calls)
+	try:
+		yield summary
+	finally:
+		_current_request.reset(token)
+		summary["calls"] = len(calls)
+		summary["llm_wall_ms"] = round(sum(c.wall_ms for c in calls), 3)
+		summary["stages"] = summarize_calls(calls)
+		llm_metrics.recent_requests.append(summary)
+
+
+def instrument_extractor(stage: str):
+	"""Decorator recording wall time, Ollama metadata and parse outcome of every extractor call."""
+	def decorator(func):
+		@functools.wraps(func)
+		def wrapper(*args, **kwargs):
+			call = {"stage": stage, "model": None, "parse_outcome": None, "prompt_eval_count": 0, "eval_count": 0,
+			        "load_ms": 0.0, "prompt_eval_ms": 0.0, "eval_ms": 0.0}
+			token = _current_call.set(call)
+			start = time.perf_counter()
+			outcome = "error"
+			try:
+				with span(f"llm.{stage}") as stage_span:
+					result = func(*args, **kwargs)
+					stage_span.set_attribute("model", call["model"] or LOCAL_MODEL)
+				outcome = "ok"
+				return result
+			finally:
+				_current_call.reset(token)
+				if call["model"] is None:
+					call["model"], outcome = LOCAL_MODEL, "local" if outcome == "ok" else outcome
+				tokens = call["prompt_eval_count"] + call["eval_count"]
+				record = LLMCallRecord(
+					**{**call, "parse_outcome": call["parse_outcome"] or outcome},
+					wall_ms=round((time.perf_counter() - start) * 1000, 3),
+					cost=tokens / 1000 * llm_cost_per_1k_tokens.get(call["model"], 0.0),
+				)
+				llm_metrics.record(record)
+				request_calls = _current_request.get()
+				if request_calls is not None:
+					request_calls.append(record)
+		return wrapper
+	return decorator
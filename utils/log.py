@@ -0,0 +1,180 @@
+"""
+Structured, non-blocking logging for the API server and the batch runner.
+
+Modules log through the standard library (`logger = logging.getLogger(__name__)`); `setup_logging()`,
+called once by the entry points, routes every record through a bounded queue to a background writer
+thread, so a request never waits on stderr:
+
+    logger.warning("Amadeus token request failed", extra={"status": 401})
+    # {"ts": "2026-10-19T09:12:03.417+00:00", "level": "WARNING", "logger": "services.environment",
+    #  "message": "Amadeus token request failed", "request_id": "5f0c...", "status": 401}
+
+- Every record carries the request ID of the current trace (utils/tracing.py), or null.
+- Repeated messages (same logger and format string) are limited to LOG_RATE_LIMIT_BURST records per
+  LOG_RATE_LIMIT_WINDOW seconds; the next record let through carries `suppressed`, the count dropped.
+  Errors are never rate limited.
+- httpx's per-request INFO lines are silenced (its logger is set to WARNING).
+- When the queue is full, records are dropped rather than blocking the caller.
+
+Both counts are exported on GET /metrics. Without `setup_logging()` (tests, CLI scripts) records go to
+the standard library's default handler, which prints warnings and errors to stderr.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.main_config import log_level, log_format, log_rate_limit_window_s, log_rate_limit_burst, log_queue_size
+from utils.metrics import log_records_dropped_total, log_records_suppressed_total
+from utils.tracing import current_trace
+
+# Attributes every LogRecord has; anything else was passed in `extra` and goes into the JSON object
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "suppressed"}
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+
+class RequestContextFilter(logging.Filter):
+	"""Stamp records with the request ID of the current trace (runs in the caller's thread and context)."""
+
+	def filter(self, record: logging.LogRecord) -> bool:
+		if not hasattr(record, "request_id"):
+			trace = current_trace()
+			record.request_id = trace.request_id if trace is not None else None
+		return True
+
+
+class RateLimitFilter(logging.Filter):
+	"""
+	Let through at most `burst` records per (logger, format string) every `window_s` seconds.
+
+	ERROR and above always pass: a format string like "%s" would otherwise hide distinct failures.
+	"""
+
+	def __init__(self, window_s: float = log_rate_limit_window_s, burst: int = log_rate_limit_burst,
+	             max_keys: int = 10000) -> None:
+		super().__init__()
+		self.window_s = window_s
+		self.burst = burst
+		self.max_keys = max_keys
+		# (logger, msg) -> [window start, records let through, records suppressed]
+		self._windows: Dict[Tuple[str, str], List[float]] = {}
+		self._lock = threading.Lock()
+
+	def filter(self, record: logging.LogRecord) -> bool:
+		if self.window_s <= 0 or record.levelno >= logging.ERROR:
+			return True
+		key = (record.name, str(record.msg))
+		now = time.monotonic()
+		with self._lock:
+			window = self._windows.get(key)
+			if window is None or now - window[0] >= self.window_s:
+				if window is None and len(self._windows) >= self.max_keys:
+					self._windows = {k: w for k, w in self._windows.items() if now - w[0] < self.window_s}
+				suppressed = int(window[2]) if window is not None else 0
+				self._windows[key] = [now, 1, 0]
+				if suppressed:
+					record.suppressed = suppressed
+				return True
+			if window[1] < self.burst:
+				window[1] += 1
+				return True
+			window[2] += 1
+		log_records_suppressed_total.labels(record.name).inc()
+		return False
+
+
+class JsonFormatter(logging.Formatter):
+	"""One JSON object per record: ts, level, logger, message, request_id, `extra` fields, exc."""
+
+	def format(self, record: logging.LogRecord) -> str:
+		entry = {
+			"ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+			"level": record.levelname,
+			"logger": record.name,
+			"message": record.getMessage(),
+			"request_id": getattr(record, "request_id", None),
+		}
+		if getattr(record, "suppressed", None):
+			entry["suppressed"] = record.suppressed
+		for key, value in record.__dict__.items():
+			if key not in _STANDARD_ATTRS and not key.startswith("_"):
+				entry[key] = value
+		if record.exc_info and not record.exc_text:
+			record.exc_text = self.formatException(record.exc_info)
+		if record.exc_text:
+			entry["exc"] = record.exc_text
+		return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+	def format(self, record: logging.LogRecord) -> str:
+		text = super().format(record)
+		suppressed = getattr(record, "suppressed", None)
+		return f"{text} ({suppressed} similar suppressed)" if suppressed else text
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+	"""QueueHandler that drops records when the queue is full instead of blocking or raising."""
+
+	def enqueue(self, record: logging.LogRecord) -> None:
+		try:
+			self.queue.put_nowait(record)
+		except queue.Full:
+			log_records_dropped_total.inc()
+
+	def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+		# Resolve the message and traceback now (arguments may change later), but leave formatting
+		# to the writer thread so the JSON keeps `extra` fields as separate keys
+		record.msg = record.getMessage()
+		record.args = None
+		if record.exc_info:
+			record.exc_text = logging.Formatter().formatException(record.exc_info)
+			record.exc_info = None
+		return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging(level: str = log_level, fmt: str = log_format, stream=None) -> None:
+	"""Install the queue handler on the root logger and start the writer thread (idempotent)."""
+	global _listener
+	with _setup_lock:
+		if _listener is not None:
+			return
+		writer = logging.StreamHandler(stream or sys.stderr)
+		writer.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter(TEXT_FORMAT))
+		log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=log_queue_size)
+		handler = DroppingQueueHandler(log_queue)
+		handler.addFilter(RequestContextFilter())
+		handler.addFilter(RateLimitFilter())
+		root = logging.getLogger()
+		root.addHandler(handler)
+		root.setLevel(level)
+		# httpx logs every request at INFO, which would drown out the application's own records
+		logging.getLogger("httpx").setLevel(logging.WARNING)
+		_listener = logging.handlers.QueueListener(log_queue, writer, respect_handler_level=True)
+		_listener.start()
+		atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+	"""Flush queued records and stop the writer thread."""
+	global _listener
+	with _setup_lock:
+		if _listener is None:
+			return
+		_listener.stop()
+		for handler in list(logging.getLogger().handlers):
+			if isinstance(handler, DroppingQueueHandler):
+				logging.getLogger().removeHandler(handler)
+		_listener = None
@@ -0,0 +1,337 @@
+"""
+Process-wide metrics registry rendered in the Prometheus text exposition format (GET /metrics).
+
+Counters, gauges and histograms with labels, kept in memory. A labelled child is looked up once per
+label set and cached, so recording is a dict lookup plus a locked add:
+
+    amadeus_request_seconds.labels("/v2/shopping/flight-offers").observe(0.42)
+    with stage_seconds.labels("render").time():
+        ...
+
+Values that already live elsewhere (TTL cache hit counts, ...) are exported by collectors, callables
+registered with `registry.register_collector` and evaluated at scrape time.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; covers cache hits (sub-millisecond) through cold LLM loads
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+	return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+	pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+	if extra:
+		pairs.append(f'{extra[0]}="{extra[1]}"')
+	return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+	if value == math.inf:
+		return "+Inf"
+	return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+	kind = ""
+
+	def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+		self.name = name
+		self.documentation = documentation
+		self.labelnames = tuple(labelnames)
+		self._children: Dict[Tuple[str, ...], object] = {}
+		self._lock = threading.Lock()
+		if not self.labelnames:
+			self._default = self.labels()
+
+	def _new_child(self):
+		raise NotImplementedError
+
+	def labels(self, *values: str):
+		"""The child for one label set (created on first use)."""
+		child = self._children.get(values)
+		if child is None:
+			if len(values) != len(self.labelnames):
+				raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+			with self._lock:
+				child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+				# Also cache under the caller's values (e.g. an int status code) for the next lookup
+				self._children[values] = child
+		return child
+
+	def _samples(self) -> Iterable[Tuple[str, str, float]]:
+		raise NotImplementedError
+
+	def render(self) -> List[str]:
+		lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+		lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in self._samples())
+		return lines
+
+	def _unique_children(self):
+		seen = set()
+		for values, child in list(self._children.items()):
+			if id(child) not in seen:
+				seen.add(id(child))
+				yield tuple(str(v) for v in values), child
+
+
+class _CounterChild:
+	__slots__ = ("value", "_lock")
+
+	def __init__(self) -> None:
+		self.value = 0.0
+		self._lock = threading.Lock()
+
+	def inc(self, amount: float = 1.0) -> None:
+		with self._lock:
+			self.value += amount
+
+
+class Counter(_Metric):
+	kind = "counter"
+
+	def _new_child(self):
+		return _CounterChild()
+
+	def inc(self, amount: float = 1.0) -> None:
+		self._default.inc(amount)
+
+	def _samples(self):
+		for values, child in self._unique_children():
+			yield self.name, _labels_text(self.labelnames, values), child.value
+
+
+class _GaugeChild:
+	__slots__ = ("value", "_lock")
+
+	def __init__(self) -> None:
+		self.value = 0.0
+		self._lock = threading.Lock()
+
+	def set(self, value: float) -> None:
+		self.value = value
+
+	def inc(self, amount: float = 1.0) -> None:
+		with self._lock:
+			self.value += amount
+
+	def dec(self, amount: float = 1.0) -> None:
+		self.inc(-amount)
+
+	def track_inprogress(self) -> "_InProgress":
+		return _InProgress(self)
+
+
+class _InProgress:
+	"""`with gauge.track_inprogress():` raises the gauge for the duration of the block"""
+	__slots__ = ("gauge",)
+
+	def __init__(self, gauge: _GaugeChild) -> None:
+		self.gauge = gauge
+
+	def __enter__(self) -> "_InProgress":
+		self.gauge.inc()
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.gauge.dec()
+
+
+class Gauge(_Metric):
+	kind = "gauge"
+
+	def _new_child(self):
+		return _GaugeChild()
+
+	def set(self, value: float) -> None:
+		self._default.set(value)
+
+	def inc(self, amount: float = 1.0) -> None:
+		self._default.inc(amount)
+
+	def dec(self, amount: float = 1.0) -> None:
+		self._default.dec(amount)
+
+	def track_inprogress(self):
+		return self._default.track_inprogress()
+
+	def _samples(self):
+		for values, child in self._unique_children():
+			yield self.name, _labels_text(self.labelnames, values), child.value
+
+
+class _Timer:
+	"""`with child.time():` (a plain class: cheaper than a generator-based context manager)"""
+	__slots__ = ("child", "start")
+
+	def __init__(self, child: "_HistogramChild") -> None:
+		self.child = child
+
+	def __enter__(self) -> "_Timer":
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.child.observe(time.perf_counter() - self.start)
+
+
+class _HistogramChild:
+	__slots__ = ("bounds", "counts", "sum", "_lock")
+
+	def __init__(self, bounds: Tuple[float, ...]) -> None:
+		self.bounds = bounds
+		# One slot per bucket plus +Inf; cumulated only when rendered
+		self.counts = [0] * (len(bounds) + 1)
+		self.sum = 0.0
+		self._lock = threading.Lock()
+
+	def observe(self, value: float) -> None:
+		i = bisect_left(self.bounds, value)
+		with self._lock:
+			self.counts[i] += 1
+			self.sum += value
+
+	def time(self) -> "_Timer":
+		return _Timer(self)
+
+
+class Histogram(_Metric):
+	kind = "histogram"
+
+	def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+	             buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+		self.bounds = tuple(sorted(buckets))
+		super().__init__(name, documentation, labelnames)
+
+	def _new_child(self):
+		return _HistogramChild(self.bounds)
+
+	def observe(self, value: float) -> None:
+		self._default.observe(value)
+
+	def time(self):
+		return self._default.time()
+
+	def _samples(self):
+		for values, child in self._unique_children():
+			with child._lock:
+				counts, total = list(child.counts), child.sum
+			cumulative = 0
+			for bound, count in zip(self.bounds + (math.inf,), counts):
+				cumulative += count
+				yield f"{self.name}_bucket", _labels_text(self.labelnames, values, ("le", _number(bound))), cumulative
+			labels = _labels_text(self.labelnames, values)
+			yield f"{self.name}_sum", labels, total
+			yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+	"""Named metrics plus scrape-time collectors, rendered together by `render()`."""
+
+	def __init__(self) -> None:
+		self._metrics: Dict[str, _Metric] = {}
+		self._collectors: List[Callable[[], Iterable[str]]] = []
+
+	def _register(self, metric: _Metric) -> _Metric:
+		existing = self._metrics.get(metric.name)
+		if existing is not None:
+			# Modules re-imported under another name (tests, scripts) share the first instance
+			return existing
+		self._metrics[metric.name] = metric
+		return metric
+
+	def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+		return self._register(Counter(name, documentation, labelnames))
+
+	def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+		return self._register(Gauge(name, documentation, labelnames))
+
+	def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+	              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+		return self._register(Histogram(name, documentation, labelnames, buckets))
+
+	def register_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+		"""`collector()` returns exposition lines (with their HELP/TYPE) to append at each scrape."""
+		self._collectors.append(collector)
+
+	def render(self) -> str:
+		lines = []
+		for metric in self._metrics.values():
+			lines.extend(metric.render())
+		for collector in self._collectors:
+			lines.extend(collector())
+		return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# --- /chat metrics ----------------------------------------------------------------------------
+# Recorded in services/api.py (http_*), utils/prompts.py (llm_*) and services/environment.py
+# (amadeus_*, caches); `stage_seconds` covers the pipeline stages of one /chat request.
+
+http_requests_total = registry.counter(
+	"travelagent_http_requests_total", "HTTP requests by route and status code", ("method", "route", "status"))
+http_request_seconds = registry.histogram(
+	"travelagent_http_request_seconds", "HTTP request latency by route", ("method", "route"))
+http_requests_in_flight = registry.gauge(
+	"travelagent_http_requests_in_flight", "HTTP requests being served")
+
+stage_seconds = registry.histogram(
+	"travelagent_stage_seconds",
+	"Latency of a /chat pipeline stage (local_intent, llm_intent, llm_extraction, token_fetch, amadeus, filter_sort, render)",
+	("stage",))
+
+llm_request_seconds = registry.histogram(
+	"travelagent_llm_request_seconds", "Ollama chat call latency by extractor stage and model", ("stage", "model"))
+llm_requests_in_flight = registry.gauge(
+	"travelagent_llm_requests_in_flight", "Ollama chat calls in progress")
+
+amadeus_request_seconds = registry.histogram(
+	"travelagent_amadeus_request_seconds", "Amadeus API call latency by endpoint", ("endpoint",))
+amadeus_responses_total = registry.counter(
+	"travelagent_amadeus_responses_total", "Amadeus API responses by endpoint and status code", ("endpoint", "status"))
+amadeus_requests_in_flight = registry.gauge(
+	"travelagent_amadeus_requests_in_flight", "Amadeus API calls in progress")
+
+# Recorded in utils/admission.py
+stage_queue_depth = registry.gauge(
+	"travelagent_stage_queue_depth", "Requests waiting for a slot of an expensive stage (llm, amadeus)", ("stage",))
+stage_slots_in_use = registry.gauge(
+	"travelagent_stage_slots_in_use", "Slots of an expensive stage in use", ("stage",))
+requests_shed_total = registry.counter(
+	"travelagent_requests_shed_total", "Requests rejected by admission control by stage and reason", ("stage", "reason"))
+
+# Recorded in utils/offload.py
+offload_tasks_total = registry.counter(
+	"travelagent_offload_tasks_total", "Flight-offer processing runs by where they ran (inline, thread, process)",
+	("executor",))
+
+# Recorded in utils/log.py
+log_records_dropped_total = registry.counter(
+	"travelagent_log_records_dropped_total", "Log records dropped because the log queue was full")
+log_records_suppressed_total = registry.counter(
+	"travelagent_log_records_suppressed_total", "Repeated log records suppressed by the rate limit", ("logger",))
+
+
+def cache_collector(caches: Dict[str, object]) -> Callable[[], List[str]]:
+	"""Collector exporting hits, misses, entries and hit ratio of `TTLCache`s, keyed by cache name."""
+	def collect() -> List[str]:
+		stats = {name: cache.stats() for name, cache in caches.items()}
+		lines = []
+		for metric, kind, doc, value in (
+			("travelagent_cache_hits_total", "counter", "TTL cache hits", lambda s: s["hits"]),
+			("travelagent_cache_misses_total", "counter", "TTL cache misses", lambda s: s["misses"]),
+			("travelagent_cache_entries", "gauge", "Entries currently held by a TTL cache", lambda s: s["entries"]),
+			("travelagent_cache_hit_ratio", "gauge", "Hits / (hits + misses) since start",
+			 lambda s: s["hits"] / (s["hits"] + s["misses"]) if s["hits"] + s["misses"] else 0.0),
+		):
+			lines += [f"# HELP {metric} {doc}", f"# TYPE {metric} {kind}"]
+			lines += [f'{metric}{{cache="{name}"}} {_number(value(s))}' for name, s in stats.items()]
+		return lines
+	return collect
@@ -0,0 +1,89 @@
+"""
+Per-stage Ollama model routing, overload degradation and start-up warm-up.
+
+Each extractor in utils/prompts.py names its stage ("intent", "date", "flight", "hotel", "inspiration");
+`ModelRouter.model_for` picks the configured model for it, and switches to the stage's cheaper
+fallback model while the primary already has `model_overload_threshold` calls in flight.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.main_config import (
+	model_name, stage_models, stage_fallback_models, model_overload_threshold, ollama_keep_alive,
+)
+
+
+class ModelRouter:
+	"""Route extractor stages to models and track in-flight calls per model."""
+
+	def __init__(
+		self,
+		models: Dict[str, str],
+		fallback_models: Dict[str, str],
+		overload_threshold: int,
+		default_model: str = model_name,
+	) -> None:
+		self.models = dict(models)
+		self.fallback_models = dict(fallback_models)
+		self.overload_threshold = overload_threshold
+		self.default_model = default_model
+		self._in_flight = defaultdict(int)
+		self._lock = threading.Lock()
+
+	def model_for(self, stage: str) -> str:
+		"""Return the model for a stage, degraded to its fallback if the primary is overloaded."""
+		primary = self.models.get(stage, self.default_model)
+		fallback = self.fallback_models.get(stage)
+		if fallback and self.overload_threshold > 0 and self.in_flight(primary) >= self.overload_threshold:
+			return fallback
+		return primary
+
+	def in_flight(self, model: str) -> int:
+		with self._lock:
+			return self._in_flight[model]
+
+	@contextmanager
+	def track(self, model: str):
+		"""Count a call against `model` for the duration of the block."""
+		with self._lock:
+			self._in_flight[model] += 1
+		try:
+			yield model
+		finally:
+			with self._lock:
+				self._in_flight[model] -= 1
+
+	def configured_models(self) -> list:
+		"""Distinct primary and fallback models, in routing order."""
+		return list(dict.fromkeys([*self.models.values(), *self.fallback_models.values()]))
+
+
+router = ModelRouter(stage_models, stage_fallback_models, model_overload_threshold)
+
+
+def warm_up_models(models: Optional[Iterable[str]] = None, keep_alive: str = ollama_keep_alive) -> Dict[str, object]:
+	"""
+	Load models into Ollama ahead of the first request.
+
+	An empty generate request makes Ollama load the model without generating anything; `keep_alive`
+	then keeps it resident between requests.
+
+	Returns:
+		dict: model -> load time in seconds, or the error message if the model could not be loaded.
+	"""
+	from ollama import generate
+
+	results = {}
+	for model in models or router.configured_models():
+		start = time.perf_counter()
+		try:
+			generate(model=model, prompt="", keep_alive=keep_alive)
+			results[model] = round(time.perf_counter() - start, 3)
+		except Exception as e:
+			results[model] = f"warm-up failed: {e}"
+	return results
@@ -0,0 +1,362 @@
+"""
+Append-only SQLite store of every flight offer the Actuator fetched, for price history and
+"is this a good price" answers without calling Amadeus.
+
+Offers are flattened to one row each (route, dates, carrier, flight numbers, stops, duration,
+price, cabin, seats). `record_search` only enqueues the raw response body; a background writer
+thread parses, flattens and inserts in batches, so nothing happens on the request path.
+
+    python utils/offer_store.py --import-csv amadeus_flight_search_results.csv
+    python utils/offer_store.py --history DEL SXR
+"""
+import argparse
+import ast
+import csv
+import json
+import logging
+import math
+import queue
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.data_config import OFFER_STORE_FILE
+from utils.airports import get_airport_index
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = (
+	"searched_at", "origin", "destination", "departure_date", "return_date", "carrier", "flight_numbers",
+	"stops", "duration_min", "price", "currency", "cabin", "seats", "one_way",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS offers (
+	searched_at REAL NOT NULL,
+	origin TEXT NOT NULL,
+	destination TEXT NOT NULL,
+	departure_date TEXT NOT NULL,
+	return_date TEXT,
+	carrier TEXT,
+	flight_numbers TEXT,
+	stops INTEGER,
+	duration_min INTEGER,
+	price REAL NOT NULL,
+	currency TEXT,
+	cabin TEXT,
+	seats INTEGER,
+	one_way INTEGER
+);
+CREATE INDEX IF NOT EXISTS offers_route_departure ON offers (origin, destination, departure_date);
+CREATE INDEX IF NOT EXISTS offers_route_searched ON offers (origin, destination, searched_at);
+"""
+
+_DURATION_UNITS = {"D": 1440, "H": 60, "M": 1}
+
+
+def _duration_minutes(duration: Optional[str]) -> Optional[int]:
+	"""ISO 8601 "PT8H5M" / "P1DT2H" -> minutes."""
+	if not duration:
+		return None
+	minutes, number = 0, ""
+	for ch in duration:
+		if ch.isdigit():
+			number += ch
+		elif ch in _DURATION_UNITS and number:
+			minutes += int(number) * _DURATION_UNITS[ch]
+			number = ""
+	return minutes
+
+
+def flatten_offer(offer: dict, searched_at: float) -> Optional[tuple]:
+	"""One flight-offer dict -> a row in `_COLUMNS` order (None if it has no route or price)."""
+	itineraries = offer.get("itineraries") or []
+	if not itineraries or not itineraries[0].get("segments"):
+		return None
+	outbound = itineraries[0]["segments"]
+	price = offer.get("price") or {}
+	total = price.get("grandTotal") or price.get("total")
+	if total is None:
+		return None
+	inbound = itineraries[1]["segments"] if len(itineraries) > 1 and itineraries[1].get("segments") else None
+	fares = (offer.get("travelerPricings") or [{}])[0].get("fareDetailsBySegment") or [{}]
+	carriers = offer.get("validatingAirlineCodes") or [outbound[0].get("carrierCode")]
+	return (
+		searched_at,
+		outbound[0].get("departure", {}).get("iataCode"),
+		outbound[-1].get("arrival", {}).get("iataCode"),
+		(outbound[0].get("departure", {}).get("at") or "")[:10],
+		(inbound[0].get("departure", {}).get("at") or "")[:10] if inbound else None,
+		carriers[0],
+		"+".join(f"{s.get('carrierCode', '')}{s.get('number', '')}" for s in outbound),
+		len(outbound) - 1 + sum(s.get("numberOfStops", 0) for s in outbound),
+		_duration_minutes(itineraries[0].get("duration")),
+		float(total),
+		price.get("currency"),
+		fares[0].get("cabin"),
+		offer.get("numberOfBookableSeats"),
+		int(bool(offer.get("oneWay", inbound is None))),
+	)
+
+
+def _airport_codes(code: str) -> List[str]:
+	"""Airports stored under `code`: the member airports of a metro code ("LON" -> LCY, LGW, ...), else the code."""
+	code = code.strip().upper()
+	airport = get_airport_index().by_code(code)
+	if airport is not None and airport.is_metro:
+		return [a.code for a in get_airport_index().metro_airports(code)]
+	return [code]
+
+
+def _route_filter(origin: str, destination: str, departure_date: Optional[str], days: int):
+	"""WHERE clause and arguments selecting a route's offers; metro codes match any of their airports."""
+	origins, destinations = _airport_codes(origin), _airport_codes(destination)
+	sql = (f"origin IN ({', '.join('?' * len(origins))}) AND destination IN ({', '.join('?' * len(destinations))})"
+	       " AND searched_at >= ?")
+	args = [*origins, *destinations, time.time() - days * 86400]
+	if departure_date:
+		sql += " AND departure_date = ?"
+		args.append(departure_date)
+	return sql, args
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+	"""Linear-interpolated percentile (q in 0-100) of a sorted list."""
+	if not ordered:
+		return 0.0
+	pos = (len(ordered) - 1) * q / 100
+	low, high = math.floor(pos), math.ceil(pos)
+	return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+class OfferStore:
+	"""Append-only offer history with a background batch writer"""
+
+	def __init__(self, path: str = OFFER_STORE_FILE, max_pending: int = 10000, batch_size: int = 500) -> None:
+		self.path = path
+		self.batch_size = batch_size
+		self._pending: queue.Queue = queue.Queue(maxsize=max_pending)
+		self._writer: Optional[threading.Thread] = None
+		self._start_lock = threading.Lock()
+		self._local = threading.local()
+		self.stats = {"queued": 0, "dropped": 0, "written": 0, "failed": 0}
+		os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+		conn = self._connect()
+		conn.executescript(_SCHEMA)
+		conn.close()
+
+	def _connect(self) -> sqlite3.Connection:
+		conn = sqlite3.connect(self.path, timeout=30)
+		conn.execute("PRAGMA journal_mode=WAL")
+		conn.execute("PRAGMA synchronous=NORMAL")
+		return conn
+
+	def _reader(self) -> sqlite3.Connection:
+		"""One read connection per thread (the writer has its own)."""
+		conn = getattr(self._local, "conn", None)
+		if conn is None:
+			conn = self._local.conn = self._connect()
+		return conn
+
+	# --- Writes -----------------------------------------------------------------------------
+
+	def record_search(self, body: str, searched_at: Optional[float] = None) -> None:
+		"""Queue a raw flight-offers response body for storage; never blocks the caller."""
+		self._ensure_writer()
+		try:
+			self._pending.put_nowait((searched_at or time.time(), body))
+			self.stats["queued"] += 1
+		except queue.Full:
+			self.stats["dropped"] += 1
+
+	def _ensure_writer(self) -> None:
+		if self._writer is not None and self._writer.is_alive():
+			return
+		with self._start_lock:
+			if self._writer is None or not self._writer.is_alive():
+				self._writer = threading.Thread(target=self._write_loop, name="offer-store-writer", daemon=True)
+				self._writer.start()
+
+	def _rows(self, searched_at: float, body) -> List[tuple]:
+		data = json.loads(body) if isinstance(body, (str, bytes)) else body
+		offers = data.get("data", []) if isinstance(data, dict) else data
+		return [row for row in (flatten_offer(o, searched_at) for o in offers) if row is not None]
+
+	def _write_loop(self) -> None:
+		conn = self._connect()
+		insert = f"INSERT INTO offers ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+		while True:
+			item = self._pending.get()
+			batch = [item]
+			# Drain whatever else is waiting into the same transaction
+			while len(batch) < self.batch_size:
+				try:
+					batch.append(self._pending.get_nowait())
+				except queue.Empty:
+					break
+			stop = any(entry is None for entry in batch)
+			rows = []
+			for entry in batch:
+				if entry is None:
+					continue
+				try:
+					rows.extend(self._rows(*entry))
+				except (ValueError, TypeError, KeyError, AttributeError) as e:
+					self.stats["failed"] += 1
+					logger.warning("Offer store: skipping unreadable response: %s", e)
+			if rows:
+				try:
+					with conn:
+						conn.executemany(insert, rows)
+					self.stats["written"] += len(rows)
+				except sqlite3.Error as e:
+					self.stats["failed"] += len(rows)
+					logger.exception("Offer store: write failed: %s", e)
+			for _ in batch:
+				self._pending.task_done()
+			if stop:
+				conn.close()
+				return
+
+	def flush(self, timeout: Optional[float] = None) -> None:
+		"""Wait until every queued response has been written."""
+		if self._writer is None:
+			return
+		deadline = time.time() + timeout if timeout else None
+		while self._pending.unfinished_tasks:
+			if deadline and time.time() > deadline:
+				return
+			time.sleep(0.01)
+
+	def close(self) -> None:
+		"""Write what is queued and stop the writer thread."""
+		if self._writer is not None and self._writer.is_alive():
+			self._pending.put(None)
+			self._writer.join()
+		self._writer = None
+
+	def import_rows(self, rows: Iterable[tuple]) -> int:
+		"""Synchronously insert already flattened rows (imports, tests)."""
+		rows = list(rows)
+		conn = self._connect()
+		try:
+			with conn:
+				conn.executemany(f"INSERT INTO offers ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})", rows)
+		finally:
+			conn.close()
+		return len(rows)
+
+	# --- Queries ----------------------------------------------------------------------------
+
+	def _prices(self, origin: str, destination: str, departure_date: Optional[str], days: int,
+	            currency: Optional[str]) -> List[float]:
+		where, args = _route_filter(origin, destination, departure_date, days)
+		rows = self._reader().execute(f"SELECT price, currency FROM offers WHERE {where}", args).fetchall()
+		if currency is None and rows:
+			# Prices are only comparable within one currency; default to the most frequent
+			counts = {}
+			for _, cur in rows:
+				counts[cur] = counts.get(cur, 0) + 1
+			currency = max(counts, key=counts.get)
+		return sorted(price for price, cur in rows if cur == currency)
+
+	def price_history(self, origin: str, destination: str, departure_date: Optional[str] = None,
+	                  days: int = 90) -> List[dict]:
+		"""Daily min / avg / max observed price for a route (optionally one departure date), oldest first."""
+		where, args = _route_filter(origin, destination, departure_date, days)
+		sql = f"""
+			SELECT date(searched_at, 'unixepoch') AS day, currency, MIN(price), AVG(price), MAX(price), COUNT(*)
+			FROM offers WHERE {where}
+			GROUP BY day, currency ORDER BY day"""
+		return [
+			{"day": day, "currency": cur, "min": low, "avg": round(avg, 2), "max": high, "offers": n}
+			for day, cur, low, avg, high, n in self._reader().execute(sql, args)
+		]
+
+	def price_percentiles(self, origin: str, destination: str, departure_date: Optional[str] = None,
+	                      days: int = 90, currency: Optional[str] = None) -> dict:
+		"""p10/p25/p50/p75/p90 of observed prices for a route."""
+		prices = self._prices(origin, destination, departure_date, days, currency)
+		summary = {f"p{q}": round(_percentile(prices, q), 2) for q in (10, 25, 50, 75, 90)}
+		summary["offers"] = len(prices)
+		return summary
+
+	def price_verdict(self, origin: str, destination: str, price: float, departure_date: Optional[str] = None,
+	                  days: int = 90, currency: Optional[str] = None, min_offers: int = 20) -> dict:
+		"""
+		Where `price` falls among observed prices for the route: "good" (bottom quarter),
+		"typical", "high" (top quarter) or "unknown" with fewer than `min_offers` observations.
+		"""
+		prices = self._prices(origin, destination, departure_date, days, currency)
+		if len(prices) < min_offers:
+			return {"verdict": "unknown", "percentile": None, "offers": len(prices)}
+		below = sum(1 for p in prices if p < price)
+		percentile = round(100 * below / len(prices), 1)
+		verdict = "good" if percentile <= 25 else "high" if percentile >= 75 else "typical"
+		return {
+			"verdict": verdict,
+			"percentile": percentile,
+			"median": round(_percentile(prices, 50), 2),
+			"offers": len(prices),
+		}
+
+
+_store: Optional[OfferStore] = None
+_store_lock = threading.Lock()
+
+
+def get_offer_store() -> OfferStore:
+	"""The shared store, created (and its table set up) on first use."""
+	global _store
+	if _store is None:
+		with _store_lock:
+			if _store is None:
+				_store = OfferStore()
+	return _store
+
+
+def read_pandas_csv(path: str) -> List[dict]:
+	"""Flight offers from a legacy DataFrame dump (one offer per row, dict-valued cells as Python reprs)."""
+	csv.field_size_limit(sys.maxsize)
+	offers = []
+	with open(path, newline="") as file:
+		for record in csv.DictReader(file):
+			offer = {}
+			for key, value in record.items():
+				if value and value[0] in "[{":
+					value = ast.literal_eval(value)
+				offer[key] = value
+			offers.append(offer)
+	return offers
+
+
+def import_pandas_csv(path: str, store: OfferStore) -> int:
+	"""Load a legacy DataFrame dump into the store."""
+	searched_at = os.path.getmtime(path)
+	rows = []
+	for offer in read_pandas_csv(path):
+		row = flatten_offer(offer, searched_at)
+		if row is not None:
+			rows.append(row)
+	return store.import_rows(rows)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--import-csv", metavar="PATH", help="Import a legacy pandas CSV dump of flight offers")
+	parser.add_argument("--history", nargs=2, metavar=("ORIGIN", "DESTINATION"), help="Print price history and percentiles")
+	parser.add_argument("--days", type=int, default=90)
+	args = parser.parse_args()
+
+	store = get_offer_store()
+	if args.import_csv:
+		print(f"Imported {import_pandas_csv(args.import_csv, store)} offers into {store.path}")
+	if args.history:
+		origin, destination = args.history
+		for row in store.price_history(origin, destination, days=args.days):
+			print(row)
+		print(store.price_percentiles(origin, destination, days=args.days))
@@ -0,0 +1,89 @@
+"""
+Run CPU-heavy response processing off the event loop.
+
+Decoding, filtering, sorting and rendering a flight-offers response of a few hundred offers takes
+tens of milliseconds of pure Python, during which no other request's I/O is served. Responses of at
+least OFFLOAD_MIN_BYTES are handed to an executor instead (OFFLOAD_EXECUTOR):
+
+- "thread" (default): a thread pool. No serialization; the GIL is still shared, but it is released
+  every few milliseconds, so the event loop keeps running between slices.
+- "process": a process pool, for CPU-bound deployments with spare cores. The response goes over as
+  the raw body text (one string to pickle) and only the processed offers come back.
+- "inline": never offload.
+
+Smaller responses stay inline, where the hop to a worker would cost more than it saves. The work
+must be a module-level function of plain arguments so it can run in another process.
+"""
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.main_config import offload_executor, offload_workers, offload_min_bytes
+from utils.metrics import offload_tasks_total
+
+T = TypeVar("T")
+INLINE, THREAD, PROCESS = "inline", "thread", "process"
+
+
+class Offloader:
+	"""Run `fn(*args)` inline or on the configured executor, depending on the input size."""
+
+	def __init__(self, mode: str = offload_executor, workers: int = offload_workers,
+	             min_bytes: int = offload_min_bytes) -> None:
+		if mode not in (INLINE, THREAD, PROCESS):
+			raise ValueError(f"Unknown offload executor {mode!r} (expected inline, thread or process)")
+		self.mode = mode
+		self.workers = workers
+		self.min_bytes = min_bytes
+		self._executor: Optional[Executor] = None
+		self._lock = threading.Lock()
+
+	def _get_executor(self) -> Executor:
+		if self._executor is None:
+			with self._lock:
+				if self._executor is None:
+					if self.mode == PROCESS:
+						# Not fork: the server process has threads (log writer, exporters) whose locks a fork could copy held
+						self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+					else:
+						self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="offload")
+		return self._executor
+
+	def executor_for(self, size: int) -> str:
+		return INLINE if self.mode == INLINE or size < self.min_bytes else self.mode
+
+	async def run(self, size: int, fn: Callable[..., T], *args) -> T:
+		"""`fn(*args)`, on the executor if `size` (bytes of input) reaches the threshold."""
+		executor = self.executor_for(size)
+		offload_tasks_total.labels(executor).inc()
+		if executor == INLINE:
+			return fn(*args)
+		loop = asyncio.get_running_loop()
+		if executor == THREAD:
+			# Keep the trace context, so spans opened by `fn` attach to the request
+			call = functools.partial(contextvars.copy_context().run, fn, *args)
+		else:
+			call = functools.partial(fn, *args)
+		return await loop.run_in_executor(self._get_executor(), call)
+
+	def warm_up(self) -> None:
+		"""Start the workers now rather than on the first large response (process pools take a while)."""
+		if self.mode == PROCESS:
+			for future in [self._get_executor().submit(int) for _ in range(self.workers)]:
+				future.result()
+
+	def shutdown(self) -> None:
+		with self._lock:
+			if self._executor is not None:
+				self._executor.shutdown(wait=True, cancel_futures=True)
+				self._executor = None
+
+
+offloader = Offloader()
@@ -1,6 +1,9 @@
+import logging
 import os
 import sys
 
+logger = logging.getLogger(__name__)
+
 
 def read_flight_offer_(data):
 	"""
@@ -35,8 +38,7 @@ def read_flight_offer_(data):
 
 def flight_offer_list_reader(offers: list) -> list:
 	"""Read a list of flight offers and return a list of readable flight details."""
-	# offers = offers['results']['data']
-	print(len(offers))
+	logger.debug("Rendering %d flight offers", len(offers))
 	readable_offers = []
 	for offer in offers:
 		readable_offer = read_flight_offer_(offer)
@@ -0,0 +1,180 @@
+"""
+On-demand profiling of individual requests, for prompts that burn CPU in production.
+
+A request is profiled when it carries `X-Profile: <PROFILE_ADMIN_TOKEN>` (optionally
+`X-Profile-Mode: sampling|deterministic`) or is picked by `PROFILE_SAMPLE_RATE`. Two profilers:
+
+- "deterministic": cProfile; saved as `<request_id>.prof` (open with `snakeviz` or `python -m pstats`)
+  plus a `<request_id>.txt` summary of the top functions by cumulative time.
+- "sampling": a thread that samples the event-loop thread's stack every `PROFILE_SAMPLE_INTERVAL_MS`;
+  saved as `<request_id>.folded`, the collapsed-stack format read by speedscope and flamegraph.pl.
+  Much lower overhead than cProfile, so it is the mode used for sampled requests.
+
+Both see everything that runs on the event-loop thread while the request is in flight, including
+other concurrent requests; work in `asyncio.to_thread` workers (the LLM extractors) is not included.
+Only one request is profiled at a time. `PROFILE_DIR` keeps at most `PROFILE_MAX_FILES` files /
+`PROFILE_MAX_MB` megabytes, oldest deleted first. With no admin token and a zero sample rate,
+`profile_mode_for` returns immediately and nothing else runs.
+"""
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.main_config import (profile_admin_token, profile_sample_rate, profile_sample_interval_ms,
+                                profile_max_files, profile_max_mb)
+from config.data_config import PROFILE_DIR
+
+DETERMINISTIC, SAMPLING = "deterministic", "sampling"
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]")
+# cProfile and the sampler are process-wide, so a single profiled request at a time
+_active = threading.Lock()
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+	"""Whether `token` is the configured admin token (constant-time comparison; False when none is set)."""
+	return bool(profile_admin_token and token) and hmac.compare_digest(token.encode(), profile_admin_token.encode())
+
+
+def profile_mode_for(header_token: Optional[str], header_mode: Optional[str] = None) -> Optional[str]:
+	"""Profiler to run a request under, or None (the common, zero-cost case)."""
+	if profile_admin_token and header_token:
+		if is_admin_token(header_token):
+			return SAMPLING if header_mode == SAMPLING else DETERMINISTIC
+		return None
+	if profile_sample_rate > 0 and random.random() < profile_sample_rate:
+		return SAMPLING
+	return None
+
+
+class StackSampler:
+	"""Samples one thread's Python stack at a fixed interval and counts the collapsed stacks."""
+
+	def __init__(self, thread_id: int, interval_s: float) -> None:
+		self.thread_id = thread_id
+		self.interval_s = interval_s
+		self.stacks: Counter = Counter()
+		self.samples = 0
+		self._stop = threading.Event()
+		self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+	def _run(self) -> None:
+		while not self._stop.wait(self.interval_s):
+			frame = sys._current_frames().get(self.thread_id)
+			if frame is None:
+				continue
+			names = []
+			while frame is not None:
+				code = frame.f_code
+				names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+				frame = frame.f_back
+			self.stacks[";".join(reversed(names))] += 1
+			self.samples += 1
+
+	def start(self) -> None:
+		self._thread.start()
+
+	def stop(self) -> None:
+		self._stop.set()
+		self._thread.join()
+
+	def folded(self) -> str:
+		return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+	"""Profile everything on the current thread between `start()` and `stop()`, then `save()` it."""
+
+	def __init__(self, request_id: str, mode: str) -> None:
+		self.request_id = _SAFE_NAME_RE.sub("_", request_id)[:64]
+		self.mode = mode
+		self._profile: Optional[cProfile.Profile] = None
+		self._sampler: Optional[StackSampler] = None
+		self.started_at = 0.0
+
+	def start(self) -> bool:
+		"""False if another request is being profiled (this one then runs unprofiled)."""
+		if not _active.acquire(blocking=False):
+			return False
+		self.started_at = time.perf_counter()
+		if self.mode == SAMPLING:
+			self._sampler = StackSampler(threading.get_ident(), profile_sample_interval_ms / 1000)
+			self._sampler.start()
+		else:
+			self._profile = cProfile.Profile()
+			self._profile.enable()
+		return True
+
+	def stop(self) -> None:
+		try:
+			if self._profile is not None:
+				self._profile.disable()
+			if self._sampler is not None:
+				self._sampler.stop()
+		finally:
+			_active.release()
+
+	def save(self, directory: str = PROFILE_DIR) -> List[str]:
+		"""Write the profile files and apply the retention limits; returns the file names."""
+		os.makedirs(directory, exist_ok=True)
+		stem = f"{time.strftime('%Y%m%dT%H%M%S')}-{self.request_id}"
+		files = []
+		if self._profile is not None:
+			self._profile.dump_stats(os.path.join(directory, f"{stem}.prof"))
+			summary = io.StringIO()
+			pstats.Stats(self._profile, stream=summary).sort_stats("cumulative").print_stats(30)
+			with open(os.path.join(directory, f"{stem}.txt"), "w") as file:
+				file.write(summary.getvalue())
+			files += [f"{stem}.prof", f"{stem}.txt"]
+		if self._sampler is not None:
+			with open(os.path.join(directory, f"{stem}.folded"), "w") as file:
+				file.write(self._sampler.folded())
+			files.append(f"{stem}.folded")
+		enforce_retention(directory)
+		return files
+
+
+def list_profiles(directory: str = PROFILE_DIR) -> List[dict]:
+	"""Saved profiles, newest first."""
+	if not os.path.isdir(directory):
+		return []
+	entries = []
+	for name in os.listdir(directory):
+		path = os.path.join(directory, name)
+		if os.path.isfile(path):
+			stat = os.stat(path)
+			entries.append({"name": name, "bytes": stat.st_size, "modified": stat.st_mtime})
+	return sorted(entries, key=lambda e: e["modified"], reverse=True)
+
+
+def profile_path(name: str, directory: str = PROFILE_DIR) -> Optional[str]:
+	"""Path of a saved profile by file name (None if missing or not a plain name)."""
+	if _SAFE_NAME_RE.search(name) or name.startswith("."):
+		return None
+	path = os.path.join(directory, name)
+	return path if os.path.isfile(path) else None
+
+
+def enforce_retention(directory: str = PROFILE_DIR, max_files: int = profile_max_files,
+                      max_mb: float = profile_max_mb) -> int:
+	"""Delete the oldest profiles beyond `max_files` files or `max_mb` MB; returns how many were deleted."""
+	entries = list_profiles(directory)
+	total, deleted = 0, 0
+	for i, entry in enumerate(entries):
+		total += entry["bytes"]
+		if i >= max_files or total > max_mb * 1024 * 1024:
+			try:
+				os.remove(os.path.join(directory, entry["name"]))
+				deleted += 1
+			except OSError:
+				pass
+	return deleted
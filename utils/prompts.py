@@ -1,24 +1,47 @@
 import json
+import logging
 from datetime import datetime
+from typing import Optional
 from ollama import chat
 from pydantic import ValidationError
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.sensors import FlightSearchQueryDetails, FetchIntent, DateRangeDetails, HotelSearchQueryDetails
-from config.main_config import model_name
+from utils.sensors import FlightSearchQueryDetails, FetchIntent, DateRangeDetails, HotelSearchQueryDetails, InspirationSearchDetails
+from config.main_config import intent_confidence_threshold, ollama_keep_alive
+from utils.date_resolver import resolve_date_expression
+from utils.intent_classifier import classify_intent
+from utils.model_router import router
+from utils.llm_metrics import instrument_extractor, record_llm_response, mark_parse_outcome
+from utils.metrics import llm_request_seconds, llm_requests_in_flight
+from utils.tracing import span
 
-def fetch_date_range_from_query(prompt: str, model_to_be_used: str = model_name) -> DateRangeDetails:
+logger = logging.getLogger(__name__)
+
+
+def _chat(stage: str, model: Optional[str], content: str):
+	"""Send a single-message chat to the model routed for `stage` (or the explicit `model`)."""
+	model = model or router.model_for(stage)
+	with router.track(model), llm_requests_in_flight.track_inprogress(), llm_request_seconds.labels(stage, model).time(), \
+			span("ollama.chat", model=model):
+		response = chat(model=model, messages=[{'role': 'user', 'content': content}], keep_alive=ollama_keep_alive)
+	record_llm_response(model, response)
+	return response
+
+
+@instrument_extractor("date")
+def fetch_date_range_from_query(prompt: str, model_to_be_used: Optional[str] = None) -> DateRangeDetails:
 	"""
     Extract specific date or date range details from the user query.
     
-    This function uses an LLM to identify and extract date information from a natural language prompt.
-    It handles both single dates and date ranges, converting relative terms (e.g., "next week") 
+    The supported relative and explicit phrasings (e.g. "tomorrow", "next Friday", "this weekend",
+    "in December", "between X and Y") are resolved locally by `resolve_date_expression`.
+    Only prompts it does not recognise are sent to the LLM, which converts relative terms
     into absolute ISO 8601 (YYYY-MM-DD) format.
     
     Args:
         prompt (str): The user's natural language query.
-        model_to_be_used (str): The LLM model identifier to use (default from config).
+        model_to_be_used (Optional[str]): The LLM model identifier to use (default: routed "date" model).
         
     Returns:
         DateRangeDetails: A Pydantic object containing:
@@ -26,6 +49,10 @@ def fetch_date_range_from_query(prompt: str, model_to_be_used: str = model_name)
             - end_date (Optional[str]): The ending date of the range (if applicable).
             - is_range (bool): True if a range was detected, False otherwise.
     """
+	resolved = resolve_date_expression(prompt)
+	if resolved is not None:
+		return resolved
+
 	now = datetime.now().strftime("%Y-%m-%d")
 	extraction_prompt = f"""
     Current date: {now}
@@ -41,20 +68,39 @@ def fetch_date_range_from_query(prompt: str, model_to_be_used: str = model_name)
         "is_range": boolean
     }}
     """
-	response = chat(
-		model=model_to_be_used,
-		messages=[{'role': 'user', 'content': extraction_prompt}],
-	)
+	response = _chat("date", model_to_be_used, extraction_prompt)
 	try:
 		details_json = response['message']['content'].strip().strip("```").replace("json", "").strip()
 		parsed = json.loads(details_json)
 		return DateRangeDetails(**parsed)
 	except (json.JSONDecodeError, Exception):
+		mark_parse_outcome("fallback")
 		return DateRangeDetails(start_date=None, end_date=None, is_range=False)
 
 
-def fetch_intent_of_the_query(prompt: str, model_to_be_used: str = model_name) -> FetchIntent:
-	"""Extract the details from the prompt fetch the Intent of the user query"""
+@instrument_extractor("intent")
+def fetch_local_intent(prompt: str) -> Optional[FetchIntent]:
+	"""The local classifier's intent, or None when its confidence is below `intent_confidence_threshold`."""
+	local_intent = classify_intent(prompt)
+	if local_intent.confidence >= intent_confidence_threshold:
+		return local_intent
+	mark_parse_outcome("abstained")
+	return None
+
+
+@instrument_extractor("intent")
+def fetch_intent_of_the_query(prompt: str, model_to_be_used: Optional[str] = None, use_local_classifier: bool = True) -> FetchIntent:
+	"""
+	Extract the details from the prompt fetch the Intent of the user query.
+
+	The local keyword classifier answers first; the LLM is only called when its confidence
+	is below `intent_confidence_threshold` (or when `use_local_classifier` is False).
+	"""
+	if use_local_classifier:
+		local_intent = classify_intent(prompt)
+		if local_intent.confidence >= intent_confidence_threshold:
+			return local_intent
+
 	now = datetime.now().strftime("%Y-%m-%d")
 
 	extraction_prompt = f"""
@@ -69,21 +115,23 @@ def fetch_intent_of_the_query(prompt: str, model_to_be_used: str = model_name) -
     2. "find_flights_standard": If the user is making a simple point-to-point flight search without complex sorting or advanced filters (other than basic class/passengers).
        - KEYWORDS: "find flights", "show me flights", "flights from X to Y".
     
-    3. "other": If the user is not looking to search for flights, return "other".
+    3. "find_flights_anywhere": If the user gives only an origin and wants destination ideas or the cheapest places to fly to.
+       - KEYWORDS: "anywhere", "cheapest flights from X" (no destination), "where can I fly", "cheapest destinations".
+
+    4. "plan_trip": If the user wants a trip package: flights AND a hotel/stay (e.g. "trip to Goa next weekend", "flight and hotel to Dubai").
+
+    5. "other": If the user is not looking to search for flights, return "other".
 
     Prompt: "{prompt}"
 
     Provide the details strictly in JSON format with keys matching the Pydantic schema:
-    - "intent": One of "find_flights_advanced", "find_flights_standard", "other".
+    - "intent": One of "find_flights_advanced", "find_flights_standard", "find_flights_anywhere", "plan_trip", "other".
     - "date_range": Boolean. True if the user implies flexible dates, a date range (e.g. "next week", "in December").
     - "date_range_details": Object with "start_date" (YYYY-MM-DD), "end_date" (YYYY-MM-DD), "is_range" (bool). Only populate if date_range is True.
     - "multicity_trip": Boolean. True if user has given a multicity trip eg. "from Delhi to Bombay to Kolkata and back to Delhi", "Delhi, Bombay and Kolkata coming back to Delhi", "Delhi, Bombay and Kolkata coming back to Bombay", False otherwise.
     - "sorting_details": String. One of "price", "duration", "generated_departure_time", "generated_arrival_time", "number_of_bookable_seats", "last_ticketing_date". Only populate if user has given a sorting preference.
     """
-	response = chat(
-		model=model_to_be_used,
-		messages=[{'role': 'user', 'content': extraction_prompt}],
-	)
+	response = _chat("intent", model_to_be_used, extraction_prompt)
 	details_json = response['message']['content']
 	try:
 		details_json = details_json.strip().strip("```").replace("json", "").strip()
@@ -91,13 +139,15 @@ def fetch_intent_of_the_query(prompt: str, model_to_be_used: str = model_name) -
 		details = FetchIntent(**parsed)
 	except (json.JSONDecodeError, ValidationError) as e:
 		# Fallback to standard if ambiguous or error, or raise
-		print(f"Intent Parsing Error: {e}")
+		logger.warning("Intent parsing failed, falling back to standard search: %s", e)
+		mark_parse_outcome("fallback")
 		details = FetchIntent(intent="find_flights_standard")
 
 	return details
 
 
-def fetch_standard_flight_details(user_prompt: str, current_model: str = model_name) -> FlightSearchQueryDetails:
+@instrument_extractor("flight")
+def fetch_standard_flight_details(user_prompt: str, current_model: Optional[str] = None) -> FlightSearchQueryDetails:
 	"""Extract details for Standard/Advanced Flight Search (Unified in FlightSearchQueryDetails)"""
 	now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -124,13 +174,14 @@ def fetch_standard_flight_details(user_prompt: str, current_model: str = model_n
     14. "max_stops": Int (0, 1, 2). If "direct" or "non-stop" is requested, set max_stops=0.
     15. "min_bookable_seats": Int (Optional).
     16. "instant_ticketing_required": Boolean (Optional).
+    17. "search_nearby_airports": Boolean. True if the user asks for any/all airports of a city (e.g. "any London airport").
 
 	Prompt: "{user_prompt}"
 
 	Provide details strictly in JSON.
 	"""
 
-	response = chat(model=current_model, messages=[{'role': 'user', 'content': extraction_prompt}])
+	response = _chat("flight", current_model, extraction_prompt)
 	details_json = response['message']['content']
 
 	try:
@@ -141,7 +192,8 @@ def fetch_standard_flight_details(user_prompt: str, current_model: str = model_n
 		raise ValueError(f"LLM Error:\n{details_json}\n{e}")
 	return details
 
-def fetch_hotel_details(user_prompt: str, current_model: str = model_name) -> HotelSearchQueryDetails:
+@instrument_extractor("hotel")
+def fetch_hotel_details(user_prompt: str, current_model: Optional[str] = None) -> HotelSearchQueryDetails:
 	"""Extract details for Hotel Search"""
 	now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -157,13 +209,18 @@ def fetch_hotel_details(user_prompt: str, current_model: str = model_name) -> Ho
 	5. "children": Int (Default 0).
 	6. "infants": Int (Default 0).
 	7. "currency": Default "INR".
-	
+	8. "room_quantity": Int (Default 1).
+	9. "max_price": Int total budget for the stay (Optional).
+	10. "min_stars": List of star ratings to include, e.g. [4, 5] for "4 star or better" (Optional).
+	11. "board_type": "ROOM_ONLY", "BREAKFAST", "HALF_BOARD", "FULL_BOARD" or "ALL_INCLUSIVE" (Optional).
+	12. "max_results": Int (Default 10).
+
 
 	Prompt: "{user_prompt}"
 
 	Provide details strictly in JSON.
 	"""
-	response = chat(model=current_model, messages=[{'role': 'user', 'content': extraction_prompt}])
+	response = _chat("hotel", current_model, extraction_prompt)
 	details_json = response['message']['content']
 
 	try:
@@ -174,6 +231,41 @@ def fetch_hotel_details(user_prompt: str, current_model: str = model_name) -> Ho
 		raise ValueError(f"LLM Error:\n{details_json}\n{e}")
 	return details	
 
+@instrument_extractor("inspiration")
+def fetch_inspiration_details(user_prompt: str, current_model: Optional[str] = None) -> InspirationSearchDetails:
+	"""Extract details for an "anywhere" search (cheapest destinations from an origin)"""
+	now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+	extraction_prompt = f"""
+	You are a helpful Travel Agent that extracts flight inspiration search details.
+	Current time: {now}
+
+	Extract the following InspirationSearchDetails from the prompt:
+	1. "origin_iata": IATA code of the origin (e.g. MAD, LON).
+	2. "max_price": Int budget (Optional).
+	3. "departure_month": YYYY-MM if the user names a month (Optional).
+	4. "country": Destination country name in English if the user restricts it (Optional).
+	5. "one_way": Boolean (Default False).
+	6. "non_stop": Boolean (Default False).
+	7. "min_trip_days" / "max_trip_days": Int length of stay (Optional).
+	8. "sort_by": "price", "duration" or "departure_date" (Default "price").
+	9. "max_results": Int (Default 10).
+
+	Prompt: "{user_prompt}"
+
+	Provide details strictly in JSON.
+	"""
+	response = _chat("inspiration", current_model, extraction_prompt)
+	details_json = response['message']['content']
+
+	try:
+		details_json = details_json.strip().strip("```").replace("json", "").strip()
+		parsed = json.loads(details_json)
+		details = InspirationSearchDetails(**parsed)
+	except (json.JSONDecodeError, ValidationError) as e:
+		raise ValueError(f"LLM Error:\n{details_json}\n{e}")
+	return details
+
 if __name__ == "__main__":
 	# Example usage
 	user_prompt = "plan a trip from BLR to BOM next month"
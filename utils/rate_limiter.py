@@ -0,0 +1,54 @@
+"""
+Token-bucket rate limiter shared by every Amadeus call of the process.
+
+The Amadeus self-service APIs allow a fixed number of transactions per second (10 on the test
+environment); bursts above that are answered with 429. `async with amadeus_rate_limiter:` waits
+for a token instead. The bucket is not bound to an event loop, so it can be shared by the API
+server, the batch runner and the cache warmer.
+"""
+import asyncio
+import os
+import threading
+import time
+
+
+class RateLimiter:
+	"""Allow `rate` acquisitions per second on average, with bursts of up to `burst`"""
+
+	def __init__(self, rate: float, burst: int = 1) -> None:
+		self.rate = rate
+		self.burst = burst
+		self._tokens = float(burst)
+		self._updated = time.monotonic()
+		self._lock = threading.Lock()
+		self.waited_s = 0.0
+
+	def _reserve(self) -> float:
+		"""Take a token, possibly one not refilled yet; return how long to wait for it."""
+		with self._lock:
+			now = time.monotonic()
+			self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+			self._updated = now
+			self._tokens -= 1
+			return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+	async def acquire(self) -> None:
+		if self.rate <= 0:
+			return
+		delay = self._reserve()
+		if delay > 0:
+			self.waited_s += delay
+			await asyncio.sleep(delay)
+
+	async def __aenter__(self):
+		await self.acquire()
+		return self
+
+	async def __aexit__(self, *exc):
+		return False
+
+
+amadeus_rate_limiter = RateLimiter(
+	rate=float(os.getenv("AMADEUS_RATE_LIMIT", "10")),
+	burst=int(os.getenv("AMADEUS_RATE_BURST", "10")),
+)
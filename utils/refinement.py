@@ -0,0 +1,86 @@
+"""
+Recognise follow-up prompts that only re-rank or re-filter the previous flight search of a session.
+
+"now sort by duration", "only non-stop", "show me the 5 cheapest", "at least 3 seats" map to a
+`RefinementDetails`; anything naming a new route, airport or date, or carrying words beyond the
+refinement phrases, returns None so the prompt goes through the full pipeline.
+"""
+import re
+from typing import Optional
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sensors import RefinementDetails, SortBy
+from utils.date_resolver import resolve_date_expression
+
+_NUMBERS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+            "ten": 10, "twenty": 20}
+_NUMBER = r"(\d+|" + "|".join(_NUMBERS) + r")"
+
+_SORTS = [
+	(re.compile(r"\b(fastest|shortest|quickest|duration|shorter)\b"), SortBy.DURATION),
+	(re.compile(r"\b(earliest|departure|departing first|leaves? first)\b"), SortBy.DEPARTURE_TIME),
+	(re.compile(r"\b(arrival|arrives? first|arriving first)\b"), SortBy.ARRIVAL_TIME),
+	(re.compile(r"\b(most seats|seats available|by seats)\b"), SortBy.SEATS),
+	(re.compile(r"\b(last ticketing|ticketing deadline)\b"), SortBy.LAST_TICKETING_DATE),
+	(re.compile(r"\b(cheapest|cheaper|lowest price|by price|price)\b"), SortBy.PRICE),
+]
+_NON_STOP_RE = re.compile(r"\b(non[- ]?stop|direct)\b")
+_STOPS_RE = re.compile(r"\b(?:at most|max(?:imum)?|up to|no more than|with)?\s*" + _NUMBER + r"\s+stops?\b")
+_SEATS_RE = re.compile(r"\b(?:at least|min(?:imum)?)\s+" + _NUMBER + r"\s+(?:bookable\s+)?seats?\b")
+_INSTANT_RE = re.compile(r"\binstant ticketing\b")
+_COUNT_RE = re.compile(
+	r"\b(?:top|first|show(?: me)?(?: the)?|only(?: the)?|just(?: the)?|give me(?: the)?|the)\s+" + _NUMBER + r"\b"
+	r"|\b" + _NUMBER + r"\s+(?:cheapest|fastest|best|results|options|flights|offers)\b"
+)
+# A new route or airport means a new search, not a refinement
+_NEW_SEARCH_RE = re.compile(r"\bfrom\s+\w+|\bto\s+(?!the\b|one\b|two\b|\d)\w+|\b[A-Z]{3}\b")
+# Words a refinement may carry besides its phrases. Any other word ("hotels", "book", a city) means
+# the prompt asks for something new, even if it also says "cheapest"
+_FILLER = {
+	"a", "about", "again", "all", "an", "and", "are", "by", "can", "could", "first", "filter", "flight", "flights",
+	"give", "i", "in", "instead", "is", "it", "just", "keep", "let's", "lets", "list", "make", "me", "now", "of",
+	"offer", "offers", "ok", "okay", "one", "ones", "only", "option", "options", "order", "ordered", "please", "put",
+	"rank", "re", "result", "results", "see", "show", "sort", "sorted", "than", "that", "the", "them", "then",
+	"these", "those", "top", "want", "what", "which", "with", "you", "would",
+}
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def _number(token: str) -> int:
+	return int(token) if token.isdigit() else _NUMBERS[token]
+
+
+def parse_refinement(prompt: str) -> Optional[RefinementDetails]:
+	"""The client-side changes a follow-up prompt asks for, or None if it is not a pure refinement."""
+	if _NEW_SEARCH_RE.search(prompt) or resolve_date_expression(prompt) is not None:
+		return None
+	text = prompt.lower()
+	changes = {}
+
+	for pattern, sort_by in _SORTS:
+		if pattern.search(text):
+			changes.setdefault("sort_by", sort_by)
+	if _NON_STOP_RE.search(text):
+		changes["max_stops"] = 0
+	else:
+		match = _STOPS_RE.search(text)
+		if match:
+			changes["max_stops"] = min(_number(match.group(1)), 2)
+	match = _SEATS_RE.search(text)
+	if match:
+		changes["min_bookable_seats"] = _number(match.group(1))
+	if _INSTANT_RE.search(text):
+		changes["instant_ticketing_required"] = True
+	match = _COUNT_RE.search(_SEATS_RE.sub("", _STOPS_RE.sub("", text)))
+	if match:
+		changes["max_results"] = _number(match.group(1) or match.group(2))
+
+	if not changes:
+		return None
+	rest = text
+	for pattern in [p for p, _ in _SORTS] + [_NON_STOP_RE, _STOPS_RE, _SEATS_RE, _INSTANT_RE, _COUNT_RE]:
+		rest = pattern.sub(" ", rest)
+	if any(word not in _FILLER for word in _WORD_RE.findall(rest)):
+		return None
+	return RefinementDetails(**changes)
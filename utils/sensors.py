@@ -7,6 +7,8 @@ from pydantic import BaseModel, Field
 class UserIntent(str, Enum):
 	FIND_FLIGHTS_ADVANCED = "find_flights_advanced"
 	FIND_FLIGHTS_STANDARD = "find_flights_standard"
+	FIND_FLIGHTS_ANYWHERE = "find_flights_anywhere"
+	PLAN_TRIP = "plan_trip"
 	OTHER = "other"
 
 
@@ -36,9 +38,11 @@ class FetchIntent(BaseModel):
 	                                       description="True if user has given a multicity trip eg. from X to Y to Z and back to X. eg. X, Y and Z coming back to X, False otherwise")
 	sorting_details: Optional[SortBy] = Field(None,
 	                                          description="Sorting details if user has given a sorting preference")
+	confidence: Optional[float] = Field(None, description="Calibrated confidence of the local intent classifier, None for LLM results",
+	                                    ge=0.0, le=1.0)
 
 	def __str__(self):
-		return f"intent={self.intent} date_range={self.date_range} date_range_details={self.date_range_details} multicity_trip={self.multicity_trip} sorting_details={self.sorting_details}"
+		return f"intent={self.intent} date_range={self.date_range} date_range_details={self.date_range_details} multicity_trip={self.multicity_trip} sorting_details={self.sorting_details} confidence={self.confidence}"
 
 
 class FlightSearchQueryDetails(BaseModel):
@@ -63,10 +67,102 @@ class FlightSearchQueryDetails(BaseModel):
 	min_bookable_seats: Optional[int] = Field(None, description="Minimum number of bookable seats required")
 	instant_ticketing_required: Optional[bool] = Field(False,
 	                                                   description="Whether to filter for flights that require instant ticketing")
+	search_nearby_airports: Optional[bool] = Field(False,
+	                                               description="Search every airport of the origin and destination city/metro area")
+
+
+class RefinementDetails(BaseModel):
+	"""Client-side changes to the previous flight search of a chat session ("now sort by duration", "only non-stop")"""
+	sort_by: Optional[SortBy] = Field(None, description="New sort order")
+	max_stops: Optional[int] = Field(None, description="Maximum number of stops (0 = non-stop only)", ge=0, le=2)
+	min_bookable_seats: Optional[int] = Field(None, description="Minimum number of bookable seats", ge=1)
+	instant_ticketing_required: Optional[bool] = Field(None, description="Only offers that require instant ticketing")
+	max_results: Optional[int] = Field(None, description="Number of offers to show", ge=1)
 
 
 class HotelSearchQueryDetails(BaseModel):
 	"""Model to fetch hotel search details for hotel search"""
 	city_code: str = Field(..., description="City code for the hotel search", max_length=150)
 	radius: Optional[int] = Field(5, description="Radius in kilometers for the hotel search", ge=1)
-	radius_unit: Optional[str] = Field("KM", description="Radius unit for the hotel search", max_length=2)
+	radius_unit: Optional[str] = Field("KM", description="Radius unit for the hotel search: KM or MILE", max_length=4)
+	latitude: Optional[float] = Field(None, description="Search around this point instead of the city centre", ge=-90, le=90)
+	longitude: Optional[float] = Field(None, description="Search around this point instead of the city centre", ge=-180, le=180)
+	check_in_date: Optional[str] = Field(None, description="Check-in date in YYYY-MM-DD format", max_length=10)
+	check_out_date: Optional[str] = Field(None, description="Check-out date in YYYY-MM-DD format", max_length=10)
+	adults: Optional[int] = Field(1, description="Number of adult guests per room", ge=1, le=9)
+	children: Optional[int] = Field(0, description="Number of children", ge=0)
+	infants: Optional[int] = Field(0, description="Number of infants", ge=0)
+	room_quantity: Optional[int] = Field(1, description="Number of rooms", ge=1, le=9)
+	currency: Optional[str] = Field("INR", description="Currency code for hotel prices", max_length=3)
+	max_price: Optional[int] = Field(None, description="Maximum total price for the stay", ge=0)
+	min_stars: Optional[List[int]] = Field(None, description="Hotel star ratings to include, e.g. [4, 5]")
+	amenities: Optional[List[str]] = Field(None, description="Amenity codes the hotel must have, e.g. SWIMMING_POOL")
+	board_type: Optional[str] = Field(None, description="Meal plan: ROOM_ONLY, BREAKFAST, HALF_BOARD, FULL_BOARD, ALL_INCLUSIVE", max_length=20)
+	max_results: Optional[int] = Field(10, description="Number of priced hotels to return", ge=1)
+
+
+class CheapestFlightSearchDetails(BaseModel):
+	"""Model for the Amadeus Flight Cheapest Date Search (/v1/shopping/flight-dates)"""
+	origin: str = Field(..., description="IATA code of the origin city/airport", max_length=3)
+	destination: str = Field(..., description="IATA code of the destination city/airport", max_length=3)
+	departure_date: Optional[str] = Field(None,
+	                                      description="Departure date or range YYYY-MM-DD[,YYYY-MM-DD]. None lets Amadeus pick its default window",
+	                                      max_length=21)
+	one_way: Optional[bool] = Field(True, description="Only one-way fares; False prices round trips")
+	duration: Optional[str] = Field(None, description="Round-trip stay in days, exact or range (e.g. '7' or '2,8')",
+	                                max_length=10)
+	non_stop: Optional[bool] = Field(False, description="Whether to consider non-stop flights only")
+	max_price: Optional[int] = Field(None, description="Maximum price per fare", ge=0)
+	currency: Optional[str] = Field("INR", description="Currency used by the per-day fallback search", max_length=3)
+
+
+class FlightDatePrice(BaseModel):
+	"""Lowest fare found for one departure (and return) date"""
+	departure_date: str = Field(..., description="Departure date in YYYY-MM-DD format")
+	return_date: Optional[str] = Field(None, description="Return date in YYYY-MM-DD format for round trips")
+	price: float = Field(..., description="Lowest total price for the date")
+	currency: Optional[str] = Field(None, description="Currency code of the price")
+
+
+class CheapestDateCalendar(BaseModel):
+	"""Date -> price calendar for one route, cheapest date first"""
+	origin: str = Field(..., description="Origin IATA code")
+	destination: str = Field(..., description="Destination IATA code")
+	source: str = Field(..., description="'flight-dates' (precomputed by Amadeus) or 'flight-offers' (per-day fallback search)")
+	dates: List[FlightDatePrice] = Field(default_factory=list, description="Prices per date, sorted by price")
+	fetched_at: float = Field(..., description="Unix time the calendar was fetched from Amadeus")
+
+	def cheapest(self) -> Optional[FlightDatePrice]:
+		return self.dates[0] if self.dates else None
+
+
+class InspirationSort(str, Enum):
+	PRICE = "price"
+	DURATION = "duration"
+	DEPARTURE_DATE = "departure_date"
+
+
+class InspirationSearchDetails(BaseModel):
+	"""Model for "cheapest flights from X to anywhere" (Amadeus Flight Inspiration Search)"""
+	origin_iata: str = Field(..., description="IATA code of the origin city/airport", max_length=150)
+	max_price: Optional[int] = Field(None, description="Budget: maximum price per trip", ge=0)
+	departure_month: Optional[str] = Field(None, description="Only trips departing in this month, YYYY-MM", max_length=7)
+	country: Optional[str] = Field(None, description="Only destinations in this country (e.g. Spain, France)", max_length=100)
+	one_way: Optional[bool] = Field(False, description="One-way fares instead of round trips")
+	non_stop: Optional[bool] = Field(False, description="Only destinations served non-stop")
+	min_trip_days: Optional[int] = Field(None, description="Shortest stay in days for round trips", ge=0)
+	max_trip_days: Optional[int] = Field(None, description="Longest stay in days for round trips", ge=0)
+	sort_by: Optional[InspirationSort] = Field(InspirationSort.PRICE, description="Order of the destinations")
+	max_results: Optional[int] = Field(10, description="Maximum number of destinations to return", ge=1)
+
+
+class FlightDestination(BaseModel):
+	"""Cheapest fare from an origin to one destination"""
+	destination: str = Field(..., description="Destination IATA code")
+	city: Optional[str] = Field(None, description="Destination city name")
+	country: Optional[str] = Field(None, description="Destination country")
+	departure_date: str = Field(..., description="Departure date in YYYY-MM-DD format")
+	return_date: Optional[str] = Field(None, description="Return date in YYYY-MM-DD format for round trips")
+	trip_days: Optional[int] = Field(None, description="Length of stay in days for round trips")
+	price: float = Field(..., description="Lowest total price")
+	currency: Optional[str] = Field(None, description="Currency code of the price")
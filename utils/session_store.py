@@ -0,0 +1,55 @@
+"""
+Per-session state of /chat: the last flight search and its raw offers, so follow-ups that only
+re-sort or re-filter ("now sort by duration", "only non-stop") are answered without a new search.
+
+Sessions expire after `session_idle_ttl_s` without use, at most `session_max` are kept (least
+recently used evicted first) and each keeps at most `session_max_offers` raw offers.
+"""
+from typing import List, Optional
+from pydantic import BaseModel, Field
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sensors import FlightSearchQueryDetails, RefinementDetails
+from utils.ttl_cache import TTLCache
+from config.main_config import session_idle_ttl_s, session_max, session_max_offers
+
+
+class ChatSession(BaseModel):
+	"""The last flight search of a chat session"""
+	session_id: str = Field(..., description="Client supplied (or generated) session ID")
+	intent: str = Field(..., description="Intent of the search, reused for follow-ups")
+	details: FlightSearchQueryDetails = Field(..., description="Search details of the last upstream search")
+	offers: List[dict] = Field(default_factory=list, description="Raw Amadeus offers of the last upstream search")
+	fetched: RefinementDetails = Field(default_factory=RefinementDetails,
+	                                   description="Filters and result count the upstream search itself applied")
+	view: RefinementDetails = Field(default_factory=RefinementDetails,
+	                                description="Sort/filters/count of the offers last shown to the user")
+
+
+class SessionStore:
+	def __init__(self, idle_ttl_s: float = session_idle_ttl_s, max_sessions: int = session_max,
+	             max_offers: int = session_max_offers) -> None:
+		self.max_offers = max_offers
+		self._sessions = TTLCache(ttl=idle_ttl_s, max_entries=max_sessions)
+
+	def get(self, session_id: str) -> Optional[ChatSession]:
+		session = self._sessions.get(session_id)
+		if session is not None:
+			# Idle expiry: every use restarts the TTL
+			self._sessions.set(session_id, session)
+		return session
+
+	def save(self, session: ChatSession) -> None:
+		if len(session.offers) > self.max_offers:
+			session.offers = session.offers[:self.max_offers]
+		self._sessions.set(session.session_id, session)
+
+	def delete(self, session_id: str) -> None:
+		self._sessions.invalidate(session_id)
+
+	def stats(self) -> dict:
+		return self._sessions.stats()
+
+
+session_store = SessionStore()
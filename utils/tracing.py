@@ -0,0 +1,259 @@
+"""
+Lightweight request tracing: a request ID, nested spans, a Server-Timing header and an OTLP file export.
+
+    with start_trace("POST /chat", request_id) as trace:      # services/api.py middleware
+        with span("llm.flight", model="gemma3:4b"):           # extractors, Amadeus calls, filter/sort, render
+            ...
+    trace.server_timing()   # 'total;dur=812.4, llm.intent;dur=3.1, amadeus.flight-offers;dur=402.7;desc="x3"'
+    trace.summary()         # the `debug` field of ChatResponse
+
+The current span lives in a ContextVar, so spans nest across `await`, `asyncio.gather` and
+`asyncio.to_thread`. Outside a trace `span()` is a no-op.
+
+With TRACE_EXPORT=true every finished trace is appended to `TRACE_EXPORT_FILE` as one OTLP/JSON
+`ExportTraceServiceRequest` per line (the format of the OpenTelemetry collector's `file` exporter and
+`otlpjsonfile` receiver), so traces can be inspected or replayed into Jaeger/Tempo without running a collector.
+"""
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.main_config import trace_export_enabled
+from config.data_config import TRACE_EXPORT_FILE
+
+logger = logging.getLogger(__name__)
+SERVICE_NAME = "travel-agent"
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+# Server-Timing metric names are HTTP tokens
+_NON_TOKEN_RE = re.compile(r"[^A-Za-z0-9!#$%&'*+\-.^_`|~]")
+
+
+class Span:
+	"""One timed operation of a trace"""
+	__slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "_token")
+
+	def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: dict) -> None:
+		self.trace = trace
+		self.name = name
+		self.span_id = uuid.uuid4().hex[:16]
+		self.parent_id = parent_id
+		self.attributes = attributes
+		self.error: Optional[str] = None
+		self.end_ns: Optional[int] = None
+		self.start_ns = time.time_ns()
+
+	@property
+	def duration_ms(self) -> float:
+		return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+	def set_attribute(self, key: str, value) -> None:
+		self.attributes[key] = value
+
+	def __enter__(self) -> "Span":
+		self._token = _current_span.set(self)
+		return self
+
+	def __exit__(self, exc_type, exc, tb) -> None:
+		self.end_ns = time.time_ns()
+		if exc is not None:
+			self.error = f"{exc_type.__name__}: {exc}"
+		_current_span.reset(self._token)
+		self.trace.spans.append(self)
+
+
+class _NoSpan:
+	"""Returned by `span()` outside a trace"""
+	__slots__ = ()
+
+	def __enter__(self) -> "_NoSpan":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		pass
+
+	def set_attribute(self, key: str, value) -> None:
+		pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Trace:
+	"""The spans of one request, root first once finished"""
+
+	def __init__(self, request_id: Optional[str] = None) -> None:
+		self.request_id = request_id or uuid.uuid4().hex
+		self.trace_id = uuid.uuid4().hex
+		self.spans: List[Span] = []
+		self.root: Optional[Span] = None
+
+	def server_timing(self) -> str:
+		"""`Server-Timing` header value: the root span as "total", then each span name with its summed duration."""
+		totals: Dict[str, List[float]] = {}
+		for s in self.spans:
+			if s is not self.root:
+				entry = totals.setdefault(_NON_TOKEN_RE.sub("_", s.name), [0.0, 0])
+				entry[0] += s.duration_ms
+				entry[1] += 1
+		parts = [f"total;dur={self.root.duration_ms:.1f}"] if self.root is not None else []
+		for name, (duration, count) in totals.items():
+			parts.append(f'{name};dur={duration:.1f}' + (f';desc="x{count}"' if count > 1 else ""))
+		return ", ".join(parts)
+
+	def summary(self) -> dict:
+		"""Request ID and finished spans (offsets from the trace start, in ms) for the ChatResponse debug field."""
+		start = self.root.start_ns if self.root is not None else min((s.start_ns for s in self.spans), default=0)
+		spans = sorted(self.spans, key=lambda s: s.start_ns)
+		return {
+			"request_id": self.request_id,
+			"trace_id": self.trace_id,
+			"spans": [{
+				"name": s.name,
+				"span_id": s.span_id,
+				"parent_id": s.parent_id,
+				"start_ms": round((s.start_ns - start) / 1e6, 3),
+				"duration_ms": round(s.duration_ms, 3),
+				**({"attributes": s.attributes} if s.attributes else {}),
+				**({"error": s.error} if s.error else {}),
+			} for s in spans],
+		}
+
+	def to_otlp(self) -> dict:
+		"""The trace as an OTLP/JSON ExportTraceServiceRequest."""
+		return {"resourceSpans": [{
+			"resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+			"scopeSpans": [{
+				"scope": {"name": "utils.tracing"},
+				"spans": [{
+					"traceId": self.trace_id,
+					"spanId": s.span_id,
+					**({"parentSpanId": s.parent_id} if s.parent_id else {}),
+					"name": s.name,
+					# SPAN_KIND_SERVER for the request, SPAN_KIND_INTERNAL otherwise
+					"kind": 2 if s is self.root else 1,
+					"startTimeUnixNano": str(s.start_ns),
+					"endTimeUnixNano": str(s.end_ns or s.start_ns),
+					"attributes": [_otlp_attribute(k, v) for k, v in
+					               ({"request.id": self.request_id, **s.attributes} if s is self.root else s.attributes).items()],
+					"status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+				} for s in self.spans],
+			}],
+		}]}
+
+
+def _otlp_attribute(key: str, value) -> dict:
+	if isinstance(value, bool):
+		typed = {"boolValue": value}
+	elif isinstance(value, int):
+		typed = {"intValue": str(value)}
+	elif isinstance(value, float):
+		typed = {"doubleValue": value}
+	else:
+		typed = {"stringValue": str(value)}
+	return {"key": key, "value": typed}
+
+
+def span(name: str, **attributes):
+	"""Time a block as a child of the current span; a no-op outside a trace."""
+	parent = _current_span.get()
+	if parent is None:
+		return _NO_SPAN
+	return Span(parent.trace, name, parent.span_id, attributes)
+
+
+def record_span(name: str, duration_s: float, **attributes) -> None:
+	"""Add a finished child span, ending now, for work timed elsewhere (an offload worker process)."""
+	parent = _current_span.get()
+	if parent is None:
+		return
+	finished = Span(parent.trace, name, parent.span_id, attributes)
+	finished.end_ns = time.time_ns()
+	finished.start_ns = finished.end_ns - int(duration_s * 1e9)
+	parent.trace.spans.append(finished)
+
+
+def current_trace() -> Optional[Trace]:
+	current = _current_span.get()
+	return current.trace if current is not None else None
+
+
+class _TraceScope:
+	def __init__(self, name: str, request_id: Optional[str], attributes: dict) -> None:
+		self.trace = Trace(request_id)
+		self.trace.root = Span(self.trace, name, None, attributes)
+
+	def __enter__(self) -> Trace:
+		self.trace.root.__enter__()
+		return self.trace
+
+	def __exit__(self, exc_type, exc, tb) -> None:
+		self.trace.root.__exit__(exc_type, exc, tb)
+		if trace_export_enabled:
+			get_exporter().export(self.trace)
+
+
+def start_trace(name: str, request_id: Optional[str] = None, **attributes) -> _TraceScope:
+	"""Open a trace whose root span is `name`; nested `span()` calls attach to it."""
+	return _TraceScope(name, request_id, attributes)
+
+
+class FileSpanExporter:
+	"""Appends OTLP/JSON lines to `path` from a background thread, off the request path."""
+
+	def __init__(self, path: str = TRACE_EXPORT_FILE) -> None:
+		self.path = path
+		self._queue: "queue.Queue[Optional[Trace]]" = queue.Queue(maxsize=10000)
+		self._thread = threading.Thread(target=self._write_loop, name="trace-exporter", daemon=True)
+		self._thread.start()
+		self.dropped = 0
+
+	def export(self, trace: Trace) -> None:
+		try:
+			self._queue.put_nowait(trace)
+		except queue.Full:
+			self.dropped += 1
+
+	def _write_loop(self) -> None:
+		os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+		while True:
+			trace = self._queue.get()
+			try:
+				if trace is None:
+					return
+				try:
+					with open(self.path, "a") as file:
+						file.write(json.dumps(trace.to_otlp()) + "\n")
+				except OSError as e:
+					self.dropped += 1
+					logger.warning("Trace export failed: %s", e)
+			finally:
+				self._queue.task_done()
+
+	def flush(self) -> None:
+		self._queue.join()
+
+	def close(self) -> None:
+		self._queue.put(None)
+		self._thread.join()
+
+
+_exporter: Optional[FileSpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> FileSpanExporter:
+	global _exporter
+	if _exporter is None:
+		with _exporter_lock:
+			if _exporter is None:
+				_exporter = FileSpanExporter()
+	return _exporter
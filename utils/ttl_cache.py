@@ -0,0 +1,114 @@
+"""
+A small in-process TTL cache for Amadeus responses that change slowly (cheapest-date calendars, ...).
+
+Entries expire after their TTL and the least recently used entry is evicted once `max_entries` is
+reached. `get_or_load` coalesces concurrent misses for the same key into a single load.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+	"""LRU cache whose entries expire `ttl` seconds after they were set"""
+
+	def __init__(self, ttl: float, max_entries: int = 1024) -> None:
+		self.ttl = ttl
+		self.max_entries = max_entries
+		self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+		self._inflight: Dict[Hashable, asyncio.Task] = {}
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, key: Hashable) -> Optional[Any]:
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None or entry[0] <= time.time():
+				if entry is not None:
+					del self._entries[key]
+				self.misses += 1
+				return None
+			self._entries.move_to_end(key)
+			self.hits += 1
+			return entry[1]
+
+	def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+		with self._lock:
+			self._entries[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+
+	def expires_in(self, key: Hashable) -> Optional[float]:
+		"""Seconds until `key` expires, None if it is not cached."""
+		with self._lock:
+			entry = self._entries.get(key)
+		return None if entry is None else entry[0] - time.time()
+
+	def invalidate(self, key: Hashable) -> None:
+		with self._lock:
+			self._entries.pop(key, None)
+
+	def clear(self) -> None:
+		with self._lock:
+			self._entries.clear()
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def stats(self) -> dict:
+		return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+	async def get_or_load(
+		self,
+		key: Hashable,
+		loader: Callable[[], Awaitable[Tuple[Any, Optional[float]]]],
+	) -> Any:
+		"""
+		Return the cached value for `key`, or await `loader()` once for all concurrent callers.
+
+		`loader` returns `(value, ttl)`; a ttl of None uses the cache default, 0 skips caching.
+		"""
+		value, _ = await self.get_or_load_entry(key, loader)
+		return value
+
+	async def get_or_load_entry(
+		self,
+		key: Hashable,
+		loader: Callable[[], Awaitable[Tuple[Any, Optional[float]]]],
+	) -> Tuple[Any, bool]:
+		"""
+		`get_or_load`, returning `(value, cached)`: whether the value is a stored entry or was just loaded.
+
+		Callers coalesced onto another caller's load get `cached=False` too. The load runs in its own
+		task, so cancelling the caller that started it (its request disconnected) does not cancel the
+		others.
+		"""
+		value = self.get(key)
+		if value is not None:
+			return value, True
+
+		loop = asyncio.get_running_loop()
+		task = self._inflight.get(key)
+		if task is None or task.get_loop() is not loop:
+			task = loop.create_task(self._load(key, loader))
+			self._inflight[key] = task
+			task.add_done_callback(partial(self._load_done, key))
+		return await asyncio.shield(task), False
+
+	async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Tuple[Any, Optional[float]]]]) -> Any:
+		value, ttl = await loader()
+		if ttl != 0:
+			self.set(key, value, ttl)
+		return value
+
+	def _load_done(self, key: Hashable, task: asyncio.Task) -> None:
+		if self._inflight.get(key) is task:
+			del self._inflight[key]
+		if not task.cancelled():
+			# Mark retrieved so a failure whose callers were all cancelled is not reported at garbage collection
+			task.exception()